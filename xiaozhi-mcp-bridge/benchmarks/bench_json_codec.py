@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do codec JSON: biblioteca padrão (caminho antigo, com str) x json_codec
+
+Mede parse e serialização de respostas do ApeRAG, comparando:
+    stdlib str: bytes.decode + json.loads / json.dumps + str.encode (como a bridge fazia)
+    stdlib bytes: json_codec sem orjson (json.loads em bytes, saída compacta)
+    orjson: json_codec com orjson (se instalado)
+
+Payloads: respostas reais de uma captura de tráfego (--capture, filtradas por --server),
+arquivos JSON (--file) ou, sem nenhum dos dois, respostas sintéticas no formato do
+search_collection do ApeRAG.
+
+Exemplos:
+    python3 benchmarks/bench_json_codec.py
+    python3 benchmarks/bench_json_codec.py --capture captures/traffic.jsonl.gz --server aperag
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Any, List, Callable, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+import json_codec
+from traffic_recorder import read_capture
+
+_WORDS = ("contrato licitação prefeitura orçamento execução despesa empenho pagamento "
+          "fornecedor município secretaria convênio repasse saúde educação obra "
+          "relatório análise indicador período trimestre variação média total").split()
+
+
+def synthetic_aperag_response(topk: int, chars_per_item: int, seed: int = 0) -> Dict[str, Any]:
+    """Resposta JSON-RPC no formato do search_collection do ApeRAG (texto JSON + structuredContent)"""
+    rng = random.Random(seed)
+    items = []
+    for rank in range(1, topk + 1):
+        words = []
+        size = 0
+        while size < chars_per_item:
+            word = rng.choice(_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        items.append({
+            "rank": rank,
+            "score": round(1.0 - rank * 0.037 + rng.random() * 0.01, 6),
+            "content": " ".join(words).capitalize() + ".\n\"Trecho\" com aspas e acentuação.",
+            "source": f"documentos/relatorio_{rng.randint(1, 999):03d}.pdf",
+            "recall_type": rng.choice(("vector_search", "fulltext_search", "graph_search", "summary_search")),
+            "metadata": {
+                "document_id": f"doc{rng.getrandbits(48):012x}",
+                "page": rng.randint(1, 300),
+                "collection_id": "col8f2a1c9d3e4b5a6",
+                "titulo": "Relatório de execução orçamentária"
+            }
+        })
+    search = {"type": "search_result", "query": "despesas com saúde no último trimestre", "items": items}
+    return {
+        "jsonrpc": "2.0",
+        "id": 10042,
+        "result": {
+            "content": [{"type": "text", "text": json.dumps(search, ensure_ascii=False)}],
+            "structuredContent": search,
+            "isError": False
+        }
+    }
+
+
+def load_payloads(args: argparse.Namespace) -> List[Tuple[str, Dict[str, Any]]]:
+    payloads: List[Tuple[str, Dict[str, Any]]] = []
+    if args.capture:
+        for record in read_capture(args.capture):
+            if record.get("k") != "mcp" or not record.get("res"):
+                continue
+            if args.server and record.get("srv") != args.server:
+                continue
+            if (record.get("req") or {}).get("method") != "tools/call":
+                continue
+            payloads.append((f"{record['srv']}:{record['req']['params'].get('name')}",
+                             dict({"jsonrpc": "2.0", "id": 1}, **record["res"])))
+            if len(payloads) >= args.max_payloads:
+                break
+    for path in args.file or []:
+        with open(path, "rb") as f:
+            payloads.append((os.path.basename(path), json.loads(f.read())))
+    if not payloads:
+        for topk, chars in ((5, 400), (20, 1200), (50, 2500)):
+            payloads.append((f"sintético topk={topk}", synthetic_aperag_response(topk, chars)))
+    return payloads
+
+
+def _time(fn: Callable[[], Any], min_time: float) -> float:
+    """Segundos por execução (repete até somar min_time)"""
+    runs = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or runs < 3:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - started
+    return elapsed / runs
+
+
+def _codecs() -> Dict[str, Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]]:
+    codecs = {
+        "stdlib str": (lambda data: json.loads(data.decode('utf-8')),
+                       lambda obj: json.dumps(obj, ensure_ascii=False).encode('utf-8')),
+        "stdlib bytes": (lambda data: json.loads(data),
+                         lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+    }
+    if json_codec.orjson is not None:
+        codecs["orjson"] = (json_codec.loads, json_codec.dumps)
+    return codecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark do codec JSON da bridge")
+    parser.add_argument("--capture", help="Captura de tráfego (bridge.capture) com respostas reais")
+    parser.add_argument("--server", help="Servidor da captura (ex: o nome do ApeRAG no config.yaml)")
+    parser.add_argument("--file", action="append", help="Arquivo JSON com uma resposta (pode repetir)")
+    parser.add_argument("--max-payloads", type=int, default=20, help="Máximo de respostas lidas da captura")
+    parser.add_argument("--min-time", type=float, default=0.3, help="Tempo mínimo de medição por caso (s)")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args)
+    codecs = _codecs()
+    print(f"Backend do json_codec: {json_codec.BACKEND}")
+    if json_codec.orjson is None:
+        print("orjson não instalado: apenas a biblioteca padrão é medida (pip install orjson)")
+
+    totals = {name: [0.0, 0.0] for name in codecs}
+    total_bytes = 0
+    for label, payload in payloads:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        total_bytes += len(data)
+        print(f"\n{label}: {len(data) / 1024:.1f} KB")
+        baseline = None
+        for name, (loads, dumps) in codecs.items():
+            parse = _time(lambda: loads(data), args.min_time)
+            encode = _time(lambda: dumps(payload), args.min_time)
+            totals[name][0] += parse
+            totals[name][1] += encode
+            if baseline is None:
+                baseline = parse + encode
+            print(f"  {name:<13} parse {parse * 1e6:9.1f} µs | serialização {encode * 1e6:9.1f} µs | "
+                  f"{len(data) / (parse + encode) / 1e6:7.1f} MB/s ida e volta | "
+                  f"{baseline / (parse + encode):5.2f}x")
+
+    print(f"\nTotal ({len(payloads)} respostas, {total_bytes / 1024:.1f} KB):")
+    baseline = sum(totals["stdlib str"])
+    for name, (parse, encode) in totals.items():
+        print(f"  {name:<13} {(parse + encode) * 1e3:8.3f} ms por rodada | {baseline / (parse + encode):5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Comportamento comum dos servidores MCP falsos do benchmark (stdio e HTTP)
+
+Responde initialize, tools/list e tools/call com latência, tamanho de resposta e taxa de
+erro configuráveis, sem depender de nenhum backend real, ou repete as respostas gravadas
+de um servidor em uma captura de tráfego (--replay).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from traffic_recorder import read_capture
+
+INITIALIZE_RESULT = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {"tools": {}},
+    "serverInfo": {"name": "fake-mcp", "version": "1.0.0"}
+}
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser):
+    """Argumentos de linha de comando comuns aos servidores falsos"""
+    parser.add_argument("--name", default="fake", help="Prefixo dos nomes das ferramentas (padrão: fake)")
+    parser.add_argument("--tools", type=int, default=3, help="Quantidade de ferramentas anunciadas (padrão: 3)")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="Latência média de cada tools/call em ms (padrão: 20)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="Variação uniforme (+/-) da latência em ms (padrão: 0)")
+    parser.add_argument("--payload-bytes", type=int, default=1024,
+                        help="Tamanho do texto retornado por tools/call em bytes (padrão: 1024)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fração de tools/call que retornam erro JSON-RPC (0 a 1, padrão: 0)")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do gerador aleatório")
+    parser.add_argument("--replay", metavar="CAPTURA", default=None,
+                        help="Repete as respostas gravadas numa captura de tráfego (ignora as opções acima)")
+    parser.add_argument("--server", default=None, help="Servidor da captura a repetir (com --replay)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplicador da latência gravada (com --replay; 0 = sem espera)")
+
+
+def behavior_from_args(args: argparse.Namespace) -> Union["FakeMCPBehavior", "ReplayBehavior"]:
+    """Comportamento sintético ou replay, conforme os argumentos"""
+    if args.replay:
+        return ReplayBehavior(args.replay, args.server or args.name, args.latency_scale)
+    return FakeMCPBehavior.from_args(args)
+
+
+class FakeMCPBehavior:
+    """Gera as respostas JSON-RPC de um servidor MCP falso"""
+
+    def __init__(self, name: str = "fake", tools: int = 3, latency_ms: float = 20.0,
+                 jitter_ms: float = 0.0, payload_bytes: int = 1024, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.name = name
+        self.tool_names = [f"{name}_tool_{idx}" for idx in range(max(1, tools))]
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.payload_bytes = max(0, payload_bytes)
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        # Texto fixo (gerado uma vez) para não medir o custo de gerar o payload
+        self._payload = ("lorem ipsum dolor sit amet " * (self.payload_bytes // 27 + 1))[:self.payload_bytes]
+        self.calls = 0
+        self.errors = 0
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "FakeMCPBehavior":
+        return cls(name=args.name, tools=args.tools, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                   payload_bytes=args.payload_bytes, error_rate=args.error_rate, seed=args.seed)
+
+    def tools_list(self) -> Dict[str, Any]:
+        return {
+            "tools": [
+                {
+                    "name": tool,
+                    "description": f"Ferramenta falsa {tool} (benchmark)",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {"seq": {"type": "integer"}, "query": {"type": "string"}}
+                    }
+                }
+                for tool in self.tool_names
+            ]
+        }
+
+    async def handle(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Processa uma mensagem JSON-RPC; retorna a resposta (None para notificações)"""
+        if "id" not in message or "method" not in message:
+            return None
+        request_id = message["id"]
+        method = message["method"]
+
+        if method == "initialize":
+            result = dict(INITIALIZE_RESULT, serverInfo={"name": f"fake-mcp-{self.name}", "version": "1.0.0"})
+        elif method == "tools/list":
+            result = self.tools_list()
+        elif method == "ping":
+            result = {}
+        elif method == "tools/call":
+            return await self._tools_call(request_id, message.get("params") or {})
+        else:
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32601, "message": f"Método não encontrado: {method}"}}
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _tools_call(self, request_id: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        tool = params.get("name")
+        if tool not in self.tool_names:
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32602, "message": f"Ferramenta desconhecida: {tool}"}}
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32000, "message": "Erro injetado pelo benchmark"}}
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {"content": [{"type": "text", "text": self._payload}], "isError": False}
+        }
+
+
+def _call_keys(method: str, params: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Chaves de busca de uma requisição: exata (com argumentos) e só pelo método/ferramenta"""
+    tool = params.get("name", "") if method == "tools/call" else ""
+    arguments = json.dumps(params.get("arguments") or {}, sort_keys=True, ensure_ascii=False)
+    return (method, tool, arguments), (method, tool)
+
+
+class ReplayBehavior:
+    """Responde com as respostas gravadas de um servidor numa captura de tráfego
+
+    Cada requisição recebe a próxima resposta gravada para a mesma ferramenta e argumentos
+    (ou, se não houver, para a mesma ferramenta), após a latência gravada multiplicada por
+    latency_scale. Requisições gravadas sem resposta ficam sem resposta (timeout na bridge).
+    """
+
+    def __init__(self, capture_path: str, server_name: str, latency_scale: float = 1.0):
+        self.server_name = server_name
+        self.latency_scale = latency_scale
+        self._exact: Dict[Tuple[str, ...], deque] = {}
+        self._by_tool: Dict[Tuple[str, ...], deque] = {}
+        self.calls = 0
+        self.misses = 0
+        for record in read_capture(capture_path):
+            if record.get("k") != "mcp" or record.get("srv") != server_name:
+                continue
+            request = record.get("req") or {}
+            exact, by_tool = _call_keys(request.get("method", ""), request.get("params") or {})
+            entry = (record.get("res"), float(record.get("ms", 0.0)))
+            self._exact.setdefault(exact, deque()).append(entry)
+            self._by_tool.setdefault(by_tool, deque()).append(entry)
+
+    @staticmethod
+    def _next(entries: Optional[deque]):
+        if not entries:
+            return None
+        # A última resposta é reutilizada se a replay pedir mais vezes do que foi gravado
+        return entries.popleft() if len(entries) > 1 else entries[0]
+
+    async def handle(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "id" not in message or "method" not in message:
+            return None
+        request_id = message["id"]
+        method = message["method"]
+        exact, by_tool = _call_keys(method, message.get("params") or {})
+        entry = self._next(self._exact.get(exact)) or self._next(self._by_tool.get(by_tool))
+        if entry is None:
+            if method == "initialize":
+                return {"jsonrpc": "2.0", "id": request_id, "result": INITIALIZE_RESULT}
+            if method == "ping":
+                return {"jsonrpc": "2.0", "id": request_id, "result": {}}
+            self.misses += 1
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32601, "message": f"Sem resposta gravada para {method} {by_tool[1]}".strip()}}
+
+        self.calls += 1
+        response, latency_ms = entry
+        if latency_ms > 0 and self.latency_scale > 0:
+            await asyncio.sleep(latency_ms * self.latency_scale / 1000.0)
+        if response is None:
+            return None
+        return dict({"jsonrpc": "2.0", "id": request_id}, **response)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Servidor MCP falso via HTTP (streamable HTTP: resposta JSON ou SSE), para o benchmark
+
+Uso:
+    python3 benchmarks/fake_mcp_http.py --port 18080 --sse --latency-ms 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mcp import FakeMCPBehavior, add_behavior_arguments, behavior_from_args
+
+
+def create_app(behavior: FakeMCPBehavior, sse: bool = False) -> web.Application:
+    """Aplicação aiohttp que atende JSON-RPC em POST / (JSON ou text/event-stream)"""
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        try:
+            message = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"jsonrpc": "2.0", "id": None,
+                                      "error": {"code": -32700, "message": "JSON inválido"}}, status=400)
+        response = await behavior.handle(message)
+        if response is None:
+            # Notificação: nada a responder
+            return web.Response(status=202)
+        body = json.dumps(response, ensure_ascii=False)
+        if not sse:
+            return web.Response(text=body, content_type="application/json")
+        return web.Response(text=f"event: message\ndata: {body}\n\n", content_type="text/event-stream")
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/", handle)
+    app.router.add_post("/mcp", handle)
+    app.router.add_post("/mcp/", handle)
+    return app
+
+
+async def start_server(behavior: FakeMCPBehavior, host: str, port: int, sse: bool = False) -> web.AppRunner:
+    """Inicia o servidor no event loop atual; retorna o runner (para cleanup())"""
+    runner = web.AppRunner(create_app(behavior, sse), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def serve(behavior: FakeMCPBehavior, host: str, port: int, sse: bool):
+    runner = await start_server(behavior, host, port, sse)
+    print(f"[fake-mcp-http] ouvindo em http://{host}:{port}/ ({'SSE' if sse else 'JSON'})", file=sys.stderr, flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor MCP falso via HTTP (benchmark)")
+    add_behavior_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=18080, help="Porta (padrão: 18080)")
+    parser.add_argument("--sse", action="store_true", help="Responder como text/event-stream")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(behavior_from_args(args), args.host, args.port, args.sse))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Servidor MCP falso via stdio (JSON-RPC delimitado por linhas), para o benchmark
+
+Cada requisição é atendida em uma task própria, então chamadas lentas não bloqueiam as
+demais (como um servidor MCP real com I/O assíncrono).
+
+Uso:
+    python3 benchmarks/fake_mcp_stdio.py --latency-ms 50 --payload-bytes 4096 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mcp import FakeMCPBehavior, add_behavior_arguments, behavior_from_args
+
+# Limite de uma linha lida do stdin (requisições do benchmark são pequenas)
+STDIN_LINE_LIMIT = 16 * 1024 * 1024
+
+
+async def serve(behavior: FakeMCPBehavior):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    out = sys.stdout.buffer
+    tasks = set()
+
+    async def respond(message):
+        response = await behavior.handle(message)
+        if response is not None:
+            out.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+            out.flush()
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"[fake-mcp-stdio] linha inválida ignorada: {line[:100]!r}", file=sys.stderr)
+            continue
+        task = asyncio.create_task(respond(message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor MCP falso via stdio (benchmark)")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(behavior_from_args(args)))
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Servidor WebSocket falso que fala o protocolo do xiaozhi.me (hello + envelope "mcp")
+
+Faz o papel do cloud: responde o hello da bridge com um session_id e envia requisições
+JSON-RPC (tools/list, tools/call) dentro de {"type": "mcp", "payload": ...}, medindo o
+tempo até a resposta.
+
+Uso isolado (aponte um websocket_endpoints do config.yaml para ws://127.0.0.1:18765/?):
+    python3 benchmarks/fake_xiaozhi_server.py --port 18765
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+import uuid
+from typing import Dict, Any, Optional, Tuple
+
+import websockets
+
+
+class FakeXiaozhiServer:
+    """Cloud falso: aceita uma conexão da bridge por vez e envia requisições MCP"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.session_id = str(uuid.uuid4())
+        self.connected = asyncio.Event()
+        self.tokens = []
+        self.notifications = 0
+        self._connection = None
+        self._server = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[Any, asyncio.Future] = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/mcp/"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+        # Porta 0: descobrir a porta escolhida pelo sistema
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+
+    async def _handle(self, connection, *_):
+        path = getattr(getattr(connection, "request", None), "path", None) or getattr(connection, "path", "")
+        if "token=" in path:
+            self.tokens.append(path.split("token=", 1)[1].split("&", 1)[0])
+        self._connection = connection
+        try:
+            async for raw in connection:
+                message = json.loads(raw)
+                if message.get("type") == "hello":
+                    await connection.send(json.dumps({
+                        "type": "hello",
+                        "transport": "websocket",
+                        "session_id": self.session_id
+                    }))
+                    self.connected.set()
+                    continue
+                payload = message.get("payload") if message.get("type") == "mcp" else message
+                if not isinstance(payload, dict):
+                    continue
+                future = self._pending.pop(payload.get("id"), None) if "method" not in payload else None
+                if future is not None and not future.done():
+                    future.set_result(payload)
+                elif "method" in payload:
+                    self.notifications += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if self._connection is connection:
+                self._connection = None
+                self.connected.clear()
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      timeout: float = 60.0) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Envia uma requisição JSON-RPC à bridge
+
+        Returns:
+            (resposta JSON-RPC ou None se estourou o prazo, latência em segundos)
+        """
+        if self._connection is None:
+            raise ConnectionError("Nenhuma bridge conectada")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        started = time.perf_counter()
+        await self._connection.send(json.dumps({
+            "type": "mcp",
+            "session_id": self.session_id,
+            "payload": message
+        }, ensure_ascii=False))
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            response = None
+        return response, time.perf_counter() - started
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Envia uma notificação JSON-RPC (sem resposta) à bridge"""
+        if self._connection is None:
+            raise ConnectionError("Nenhuma bridge conectada")
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._connection.send(json.dumps({
+            "type": "mcp",
+            "session_id": self.session_id,
+            "payload": message
+        }, ensure_ascii=False))
+
+
+async def _serve_forever(host: str, port: int):
+    server = FakeXiaozhiServer(host, port)
+    await server.start()
+    print(f"[fake-xiaozhi] ouvindo em {server.url}", file=sys.stderr, flush=True)
+    try:
+        while True:
+            await server.connected.wait()
+            response, latency = await server.request("tools/list", {})
+            tools = [tool.get("name") for tool in (response or {}).get("result", {}).get("tools", [])]
+            print(f"[fake-xiaozhi] bridge conectada; tools/list em {latency * 1000:.1f} ms: {tools}",
+                  file=sys.stderr, flush=True)
+            while server.connected.is_set():
+                await asyncio.sleep(1)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor WebSocket falso do xiaozhi.me (benchmark)")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=18765, help="Porta (padrão: 18765)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
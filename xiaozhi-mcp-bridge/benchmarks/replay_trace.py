@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Replay de uma captura de tráfego real (bridge.capture) contra a MultiWebSocketBridge
+
+Cada servidor MCP da captura vira um servidor falso via stdio que devolve as respostas
+gravadas, com a latência gravada. Cada endpoint vira um cloud falso que reenvia as
+mensagens do cloud no mesmo ritmo da gravação (--speed 1), N vezes mais rápido
+(--speed N) ou sem esperas (--speed max). Serve para reproduzir picos de latência de
+produção e comparar versões da bridge com a mesma carga.
+
+Exemplos:
+    python3 benchmarks/replay_trace.py captures/traffic.jsonl.gz
+    python3 benchmarks/replay_trace.py captures/traffic.jsonl.gz --speed 10 --json replay.json
+    python3 benchmarks/replay_trace.py captures/traffic.jsonl.gz --speed max --set max_in_flight=4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shlex
+import sys
+from typing import Dict, Any, List, Tuple
+
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from fake_xiaozhi_server import FakeXiaozhiServer
+from run_benchmark import summarize, percentile, rss_kb, cpu_seconds, wait_tools
+from traffic_recorder import read_capture
+from bridge_multi_ws import MultiWebSocketBridge
+
+logger = logging.getLogger("replay")
+
+# Requisições mais lentas listadas no relatório
+SLOWEST_SHOWN = 5
+
+
+def parse_speed(value: str) -> float:
+    """'max' (0: sem esperas) ou multiplicador positivo"""
+    if value.lower() == "max":
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("a velocidade deve ser positiva ou 'max'")
+    return speed
+
+
+def load_capture(path: str) -> Tuple[List[str], List[str], List[Dict[str, Any]], int]:
+    """Lê a captura: (endpoints, servidores, mensagens do cloud, ferramentas anunciadas)"""
+    endpoints: List[str] = []
+    servers: List[str] = []
+    cloud: List[Dict[str, Any]] = []
+    tools_by_server: Dict[str, int] = {}
+    for record in read_capture(path):
+        kind = record.get("k")
+        if kind == "meta":
+            endpoints = list(record.get("endpoints") or [])
+            servers = list(record.get("servers") or [])
+        elif kind == "cloud" and isinstance(record.get("msg"), dict) and "method" in record["msg"]:
+            cloud.append(record)
+            if record.get("ep") not in endpoints:
+                endpoints.append(record.get("ep"))
+        elif kind == "mcp":
+            if record.get("srv") not in servers:
+                servers.append(record.get("srv"))
+            if (record.get("req") or {}).get("method") == "tools/list":
+                tools = ((record.get("res") or {}).get("result") or {}).get("tools") or []
+                tools_by_server[record["srv"]] = len(tools)
+    cloud.sort(key=lambda record: record.get("t", 0.0))
+    return endpoints, servers, cloud, sum(tools_by_server.values())
+
+
+async def replay_messages(clouds: Dict[str, FakeXiaozhiServer], messages: List[Dict[str, Any]],
+                          speed: float, timeout: float) -> Tuple[List[Dict[str, Any]], float, float]:
+    """Reenvia as mensagens do cloud no ritmo gravado (dividido por speed)
+
+    Returns:
+        (uma amostra por requisição, duração do replay, maior atraso de envio em segundos)
+    """
+    samples: List[Dict[str, Any]] = []
+    tasks = set()
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    first_t = messages[0].get("t", 0.0) if messages else 0.0
+
+    async def one_request(cloud: FakeXiaozhiServer, record: Dict[str, Any]):
+        message = record["msg"]
+        params = message.get("params")
+        try:
+            response, latency = await cloud.request(message["method"], params, timeout)
+        except ConnectionError:
+            response, latency = None, timeout
+        if response is None:
+            outcome = "timeout"
+        elif "error" in response:
+            outcome = f"error:{response['error'].get('code')}"
+        elif (response.get("result") or {}).get("isError"):
+            outcome = "error:isError"
+        else:
+            outcome = "ok"
+        samples.append({
+            "t": record.get("t", 0.0),
+            "endpoint": record.get("ep"),
+            "method": message["method"],
+            "tool": (params or {}).get("name") if message["method"] == "tools/call" else None,
+            "latency": latency,
+            "outcome": outcome
+        })
+
+    started = loop.time()
+    for record in messages:
+        cloud = clouds.get(record.get("ep"))
+        if cloud is None:
+            continue
+        if speed > 0:
+            scheduled = started + (record.get("t", 0.0) - first_t) / speed
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+        message = record["msg"]
+        if "id" in message:
+            task = asyncio.create_task(one_request(cloud, record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        else:
+            await cloud.notify(message["method"], message.get("params"))
+    if tasks:
+        await asyncio.wait(tasks)
+    return samples, loop.time() - started, max_lag
+
+
+def _by_method(samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, List[float]] = {}
+    for sample in samples:
+        if sample["outcome"] != "timeout":
+            label = f"{sample['method']} {sample['tool']}" if sample["tool"] else sample["method"]
+            groups.setdefault(label, []).append(sample["latency"])
+    breakdown = {}
+    for label, latencies in sorted(groups.items()):
+        latencies.sort()
+        breakdown[label] = {
+            "count": len(latencies),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3)
+        }
+    return breakdown
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    endpoints, servers, messages, expected_tools = load_capture(args.capture)
+    if not messages:
+        raise SystemExit(f"Nenhuma mensagem do cloud em {args.capture}")
+    if not servers:
+        raise SystemExit(f"Nenhuma resposta de servidor MCP em {args.capture}")
+
+    bridge_config: Dict[str, Any] = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        bridge_config[key.strip()] = yaml.safe_load(value)
+
+    latency_scale = args.latency_scale
+    if latency_scale is None:
+        latency_scale = 1.0 / args.speed if args.speed > 0 else 0.0
+
+    clouds: Dict[str, FakeXiaozhiServer] = {}
+    for endpoint_id in endpoints:
+        clouds[endpoint_id] = FakeXiaozhiServer()
+        await clouds[endpoint_id].start()
+
+    mcp_servers = []
+    for server_name in servers:
+        command = [sys.executable, os.path.join(BENCH_DIR, "fake_mcp_stdio.py"), "--replay",
+                   os.path.abspath(args.capture), "--server", server_name,
+                   "--latency-scale", str(latency_scale)]
+        mcp_servers.append({
+            "name": server_name,
+            "ssh_host": "localhost",
+            "ssh_command": " ".join(shlex.quote(part) for part in command),
+            "ssh_password": None
+        })
+
+    # A ordem dos endpoints é a mesma da captura, então endpoint-N continua sendo endpoint-N
+    bridge = MultiWebSocketBridge(
+        ws_endpoints=[{"url": clouds[endpoint_id].url, "token": "replay"} for endpoint_id in endpoints],
+        mcp_servers=mcp_servers,
+        bridge_config=bridge_config
+    )
+    try:
+        if not await bridge.start():
+            raise RuntimeError("A bridge não iniciou (veja os logs com --log-level INFO)")
+        for cloud in clouds.values():
+            await asyncio.wait_for(cloud.connected.wait(), timeout=args.timeout)
+        try:
+            await wait_tools(next(iter(clouds.values())), expected_tools, args.timeout)
+        except RuntimeError as e:
+            logger.warning("%s; iniciando o replay mesmo assim", e)
+
+        cpu_before = cpu_seconds()
+        samples, elapsed, max_lag = await replay_messages(clouds, messages, args.speed, args.timeout)
+        cpu_used = cpu_seconds() - cpu_before
+        rss, peak_rss = rss_kb()
+
+        report = summarize([(sample["latency"], sample["outcome"]) for sample in samples], elapsed)
+        slowest = sorted((s for s in samples if s["outcome"] != "timeout"), key=lambda s: s["latency"],
+                         reverse=True)[:SLOWEST_SHOWN]
+        report.update({
+            "capture": args.capture,
+            "speed": args.speed or "max",
+            "latency_scale": latency_scale,
+            "recorded_s": round(messages[-1].get("t", 0.0) - messages[0].get("t", 0.0), 3),
+            "max_send_lag_ms": round(max_lag * 1000, 3),
+            "by_method": _by_method(samples),
+            "slowest": [
+                {"t": s["t"], "endpoint": s["endpoint"], "method": s["method"], "tool": s["tool"],
+                 "latency_ms": round(s["latency"] * 1000, 3), "outcome": s["outcome"]}
+                for s in slowest
+            ],
+            "bridge": bridge_config,
+            "cpu_s": round(cpu_used, 3),
+            "rss_kb": rss,
+            "peak_rss_kb": peak_rss,
+            "queues": bridge.get_queue_stats()
+        })
+        return report
+    finally:
+        await bridge.stop()
+        for cloud in clouds.values():
+            await cloud.stop()
+
+
+def print_report(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    print()
+    print("=" * 60)
+    print(f"Captura: {report['capture']} | velocidade: {report['speed']}"
+          f"{'x' if report['speed'] != 'max' else ''} | latência MCP x{report['latency_scale']:g}")
+    print(f"Gravado: {report['recorded_s']:.1f}s | replay: {report['elapsed_s']:.1f}s "
+          f"(maior atraso de envio {report['max_send_lag_ms']:.0f} ms)")
+    print("-" * 60)
+    print(f"Requisições: {report['requests']} (ok {report['ok']}, erro {report['error']}, "
+          f"timeout {report['timeout']})")
+    if report["error_codes"]:
+        print(f"Erros:       {', '.join(f'{code}: {count}' for code, count in report['error_codes'].items())}")
+    print(f"Latência:    p50 {latency['p50']:.1f} ms | p95 {latency['p95']:.1f} ms | "
+          f"p99 {latency['p99']:.1f} ms | máx {latency['max']:.1f} ms")
+    for label, stats in report["by_method"].items():
+        print(f"  {label}: {stats['count']}x, p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+              f"máx {stats['max_ms']:.1f} ms")
+    if report["slowest"]:
+        print("Mais lentas:")
+        for s in report["slowest"]:
+            label = f"{s['method']} {s['tool']}" if s["tool"] else s["method"]
+            print(f"  t={s['t']:.3f}s [{s['endpoint']}] {label}: {s['latency_ms']:.1f} ms ({s['outcome']})")
+    rss = f"{report['rss_kb'] / 1024:.1f} MB" if report['rss_kb'] is not None else "?"
+    print(f"CPU:         {report['cpu_s']:.2f}s | RSS: {rss} (pico {report['peak_rss_kb'] / 1024:.1f} MB)")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay de uma captura de tráfego da bridge",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("capture", help="Arquivo de captura (bridge.capture.file)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0,
+                        help="Velocidade: 1 (tempo real), N (N vezes mais rápido) ou max")
+    parser.add_argument("--latency-scale", type=float, default=None,
+                        help="Multiplicador da latência MCP gravada (padrão: 1/speed; 0 com --speed max)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Prazo de cada requisição (segundos)")
+    parser.add_argument("--set", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Opção da seção bridge do config.yaml (ex: max_in_flight=16); pode repetir")
+    parser.add_argument("--json", metavar="ARQUIVO", help="Salva o relatório em JSON")
+    parser.add_argument("--log-level", default="WARNING", help="Nível de log da bridge")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório salvo em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
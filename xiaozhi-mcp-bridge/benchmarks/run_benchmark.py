@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline da MultiWebSocketBridge
+
+Sobe um cloud falso (WebSocket com o protocolo do xiaozhi.me) e servidores MCP falsos via
+stdio e/ou HTTP, conecta a bridge real a eles e dispara tools/call a uma taxa fixa (carga
+em malha aberta: as requisições saem no horário previsto mesmo que as anteriores ainda
+não tenham voltado). No fim, mostra latência p50/p95/p99, vazão, erros, CPU e memória (RSS).
+
+Exemplos:
+    python3 benchmarks/run_benchmark.py
+    python3 benchmarks/run_benchmark.py --transport http --sse --rate 200 --duration 20
+    python3 benchmarks/run_benchmark.py --latency-ms 100 --payload-bytes 65536 --error-rate 0.02 \\
+        --set max_in_flight=16 --json resultado.json --fail-p99-ms 500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from fake_mcp import add_behavior_arguments
+from fake_xiaozhi_server import FakeXiaozhiServer
+from bridge_multi_ws import MultiWebSocketBridge
+
+logger = logging.getLogger("benchmark")
+
+# Argumentos repassados aos servidores MCP falsos
+BEHAVIOR_ARGUMENTS = ("tools", "latency_ms", "jitter_ms", "payload_bytes", "error_rate", "seed")
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _behavior_cli(args: argparse.Namespace, name: str) -> List[str]:
+    cli = ["--name", name]
+    for key in BEHAVIOR_ARGUMENTS:
+        value = getattr(args, key)
+        if value is not None:
+            cli += [f"--{key.replace('_', '-')}", str(value)]
+    return cli
+
+
+def rss_kb() -> Tuple[Optional[int], Optional[int]]:
+    """RSS atual e pico (KB) deste processo (bridge + cloud falso)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+    except (OSError, KeyError, ValueError):
+        # Fora do Linux: apenas o pico (ru_maxrss é KB no Linux e bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak // 1024 if sys.platform == "darwin" else peak
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil pelo método nearest-rank (lista já ordenada)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _wait_http_ready(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Servidor MCP HTTP falso não abriu a porta {port}")
+            await asyncio.sleep(0.05)
+
+
+async def wait_tools(cloud: FakeXiaozhiServer, expected: int, timeout: float) -> List[str]:
+    """Pede tools/list até a bridge anunciar as ferramentas de todos os servidores falsos"""
+    deadline = time.monotonic() + timeout
+    tools: List[str] = []
+    while time.monotonic() < deadline:
+        response, _ = await cloud.request("tools/list", {}, timeout=timeout)
+        tools = [tool["name"] for tool in (response or {}).get("result", {}).get("tools", [])
+                 if not tool["name"].startswith("bridge_")]
+        if len(tools) >= expected:
+            return tools
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"A bridge anunciou {len(tools)} de {expected} ferramentas esperadas")
+
+
+async def _drive_load(cloud: FakeXiaozhiServer, tools: List[str], rate: float, duration: float,
+                      warmup: float, timeout: float) -> Tuple[List[Tuple[float, str]], float]:
+    """Dispara tools/call a rate req/s; retorna ([(latência, resultado)] fora do aquecimento, duração medida)"""
+    samples: List[Tuple[float, str]] = []
+    tasks = set()
+    total = int((warmup + duration) * rate)
+    warmup_count = int(warmup * rate)
+
+    async def one_call(seq: int):
+        tool = tools[seq % len(tools)]
+        try:
+            response, latency = await cloud.request(
+                "tools/call", {"name": tool, "arguments": {"seq": seq, "query": f"benchmark {seq}"}}, timeout)
+        except ConnectionError:
+            response, latency = None, timeout
+        if response is None:
+            outcome = "timeout"
+        elif "error" in response:
+            outcome = f"error:{response['error'].get('code')}"
+        elif (response.get("result") or {}).get("isError"):
+            outcome = "error:isError"
+        else:
+            outcome = "ok"
+        if seq >= warmup_count:
+            samples.append((latency, outcome))
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measured_from = started + warmup
+    for seq in range(total):
+        delay = started + seq / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one_call(seq))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return samples, loop.time() - measured_from
+
+
+def summarize(samples: List[Tuple[float, str]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latency for latency, outcome in samples if outcome != "timeout")
+    outcomes = {"ok": 0, "error": 0, "timeout": 0}
+    # Erros por código JSON-RPC (ex: -32001 = fila cheia na bridge)
+    error_codes: Dict[str, int] = {}
+    for _, outcome in samples:
+        if outcome.startswith("error:"):
+            code = outcome.split(":", 1)[1]
+            error_codes[code] = error_codes.get(code, 0) + 1
+            outcome = "error"
+        outcomes[outcome] += 1
+    return {
+        "requests": len(samples),
+        **outcomes,
+        "error_codes": error_codes,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(outcomes["ok"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "min": round(latencies[0] * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0
+        }
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    bridge_config: Dict[str, Any] = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        bridge_config[key.strip()] = yaml.safe_load(value)
+
+    cloud = FakeXiaozhiServer()
+    await cloud.start()
+
+    mcp_servers = []
+    http_process = None
+    transports = ("stdio", "http") if args.transport == "both" else (args.transport,)
+    if "stdio" in transports:
+        command = [sys.executable, os.path.join(BENCH_DIR, "fake_mcp_stdio.py")] + _behavior_cli(args, "stdio")
+        mcp_servers.append({
+            "name": "fake-stdio",
+            "ssh_host": "localhost",
+            "ssh_command": " ".join(shlex.quote(part) for part in command),
+            "ssh_password": None
+        })
+    if "http" in transports:
+        port = args.http_port or _free_port()
+        command = [sys.executable, os.path.join(BENCH_DIR, "fake_mcp_http.py"), "--port", str(port)]
+        command += _behavior_cli(args, "http") + (["--sse"] if args.sse else [])
+        http_process = subprocess.Popen(command)
+        mcp_servers.append({
+            "name": "fake-http",
+            "url": f"http://127.0.0.1:{port}/mcp",
+            "api_key": "benchmark",
+            "headers": {}
+        })
+
+    bridge = None
+    try:
+        if http_process is not None:
+            await _wait_http_ready(port)
+        bridge = MultiWebSocketBridge(
+            ws_endpoints=[{"url": cloud.url, "token": "benchmark"}],
+            mcp_servers=mcp_servers,
+            bridge_config=bridge_config
+        )
+        if not await bridge.start():
+            raise RuntimeError("A bridge não iniciou (veja os logs com --log-level INFO)")
+        await asyncio.wait_for(cloud.connected.wait(), timeout=args.timeout)
+        tools = await wait_tools(cloud, args.tools * len(mcp_servers), args.timeout)
+
+        cpu_before = cpu_seconds()
+        samples, elapsed = await _drive_load(cloud, tools, args.rate, args.duration, args.warmup, args.timeout)
+        cpu_used = cpu_seconds() - cpu_before
+        rss, peak_rss = rss_kb()
+
+        report = summarize(samples, elapsed)
+        report.update({
+            "config": {
+                "transport": args.transport,
+                "sse": args.sse,
+                "rate": args.rate,
+                "duration_s": args.duration,
+                "warmup_s": args.warmup,
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "payload_bytes": args.payload_bytes,
+                "error_rate": args.error_rate,
+                "bridge": bridge_config
+            },
+            "cpu_s": round(cpu_used, 3),
+            "rss_kb": rss,
+            "peak_rss_kb": peak_rss,
+            "queues": bridge.get_queue_stats()
+        })
+        return report
+    finally:
+        if bridge is not None:
+            await bridge.stop()
+        await cloud.stop()
+        if http_process is not None:
+            http_process.terminate()
+            http_process.wait(timeout=5)
+
+
+def print_report(report: Dict[str, Any]):
+    config = report["config"]
+    latency = report["latency_ms"]
+    print()
+    print("=" * 60)
+    print(f"Transporte: {config['transport']}{' (SSE)' if config['sse'] and config['transport'] != 'stdio' else ''}"
+          f" | taxa alvo: {config['rate']:g} req/s | duração: {config['duration_s']:g}s")
+    print(f"Servidor falso: latência {config['latency_ms']:g} ms (+/-{config['jitter_ms']:g}), "
+          f"payload {config['payload_bytes']} bytes, erros {config['error_rate']:.1%}")
+    print("-" * 60)
+    print(f"Requisições: {report['requests']} (ok {report['ok']}, erro {report['error']}, "
+          f"timeout {report['timeout']})")
+    if report["error_codes"]:
+        print(f"Erros:       {', '.join(f'{code}: {count}' for code, count in report['error_codes'].items())}")
+    print(f"Vazão:       {report['throughput_rps']:.1f} req/s")
+    print(f"Latência:    p50 {latency['p50']:.1f} ms | p95 {latency['p95']:.1f} ms | "
+          f"p99 {latency['p99']:.1f} ms | máx {latency['max']:.1f} ms")
+    rss = f"{report['rss_kb'] / 1024:.1f} MB" if report['rss_kb'] is not None else "?"
+    print(f"CPU:         {report['cpu_s']:.2f}s | RSS: {rss} (pico {report['peak_rss_kb'] / 1024:.1f} MB)")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark offline da bridge (cloud e servidores MCP falsos)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--transport", choices=("stdio", "http", "both"), default="both",
+                        help="Servidores MCP falsos a usar")
+    parser.add_argument("--sse", action="store_true", help="Servidor HTTP falso responde como text/event-stream")
+    parser.add_argument("--http-port", type=int, default=0, help="Porta do servidor HTTP falso (0: livre)")
+    parser.add_argument("--rate", type=float, default=50.0, help="Requisições por segundo")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração medida (segundos)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Aquecimento não medido (segundos)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Prazo de cada requisição (segundos)")
+    parser.add_argument("--set", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Opção da seção bridge do config.yaml (ex: max_in_flight=16); pode repetir")
+    parser.add_argument("--json", metavar="ARQUIVO", help="Salva o relatório em JSON")
+    parser.add_argument("--fail-p99-ms", type=float, default=None,
+                        help="Sai com código 1 se o p99 passar deste valor (para CI)")
+    parser.add_argument("--log-level", default="WARNING", help="Nível de log da bridge")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório salvo em {args.json}")
+
+    failed = report["timeout"] > 0 or (report["error"] > 0 and not args.error_rate)
+    if args.fail_p99_ms is not None and report["latency_ms"]["p99"] > args.fail_p99_ms:
+        print(f"FALHA: p99 {report['latency_ms']['p99']:.1f} ms acima do limite de {args.fail_p99_ms:g} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
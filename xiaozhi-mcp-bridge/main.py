@@ -35,18 +35,40 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from bridge import Bridge
 from bridge_multi import MultiMCPBridge
 from bridge_multi_ws import MultiWebSocketBridge
+from log_pipeline import background_handler, build_formatter, SamplingFilter, DEFAULT_LOG_QUEUE_SIZE
+
+# Opções de desempenho por servidor repassadas à MultiWebSocketBridge
+BRIDGE_SERVER_OPTIONS = (
+    'tools_cache_ttl',
+    'tools_list_timeout',
+    'request_timeout',
+    'result_cache',
+    'coalesce_tool_calls',
+    'collection_cache_ttl',
+    'startup_timeout',
+    'reconnect_initial_delay',
+    'reconnect_max_delay',
+    'down_after_failures',
+    'max_in_flight',
+    'max_queue',
+    'max_line_size',
+    'ssh_multiplex',
+)
 
 
 def setup_logging(config: dict):
-    """Configura logging"""
+    """Configura logging
+    
+    Arquivo e console são gravados por uma thread a partir de uma fila, para que disco
+    lento ou terminal travado não bloqueiem o event loop. Opções da seção logging:
+    format ("text" ou "json"), queue_size, rate_limit (mensagens/s por classe de
+    mensagem, 0 = sem limite) e sampling (regras por logger e início da mensagem).
+    """
     log_level = getattr(logging, config.get('level', 'INFO').upper())
     log_file = config.get('file', 'bridge.log')
     
-    # Criar formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    # Criar formatter (texto ou uma linha JSON por registro)
+    formatter = build_formatter(config.get('format', 'text'))
     
     # Handler para arquivo (com encoding UTF-8 para suportar emojis e caracteres especiais)
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
@@ -64,11 +86,15 @@ def setup_logging(config: dict):
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
     
+    # O event loop só enfileira; amostragem e limite descartam antes de enfileirar
+    queue_handler = background_handler(file_handler, console_handler,
+                                       queue_size=int(config.get('queue_size', DEFAULT_LOG_QUEUE_SIZE)))
+    queue_handler.addFilter(SamplingFilter(config.get('sampling') or [], config.get('rate_limit', 0)))
+    
     # Configurar root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(queue_handler)
 
 
 def load_config(config_path: str = 'config/config.yaml') -> dict:
@@ -211,11 +237,17 @@ def main():
             else:
                 logger.error("Servidor MCP '%s' deve ter 'url', 'ssh_host' ou 'local_command'", mcp_config.get('name'))
                 sys.exit(1)
+            
+            # Repassar opções de desempenho específicas deste servidor
+            for option in BRIDGE_SERVER_OPTIONS:
+                if option in mcp_config:
+                    mcp_servers[-1][option] = mcp_config[option]
         
         # Criar bridge multi-WebSocket
         bridge = MultiWebSocketBridge(
             ws_endpoints=ws_endpoints,
-            mcp_servers=mcp_servers
+            mcp_servers=mcp_servers,
+            bridge_config=config.get('bridge', {})
         )
     else:
         # Modo compatibilidade: usar configuração antiga (xiaozhi.websocket_url e xiaozhi.token)
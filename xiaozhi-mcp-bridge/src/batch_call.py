@@ -0,0 +1,172 @@
+"""
+Ferramenta sintética bridge_batch_call: várias chamadas de ferramentas em uma só ida e volta
+"""
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Nome da ferramenta sintética
+BATCH_CALL_TOOL = "bridge_batch_call"
+
+# Padrões: chamadas por lote e prazo (segundos) de cada chamada
+DEFAULT_BATCH_MAX_CALLS = 8
+DEFAULT_BATCH_CALL_TIMEOUT = 30.0
+# Menor prazo aceito no argumento timeout (valores menores, inclusive 0 e negativos, sobem para ele)
+MIN_BATCH_CALL_TIMEOUT = 1.0
+
+# Bytes reservados para o cabeçalho de cada chamada no resultado combinado
+CALL_HEADER_RESERVE = 160
+
+TRUNCATION_NOTICE = "... [truncado: chame a ferramenta individualmente para o resultado completo]"
+
+BATCH_CALL_TOOL_DEFINITION = {
+    "name": BATCH_CALL_TOOL,
+    "description": (
+        "Executa várias ferramentas independentes ao mesmo tempo e retorna todos os resultados "
+        "juntos. Use quando precisar de mais de uma consulta que não depende da outra "
+        "(ex: agenda, busca no Notion e busca no ApeRAG). O tempo total é o da chamada mais lenta."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "calls": {
+                "type": "array",
+                "description": "Chamadas a executar",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string", "description": "Nome da ferramenta (como em tools/list)"},
+                        "arguments": {"type": "object", "description": "Argumentos da ferramenta"}
+                    },
+                    "required": ["name"]
+                }
+            },
+            "timeout": {"type": "number", "description": "Prazo em segundos de cada chamada (opcional)"}
+        },
+        "required": ["calls"]
+    }
+}
+
+
+class InvalidBatchArguments(ValueError):
+    """Argumento de bridge_batch_call com tipo inválido (respondido com erro JSON-RPC -32602)"""
+    pass
+
+
+def parse_batch_timeout(value: Any, default: float) -> float:
+    """Prazo de cada chamada a partir do argumento timeout (ausente: default)
+
+    Raises:
+        InvalidBatchArguments: Se o valor não é numérico
+    """
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise InvalidBatchArguments(f"O argumento 'timeout' deve ser um número de segundos (recebido {value!r}).")
+    try:
+        timeout = float(value)
+    except ValueError:
+        raise InvalidBatchArguments(f"O argumento 'timeout' deve ser um número de segundos (recebido {value!r}).")
+    if timeout != timeout or timeout == float("inf"):
+        raise InvalidBatchArguments(f"O argumento 'timeout' deve ser um número finito (recebido {value!r}).")
+    return max(timeout, MIN_BATCH_CALL_TIMEOUT)
+
+
+def parse_batch_arguments(arguments: Dict[str, Any], max_calls: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Valida os argumentos de bridge_batch_call
+
+    Returns:
+        (chamadas {name, arguments}, mensagem de erro ou None)
+    """
+    calls = arguments.get("calls")
+    if not isinstance(calls, list) or not calls:
+        return [], "O argumento 'calls' deve ser uma lista não vazia de {name, arguments}."
+    if len(calls) > max_calls:
+        return [], f"Máximo de {max_calls} chamadas por lote (recebidas {len(calls)})."
+
+    parsed = []
+    for idx, call in enumerate(calls, 1):
+        if not isinstance(call, dict) or not isinstance(call.get("name"), str) or not call["name"]:
+            return [], f"Chamada {idx} inválida: informe 'name' (e opcionalmente 'arguments')."
+        if call["name"].startswith("bridge_"):
+            return [], f"Chamada {idx}: ferramentas da bridge ({call['name']}) não podem ser usadas em lote."
+        call_arguments = call.get("arguments") or {}
+        if not isinstance(call_arguments, dict):
+            return [], f"Chamada {idx} ({call['name']}): 'arguments' deve ser um objeto."
+        parsed.append({"name": call["name"], "arguments": call_arguments})
+    return parsed, None
+
+
+def result_text(result: Dict[str, Any]) -> str:
+    """Texto de um resultado de tools/call (itens de texto do content, ou structuredContent)"""
+    content = result.get("content")
+    parts = []
+    if isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict) and item.get("type", "text") == "text" and isinstance(item.get("text"), str):
+                parts.append(item["text"])
+            elif isinstance(item, dict):
+                parts.append(f"[conteúdo {item.get('type', '?')} omitido]")
+    elif isinstance(content, str):
+        parts.append(content)
+    if not parts and "structuredContent" in result:
+        parts.append(json_codec.dumps_str(result["structuredContent"]))
+    return "\n".join(parts)
+
+
+def _escaped_size(text: str) -> int:
+    return len(json_codec.dumps(text)) - 2
+
+
+def _cut(text: str, size: int, max_bytes: int) -> str:
+    """Corta o texto para ocupar cerca de max_bytes já serializado em JSON"""
+    raw = text.encode('utf-8')
+    keep = max(0, int(len(raw) * max_bytes / size) - len(TRUNCATION_NOTICE.encode('utf-8')))
+    return raw[:keep].decode('utf-8', 'ignore') + TRUNCATION_NOTICE
+
+
+def combine_results(outcomes: List[Dict[str, Any]], budget: int, elapsed_ms: int) -> Dict[str, Any]:
+    """Monta o resultado combinado do lote dentro de budget bytes
+
+    O orçamento é dividido de forma justa: resultados pequenos entram inteiros e o espaço
+    que sobra é repartido entre os maiores, que são cortados se necessário.
+
+    Args:
+        outcomes: Por chamada: {name, ok, elapsed_ms, text}
+        budget: Bytes disponíveis para os textos de todas as chamadas
+        elapsed_ms: Tempo total do lote
+    """
+    total = len(outcomes)
+    sizes = [_escaped_size(outcome["text"]) for outcome in outcomes]
+    remaining = max(budget - CALL_HEADER_RESERVE * total, 0)
+    allowed = [0] * total
+    for position, idx in enumerate(sorted(range(total), key=lambda i: sizes[i])):
+        share = remaining // (total - position)
+        allowed[idx] = min(sizes[idx], share)
+        remaining -= allowed[idx]
+
+    content = []
+    succeeded = 0
+    for idx, outcome in enumerate(outcomes):
+        text = outcome["text"]
+        if sizes[idx] > allowed[idx]:
+            logger.info("Resultado de %s no lote cortado de %d para %d bytes",
+                        outcome["name"], sizes[idx], allowed[idx])
+            text = _cut(text, sizes[idx], allowed[idx])
+        status = "ok" if outcome["ok"] else "erro"
+        succeeded += 1 if outcome["ok"] else 0
+        content.append({
+            "type": "text",
+            "text": f"[{idx + 1}/{total}] {outcome['name']} ({status}, {outcome['elapsed_ms']} ms)\n{text}"
+        })
+
+    result = {
+        "content": content,
+        "batch": {"calls": total, "succeeded": succeeded, "elapsed_ms": elapsed_ms}
+    }
+    if succeeded == 0:
+        result["isError"] = True
+    return result
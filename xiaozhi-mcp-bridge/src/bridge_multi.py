@@ -9,6 +9,7 @@ from websocket_client import WebSocketClient
 from mcp_client import MCPClient
 from mcp_client_http import MCPClientHTTP
 from message_handler import MessageHandler
+from response_encoder import encode_response
 
 logger = logging.getLogger(__name__)
 
@@ -535,10 +536,10 @@ class MultiMCPBridge:
     async def _forward_response_to_cloud(self, response: Dict[str, Any]):
         """Encaminha resposta do MCP local para cloud"""
         try:
-            # Truncar resposta se muito grande
-            truncated_response = self._truncate_response(response)
-            await self.ws_client.send_message(truncated_response)
-            logger.debug("Resposta enviada para cloud: %s", truncated_response.get("id"))
+            # Serializar dentro do limite de tamanho (trunca se muito grande)
+            encoded = encode_response(response, MAX_MESSAGE_SIZE, MAX_CONTENT_LENGTH)
+            await self.ws_client.send_text(encoded.data)
+            logger.debug("Resposta enviada para cloud: %s (%d bytes)", response.get("id"), len(encoded.data))
         except Exception as e:
             logger.error("Erro ao encaminhar resposta para cloud: %s", e)
     
@@ -629,137 +630,6 @@ class MultiMCPBridge:
             logger.error("Erro ao converter nome de collection para ID: %s", e, exc_info=True)
             return None
     
-    def _truncate_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
-        """Trunca resposta se muito grande para evitar erro 'message too big'"""
-        try:
-            # Serializar para verificar tamanho
-            response_str = json.dumps(response, ensure_ascii=False)
-            response_size = len(response_str.encode('utf-8'))
-            
-            if response_size <= MAX_MESSAGE_SIZE:
-                return response
-            
-            logger.warning("Resposta muito grande (%d bytes), truncando...", response_size)
-            
-            # Se é uma resposta de ferramenta, tentar truncar o conteúdo dos resultados
-            result = response.get("result", {})
-            
-            # Verificar se é resposta de search_collection ou search_chat_files
-            if isinstance(result, dict):
-                # Truncar conteúdo de resultados de busca
-                if "items" in result:
-                    items = result["items"]
-                    truncated_items = []
-                    for item in items:
-                        truncated_item = item.copy()
-                        content = truncated_item.get("content", "")
-                        if isinstance(content, str):
-                            # Limitar tamanho do conteúdo
-                            if len(content) > MAX_CONTENT_LENGTH:
-                                truncated_item["content"] = content[:MAX_CONTENT_LENGTH] + "... [truncado]"
-                        truncated_items.append(truncated_item)
-                    
-                    # Se ainda muito grande, reduzir número de itens
-                    if len(truncated_items) > 5:
-                        truncated_items = truncated_items[:5]
-                        logger.info("Reduzido número de resultados de %d para 5", len(items))
-                    
-                    result["items"] = truncated_items
-                    logger.info("Truncados %d resultados de busca", len(truncated_items))
-                
-                # Truncar conteúdo direto se existir
-                if "content" in result:
-                    content = result["content"]
-                    if isinstance(content, str):
-                        if len(content) > MAX_CONTENT_LENGTH:
-                            result["content"] = content[:MAX_CONTENT_LENGTH] + "... [truncado]"
-                    elif isinstance(content, list):
-                        truncated_content = []
-                        total_length = 0
-                        max_items = 10  # Limite inicial de itens
-                        for idx, item in enumerate(content):
-                            if isinstance(item, dict) and "text" in item:
-                                text = item["text"]
-                                if isinstance(text, str):
-                                    # Limitar tamanho de cada texto de forma mais agressiva
-                                    max_text_length = min(MAX_CONTENT_LENGTH, (MAX_MESSAGE_SIZE // 4) - 100)
-                                    if len(text) > max_text_length:
-                                        item = item.copy()
-                                        item["text"] = text[:max_text_length] + "... [truncado]"
-                                    total_length += len(item.get("text", ""))
-                                    # Limitar número de itens se muito grande
-                                    if total_length > MAX_MESSAGE_SIZE // 2 or idx >= max_items:
-                                        logger.info("Parando truncamento de content em item %d (tamanho total: %d)", idx, total_length)
-                                        break
-                            truncated_content.append(item)
-                        result["content"] = truncated_content
-                        logger.info("Truncado content de %d para %d itens", len(content), len(truncated_content))
-            
-            # Verificar tamanho novamente após truncamento
-            response_str = json.dumps(response, ensure_ascii=False)
-            response_size = len(response_str.encode('utf-8'))
-            
-            # Se ainda muito grande, tentar reduzir ainda mais
-            if response_size > MAX_MESSAGE_SIZE:
-                logger.warning("Resposta ainda muito grande após primeiro truncamento (%d bytes), aplicando truncamento mais agressivo...", response_size)
-                
-                # Reduzir ainda mais o conteúdo
-                if isinstance(result, dict):
-                    # Reduzir items se existir
-                    if "items" in result:
-                        items = result["items"]
-                        if len(items) > 2:
-                            result["items"] = items[:2]
-                            logger.warning("Reduzido para apenas 2 resultados devido ao tamanho")
-                        # Truncar ainda mais o conteúdo de cada item
-                        for item in result["items"]:
-                            if "content" in item and isinstance(item["content"], str):
-                                if len(item["content"]) > 1000:
-                                    item["content"] = item["content"][:1000] + "... [truncado]"
-                    
-                    # Reduzir content se existir
-                    if "content" in result:
-                        content = result["content"]
-                        if isinstance(content, list):
-                            # Manter apenas primeiros 3 itens e truncar cada um
-                            result["content"] = content[:3]
-                            for item in result["content"]:
-                                if isinstance(item, dict) and "text" in item:
-                                    text = item["text"]
-                                    if isinstance(text, str) and len(text) > 5000:
-                                        item["text"] = text[:5000] + "... [truncado]"
-                        elif isinstance(content, str):
-                            if len(content) > 10000:
-                                result["content"] = content[:10000] + "... [truncado]"
-                
-                # Verificar tamanho novamente
-                response_str = json.dumps(response, ensure_ascii=False)
-                response_size = len(response_str.encode('utf-8'))
-                logger.info("Tamanho após truncamento agressivo: %d bytes", response_size)
-            
-            if response_size > MAX_MESSAGE_SIZE:
-                # Se ainda muito grande, criar resposta de erro
-                logger.error("Resposta ainda muito grande após truncamento (%d bytes), retornando erro", response_size)
-                return {
-                    "jsonrpc": "2.0",
-                    "id": response.get("id"),
-                    "error": {
-                        "code": -32603,
-                        "message": "Resposta muito grande. Tente reduzir o número de resultados (topk) ou refinar a busca.",
-                        "data": {
-                            "original_size": response_size,
-                            "max_size": MAX_MESSAGE_SIZE
-                        }
-                    }
-                }
-            
-            logger.info("Resposta truncada para %d bytes", response_size)
-            return response
-            
-        except Exception as e:
-            logger.error("Erro ao truncar resposta: %s", e, exc_info=True)
-            return response
-    
     async def start(self):
         """Inicia a bridge"""
         logger.info("Iniciando Multi-MCP Bridge com %d servidores...", len(self.mcp_clients))
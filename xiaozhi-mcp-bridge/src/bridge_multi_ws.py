@@ -2,13 +2,33 @@
 Bridge Multi-WebSocket que conecta múltiplos endpoints WebSocket aos mesmos servidores MCP
 """
 import asyncio
-import json
+import copy
 import logging
-from typing import Dict, Any, Optional, List, Union
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Union
 from websocket_client import WebSocketClient
-from mcp_client import MCPClient
+from mcp_client import MCPClient, DEFAULT_MAX_LINE_SIZE
+from ssh_pool import SSHTransportPool, DEFAULT_SSH_KEEPALIVE, DEFAULT_SSH_IDLE_TTL
 from mcp_client_http import MCPClientHTTP
 from message_handler import MessageHandler
+from response_encoder import encode_response, encode_if_fits
+from raw_response import RawResponse
+from result_pager import (ResultStore, split_pages, page_result, FETCH_MORE_TOOL, FETCH_MORE_TOOL_DEFINITION,
+                          PAGE_OVERHEAD_RESERVE, DEFAULT_PAGE_STORE_TTL, DEFAULT_PAGE_STORE_MAX_ENTRIES,
+                          DEFAULT_PAGE_STORE_MAX_BYTES)
+from metrics import (MetricsRegistry, MetricsServer, LOOP_LAG_BUCKETS, DEFAULT_METRICS_HOST,
+                     DEFAULT_METRICS_PORT)
+from tracing import (Tracer, DEFAULT_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SLOW_THRESHOLD_MS, DEFAULT_TRACE_RING_SIZE,
+                     DEFAULT_TRACE_MAX_BYTES, DEFAULT_TRACE_BACKUP_COUNT)
+from traffic_recorder import TrafficRecorder, DEFAULT_CAPTURE_MAX_BYTES
+from batch_call import (BATCH_CALL_TOOL, BATCH_CALL_TOOL_DEFINITION, DEFAULT_BATCH_MAX_CALLS,
+                        DEFAULT_BATCH_CALL_TIMEOUT, InvalidBatchArguments, parse_batch_arguments,
+                        parse_batch_timeout, result_text, combine_results)
+from result_cache import ToolResultCache, canonical_arguments
+from collection_resolver import CollectionResolver
+from mcp_supervisor import MCPSupervisor
+from request_limiter import RequestLimiter, ServerBusyError
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +36,62 @@ logger = logging.getLogger(__name__)
 MAX_MESSAGE_SIZE = 50 * 1024  # 50KB
 MAX_CONTENT_LENGTH = 2000  # Máximo de caracteres por conteúdo de resultado
 
+# Prefixos que já identificam a origem da ferramenta (não recebem o prefixo do servidor)
+KNOWN_TOOL_PREFIXES = ("portal_", "sql_", "aperag_", "google_calendar_", "notion_")
+
+# Validade padrão (segundos) da lista de ferramentas de cada servidor
+DEFAULT_TOOLS_CACHE_TTL = 300.0
+# Prazo padrão (segundos) para cada servidor responder tools/list durante a agregação
+DEFAULT_TOOLS_LIST_TIMEOUT = 2.0
+# Intervalo mínimo (segundos) entre buscas forçadas de ferramentas por nome fora do índice
+TOOL_MISS_REFRESH_INTERVAL = 5.0
+# Prazo padrão (segundos) para uma requisição encaminhada receber resposta
+DEFAULT_REQUEST_TIMEOUT = 180.0
+# Validade padrão (segundos) do índice nome -> ID de collections do ApeRAG
+DEFAULT_COLLECTION_CACHE_TTL = 600.0
+# Prazo padrão (segundos) para cada servidor conectar e inicializar na partida
+DEFAULT_STARTUP_TIMEOUT = 60.0
+# Número padrão de servidores prontos necessário para abrir os WebSockets
+DEFAULT_STARTUP_QUORUM = 1
+# Backoff padrão de reconexão (segundos) e falhas seguidas para marcar o servidor como fora do ar
+DEFAULT_RECONNECT_INITIAL_DELAY = 1.0
+DEFAULT_RECONNECT_MAX_DELAY = 60.0
+DEFAULT_DOWN_AFTER_FAILURES = 3
+# Requisições simultâneas por servidor MCP e tamanho da fila de espera (contrapressão)
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_QUEUE = 32
+# Código JSON-RPC para servidor MCP ocupado (fila cheia)
+SERVER_BUSY_ERROR_CODE = -32001
+# Intervalo (segundos) entre varreduras de requisições expiradas
+IN_FLIGHT_SWEEP_INTERVAL = 1.0
+
+
+@dataclass
+class InFlightRequest:
+    """Requisição do cloud aguardando resposta de um servidor MCP"""
+    local_id: int
+    client_idx: int
+    endpoint_id: str
+    cloud_id: Any
+    method: str
+    started_at: float
+    deadline: float
+    tool: str = ""
+
 
 class MultiWebSocketBridge:
     """Bridge que conecta múltiplos WebSockets (xiaozhi.me) aos mesmos servidores MCP locais"""
     
-    def __init__(self, ws_endpoints: List[Dict[str, str]], mcp_servers: List[Dict[str, Any]]):
+    def __init__(self, ws_endpoints: List[Dict[str, str]], mcp_servers: List[Dict[str, Any]],
+                 bridge_config: Optional[Dict[str, Any]] = None):
         """
         Args:
             ws_endpoints: Lista de dicionários com 'url' e 'token' para cada endpoint WebSocket
             mcp_servers: Lista de configurações de servidores MCP (compartilhados por todos os WebSockets)
+            bridge_config: Opções de desempenho da bridge (seção 'bridge' do config.yaml)
         """
+        self.bridge_config = bridge_config or {}
+        
         # Criar clientes WebSocket para cada endpoint
         self.ws_clients: List[WebSocketClient] = []
         for idx, endpoint in enumerate(ws_endpoints):
@@ -40,9 +106,29 @@ class MultiWebSocketBridge:
         
         # Servidores MCP compartilhados por todos os WebSockets
         self.mcp_clients: List[Union[MCPClient, MCPClientHTTP]] = []
+        self.mcp_server_configs: List[Dict[str, Any]] = []
         self.message_handler = MessageHandler()
+        
+        # Cache de resultados de ferramentas somente leitura (políticas por servidor)
+        self.result_cache = ToolResultCache()
+        
+        # Resultados grandes paginados (bridge.pagination); None desativa a paginação
+        pagination = self.bridge_config.get('pagination', {}) or {}
+        self.result_store: Optional[ResultStore] = None
+        if pagination.get('enabled', True):
+            self.result_store = ResultStore(
+                ttl=float(pagination.get('ttl', DEFAULT_PAGE_STORE_TTL)),
+                max_entries=int(pagination.get('max_entries', DEFAULT_PAGE_STORE_MAX_ENTRIES)),
+                max_bytes=int(pagination.get('max_bytes', DEFAULT_PAGE_STORE_MAX_BYTES))
+            )
         self.running = False
         
+        # Conexões SSH compartilhadas entre servidores do mesmo host (host, porta, usuário)
+        self.ssh_pool = SSHTransportPool(
+            keepalive=float(self.bridge_config.get('ssh_keepalive', DEFAULT_SSH_KEEPALIVE)),
+            idle_ttl=float(self.bridge_config.get('ssh_idle_ttl', DEFAULT_SSH_IDLE_TTL))
+        )
+        
         # Criar clientes MCP para cada servidor
         for mcp_config in mcp_servers:
             # Verificar se é servidor HTTP
@@ -62,25 +148,90 @@ class MultiWebSocketBridge:
                     ssh_user=mcp_config.get('ssh_user', 'user'),
                     ssh_command=mcp_config.get('ssh_command', ''),
                     ssh_port=mcp_config.get('ssh_port', 22),
-                    ssh_password=mcp_config.get('ssh_password')
+                    ssh_password=mcp_config.get('ssh_password'),
+                    max_line_size=int(mcp_config.get('max_line_size',
+                                                     self.bridge_config.get('max_line_size', DEFAULT_MAX_LINE_SIZE))),
+                    ssh_pool=self.ssh_pool,
+                    ssh_multiplex=bool(mcp_config.get('ssh_multiplex', self.bridge_config.get('ssh_multiplex', True)))
                 )
             client.server_name = mcp_config.get('name', 'unknown')
             self.mcp_clients.append(client)
+            self.mcp_server_configs.append(mcp_config)
+            self.result_cache.configure_server(client.server_name, mcp_config.get('result_cache'))
+        
+        # Limite de requisições simultâneas e fila de espera por servidor
+        self.request_limiters: List[RequestLimiter] = [
+            RequestLimiter(
+                int(self._server_option(idx, 'max_in_flight', DEFAULT_MAX_IN_FLIGHT)),
+                int(self._server_option(idx, 'max_queue', DEFAULT_MAX_QUEUE)),
+                client.server_name
+            )
+            for idx, client in enumerate(self.mcp_clients)
+        ]
+        
+        # Requisições em andamento (todos os endpoints), indexadas pelo ID local
+        # IDs locais são únicos na bridge, então o lookup da resposta é O(1)
+        self._in_flight: Dict[int, InFlightRequest] = {}
+        self._sweeper_task: Optional[asyncio.Task] = None
         
-        # Mapeamento de IDs de requisição por WebSocket
-        # Estrutura: {ws_endpoint_id: {cloud_id -> (client_index, local_id)}}
-        self.id_mappings: Dict[str, Dict[Any, tuple]] = {}
-        self.reverse_id_mappings: Dict[str, Dict[tuple, Any]] = {}
+        # tools/call idênticos em andamento: (client_index, ferramenta, argumentos) -> future da resposta
+        self._coalesced_calls: Dict[Tuple[int, str, str], asyncio.Future] = {}
         self._local_id_counter = 10000
         
-        # Cache de ferramentas agregadas (compartilhado)
-        self._aggregated_tools: Optional[List[Dict[str, Any]]] = None
+        # Cache de ferramentas por servidor (compartilhado por todos os endpoints)
+        # Estrutura: {client_index: {"tools": [...], "expires_at": monotonic, "changed": bool, "invalidated": bool}}
+        self._tools_cache: Dict[int, Dict[str, Any]] = {}
+        self._tools_refresh_tasks: Dict[int, asyncio.Task] = {}
+        self._late_tools_tasks: set = set()
+        
+        # Inicialização paralela: se os WebSockets já abriram e servidores ainda inicializando
+        self._endpoints_open = False
+        self._startup_tasks: set = set()
+        
+        # Índice de roteamento de tools/call: nome exposto -> (client_index, nome original no servidor)
+        # Reconstruído sempre que o conjunto de ferramentas de algum servidor muda
+        self._tool_routes: Dict[str, Tuple[int, str]] = {}
+        self._server_tool_names: Dict[int, Dict[str, str]] = {}
+        self._last_tool_miss_refresh = 0.0
+        
+        # Índices nome -> ID de collections por servidor ApeRAG (compartilhados)
+        self._collection_resolvers: Dict[int, CollectionResolver] = {}
         
-        # Cache de mapeamento nome -> ID de collections (compartilhado)
-        self._collection_name_to_id: Dict[str, str] = {}
+        # Supervisores de conexão (um por servidor MCP), com backoff exponencial e estado de saúde
+        self._supervisors: List[MCPSupervisor] = []
+        self._stop_event = asyncio.Event()
         
         # Configurar callbacks
         self._setup_callbacks()
+        
+        # Métricas (sempre coletadas; o endpoint HTTP é opcional em bridge.metrics)
+        self._setup_metrics()
+        self._metrics_server: Optional[MetricsServer] = None
+        
+        # Traces de latência por requisição (bridge.tracing); None desativa
+        tracing = self.bridge_config.get('tracing', {}) or {}
+        self.tracer: Optional[Tracer] = None
+        if tracing.get('enabled', False):
+            self.tracer = Tracer(
+                sample_rate=float(tracing.get('sample_rate', DEFAULT_TRACE_SAMPLE_RATE)),
+                slow_threshold_ms=float(tracing.get('slow_threshold_ms', DEFAULT_TRACE_SLOW_THRESHOLD_MS)),
+                ring_size=int(tracing.get('ring_size', DEFAULT_TRACE_RING_SIZE)),
+                file_path=tracing.get('file'),
+                max_bytes=int(tracing.get('max_bytes', DEFAULT_TRACE_MAX_BYTES)),
+                backup_count=int(tracing.get('backup_count', DEFAULT_TRACE_BACKUP_COUNT))
+            )
+        
+        # Captura do tráfego para replay (bridge.capture); None desativa
+        capture = self.bridge_config.get('capture', {}) or {}
+        self.recorder: Optional[TrafficRecorder] = None
+        if capture.get('enabled', False):
+            self.recorder = TrafficRecorder(
+                capture.get('file', 'captures/traffic.jsonl.gz'),
+                max_bytes=int(capture.get('max_bytes', DEFAULT_CAPTURE_MAX_BYTES)),
+                redact_keys=capture.get('redact_keys'),
+                endpoints=[getattr(ws, 'endpoint_id', 'unknown') for ws in self.ws_clients],
+                servers=[getattr(client, 'server_name', 'unknown') for client in self.mcp_clients]
+            )
     
     def _setup_callbacks(self):
         """Configura callbacks dos clientes"""
@@ -115,17 +266,109 @@ class MultiWebSocketBridge:
             ws_client.on_message = create_message_handler(endpoint_id)
         
         # MCP callbacks (configurados dinamicamente)
+        self._supervisors = []
         for idx, client in enumerate(self.mcp_clients):
             client.on_message = lambda msg, c_idx=idx: self._on_mcp_message(msg, c_idx)
             client.on_error = lambda err, c_idx=idx: self._on_mcp_error(err, c_idx)
+            self._supervisors.append(MCPSupervisor(
+                client,
+                getattr(client, 'server_name', f'MCP-{idx}'),
+                initial_delay=float(self._server_option(idx, 'reconnect_initial_delay', DEFAULT_RECONNECT_INITIAL_DELAY)),
+                max_delay=float(self._server_option(idx, 'reconnect_max_delay', DEFAULT_RECONNECT_MAX_DELAY)),
+                down_after=int(self._server_option(idx, 'down_after_failures', DEFAULT_DOWN_AFTER_FAILURES)),
+                on_reconnected=lambda c_idx=idx: self._on_mcp_reconnected(c_idx)
+            ))
+    
+    def _setup_metrics(self):
+        """Registra as métricas da bridge (valores de estado são lidos na coleta)"""
+        self.metrics = MetricsRegistry()
+        m = self.metrics
+        self._m_tool_latency = m.histogram(
+            "bridge_tool_call_duration_seconds",
+            "Tempo de tools/call do cloud até a resposta (inclui fila), por servidor, ferramenta e resultado",
+            ("server", "tool", "outcome"))
+        self._m_mcp_latency = m.histogram(
+            "bridge_mcp_request_duration_seconds",
+            "Tempo de resposta dos servidores MCP por método (sem a espera na fila)",
+            ("server", "method"))
+        m.gauge("bridge_in_flight_requests", "Requisições do cloud aguardando resposta por servidor MCP",
+                ("server",), collect=self._collect_in_flight)
+        m.gauge("bridge_mcp_queue_depth", "Requisições aguardando vaga na fila do servidor MCP",
+                ("server",), collect=lambda: self._collect_limiters("queued"))
+        m.gauge("bridge_mcp_active_requests", "Requisições em execução no servidor MCP",
+                ("server",), collect=lambda: self._collect_limiters("in_flight"))
+        m.counter("bridge_mcp_rejected_total", "Requisições rejeitadas com a fila cheia (servidor ocupado)",
+                  ("server",), collect=lambda: self._collect_limiters("rejected"))
+        m.gauge("bridge_mcp_up", "Servidor MCP saudável (1) ou não (0)",
+                ("server",), collect=lambda: (((self._server_label(idx),), 1 if sup.is_available() else 0)
+                                              for idx, sup in enumerate(self._supervisors)))
+        m.counter("bridge_mcp_reconnects_total", "Reconexões bem-sucedidas por servidor MCP",
+                  ("server",), collect=lambda: (((self._server_label(idx),), sup.reconnect_count)
+                                                for idx, sup in enumerate(self._supervisors)))
+        self._m_ws_disconnects = m.counter("bridge_ws_disconnects_total", "Desconexões de WebSocket por endpoint",
+                                           ("endpoint",))
+        self._m_ws_reconnects = m.counter("bridge_ws_reconnects_total", "Reconexões de WebSocket por endpoint",
+                                          ("endpoint",))
+        m.gauge("bridge_ws_connected", "WebSocket conectado (1) ou não (0) por endpoint",
+                ("endpoint",), collect=lambda: (((getattr(ws, 'endpoint_id', 'unknown'),), 1 if ws.connected else 0)
+                                                for ws in self.ws_clients))
+        self._m_truncated = m.counter("bridge_responses_truncated_total", "Respostas truncadas por tamanho")
+        self._m_truncation_saved = m.counter("bridge_truncation_bytes_saved_total",
+                                             "Bytes removidos das respostas truncadas (estimativa)")
+        self._m_paginated = m.counter("bridge_responses_paginated_total", "Respostas grandes paginadas")
+        self._m_passthrough = m.counter("bridge_responses_passthrough_total",
+                                        "Respostas repassadas ao cloud com os bytes do servidor MCP (só o ID trocado)")
+        self._m_coalesced = m.counter("bridge_coalesced_calls_total",
+                                      "tools/call atendidos por uma chamada idêntica em andamento", ("server",))
+        for field in ("hits", "misses", "evictions"):
+            m.counter(f"bridge_result_cache_{field}_total", f"Cache de resultados: {field} por política",
+                      ("policy",), collect=lambda field=field: self._collect_cache(field))
+        m.gauge("bridge_result_cache_hit_ratio", "Cache de resultados: hits / (hits + misses) por política",
+                ("policy",), collect=self._collect_cache_ratio)
+        self._m_loop_lag = m.histogram("bridge_event_loop_lag_seconds", "Atraso do event loop",
+                                       buckets=LOOP_LAG_BUCKETS)
+        self._ws_ever_connected: set = set()
+    
+    def _server_label(self, client_idx: int) -> str:
+        return getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+    
+    def _collect_in_flight(self):
+        counts = {self._server_label(idx): 0 for idx in range(len(self.mcp_clients))}
+        for entry in self._in_flight.values():
+            counts[self._server_label(entry.client_idx)] += 1
+        return [((server,), count) for server, count in counts.items()]
+    
+    def _collect_limiters(self, field: str):
+        return [((self._server_label(idx),), limiter.stats()[field])
+                for idx, limiter in enumerate(self.request_limiters)]
+    
+    def _collect_cache(self, field: str):
+        return [((policy,), stats[field]) for policy, stats in self.result_cache.stats().items()]
+    
+    def _collect_cache_ratio(self):
+        ratios = []
+        for policy, stats in self.result_cache.stats().items():
+            lookups = stats["hits"] + stats["misses"]
+            ratios.append(((policy,), stats["hits"] / lookups if lookups else 0.0))
+        return ratios
+    
+    def _observe_tool_call(self, entry: InFlightRequest, outcome: str):
+        """Registra a latência de um tools/call do cloud"""
+        if entry.method == "tools/call":
+            self._m_tool_latency.observe(time.monotonic() - entry.started_at,
+                                         self._server_label(entry.client_idx), entry.tool, outcome)
     
     def _on_ws_connected(self, endpoint_id: str):
         """Callback quando WebSocket conecta"""
         logger.info("WebSocket conectado [%s]", endpoint_id)
+        if endpoint_id in self._ws_ever_connected:
+            self._m_ws_reconnects.inc(endpoint_id)
+        self._ws_ever_connected.add(endpoint_id)
     
     def _on_ws_disconnected(self, endpoint_id: str):
         """Callback quando WebSocket desconecta"""
         logger.warning("WebSocket desconectado [%s]", endpoint_id)
+        self._m_ws_disconnects.inc(endpoint_id)
     
     def _on_ws_error(self, error: str, endpoint_id: str):
         """Callback de erro do WebSocket"""
@@ -135,6 +378,26 @@ class MultiWebSocketBridge:
         """Callback de erro do MCP"""
         server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
         logger.error("Erro MCP [%s]: %s", server_name, error)
+        # Acordar o supervisor (ele ignora se o cliente continua conectado)
+        self._supervisors[client_idx].notify_disconnected()
+    
+    def _on_mcp_reconnected(self, client_idx: int):
+        """Callback do supervisor após reconectar um servidor MCP"""
+        # O servidor pode ter mudado de versão: recarregar ferramentas e avisar o agente
+        self._invalidate_server_tools(client_idx)
+        refresh = self._tools_refresh_tasks.get(client_idx)
+        if refresh is not None and not refresh.done():
+            self._announce_when_refreshed(client_idx, refresh)
+    
+    def _server_unavailable_error(self, client_idx: int, request_id: Any) -> Optional[Dict[str, Any]]:
+        """Retorna erro imediato se o servidor não pode atender agora (fora do ar ou reconectando)"""
+        supervisor = self._supervisors[client_idx]
+        if supervisor.is_available():
+            return None
+        server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+        return self.message_handler.create_error_response(
+            request_id, -32000, f"Servidor MCP {server_name} não está disponível ({supervisor.health})"
+        )
     
     async def _on_ws_message(self, payload: Dict[str, Any], endpoint_id: str):
         """Processa mensagem recebida do WebSocket (cloud)"""
@@ -146,6 +409,14 @@ class MultiWebSocketBridge:
             
             method = payload.get("method")
             
+            if self.recorder:
+                self.recorder.record_cloud(endpoint_id, payload)
+            
+            if self.tracer and self.message_handler.is_request(payload):
+                ws_client = self._get_ws_client(endpoint_id)
+                self.tracer.start(endpoint_id, payload.get("id"), method,
+                                  received_at=getattr(ws_client, 'last_received_at', None) or None)
+            
             # Interceptar tools/list para agregar ferramentas
             if method == "tools/list":
                 logger.info("[BUSCA] Interceptando tools/list do agente [%s] (id=%s)", endpoint_id, payload.get("id"))
@@ -160,19 +431,18 @@ class MultiWebSocketBridge:
             # Se é uma requisição, encaminhar para todos os servidores (ou apenas o primeiro)
             if self.message_handler.is_request(payload):
                 cloud_id = payload.get("id")
-                local_id = self._get_next_local_id()
                 
                 # Por padrão, encaminhar para o primeiro servidor
                 client_idx = 0
                 client = self.mcp_clients[client_idx]
                 
-                # Mapear IDs (por endpoint)
-                if endpoint_id not in self.id_mappings:
-                    self.id_mappings[endpoint_id] = {}
-                    self.reverse_id_mappings[endpoint_id] = {}
+                error_response = self._server_unavailable_error(client_idx, cloud_id)
+                if error_response:
+                    await self._forward_response_to_cloud(error_response, endpoint_id)
+                    return
                 
-                self.id_mappings[endpoint_id][cloud_id] = (client_idx, local_id)
-                self.reverse_id_mappings[endpoint_id][(client_idx, local_id)] = cloud_id
+                # Registrar requisição em andamento
+                local_id = self._register_in_flight(client_idx, endpoint_id, cloud_id, method)
                 
                 # Criar nova mensagem com ID local
                 local_message = payload.copy()
@@ -183,7 +453,7 @@ class MultiWebSocketBridge:
                            endpoint_id, method, cloud_id, local_id)
                 
                 # Enviar para MCP local e aguardar resposta
-                asyncio.create_task(self._forward_request_to_mcp(local_message, cloud_id, client_idx, endpoint_id))
+                asyncio.create_task(self._forward_request_to_mcp(local_message, client_idx))
             
             # Se é uma notificação, encaminhar para todos
             elif self.message_handler.is_notification(payload):
@@ -203,8 +473,7 @@ class MultiWebSocketBridge:
         try:
             cloud_id = request.get("id")
             
-            # Sempre buscar ferramentas frescas (não usar cache)
-            logger.info("Buscando ferramentas de todos os servidores MCP para [%s]...", endpoint_id)
+            logger.info("Agregando ferramentas de todos os servidores MCP para [%s]...", endpoint_id)
             
             # Verificar se há pelo menos um servidor conectado
             connected_clients = [c for c in self.mcp_clients if c.connected]
@@ -220,74 +489,9 @@ class MultiWebSocketBridge:
                 await self._forward_response_to_cloud(response, endpoint_id)
                 return
             
-            # Buscar ferramentas de todos os servidores conectados em paralelo
+            # Usar o cache por servidor (servidores sem cache são consultados em paralelo)
             logger.info("Verificando %d clientes MCP (%d conectados)...", len(self.mcp_clients), len(connected_clients))
-            
-            # Criar lista de tarefas para executar em paralelo
-            async def fetch_tools_from_server(idx: int, client):
-                """Busca ferramentas de um servidor MCP específico"""
-                server_name = getattr(client, 'server_name', f'MCP-{idx}')
-                
-                if not client.connected:
-                    logger.warning("Cliente MCP %d (%s) não conectado, pulando", idx, server_name)
-                    return []
-                
-                # Enviar tools/list para este servidor
-                tools_list_request = {
-                    "jsonrpc": "2.0",
-                    "method": "tools/list",
-                    "params": request.get("params", {}),
-                    "id": self._get_next_local_id()
-                }
-                
-                logger.info("Enviando tools/list para %s (id=%s)", server_name, tools_list_request["id"])
-                try:
-                    response = await client.send_message(tools_list_request)
-                    logger.info("Resposta recebida de %s: %s", server_name, "result" in response if response else "None")
-                    
-                    if response and "result" in response:
-                        tools = response["result"].get("tools", [])
-                        logger.info("Ferramentas brutas de %s: %d ferramentas", server_name, len(tools))
-                        
-                        # Adicionar prefixo ao nome das ferramentas para identificar origem
-                        server_prefix = server_name.lower().replace('-', '_')
-                        for tool in tools:
-                            tool_name = tool.get("name", "")
-                            # Só adicionar prefixo se não tiver já
-                            if (not tool_name.startswith("portal_") and 
-                                not tool_name.startswith("sql_") and 
-                                not tool_name.startswith("aperag_") and
-                                not tool_name.startswith("google_calendar_") and
-                                not tool_name.startswith("notion_") and
-                                not tool_name.startswith(f"{server_prefix}_")):
-                                tool["name"] = f"{server_prefix}_{tool_name}"
-                        logger.info("[OK] Recebidas %d ferramentas de %s", len(tools), server_name)
-                        return tools
-                    else:
-                        logger.warning("Resposta inválida de %s: %s", server_name, response)
-                        return []
-                except Exception as e:
-                    logger.error("[ERRO] Erro ao buscar ferramentas de %s: %s", server_name, e, exc_info=True)
-                    return []
-            
-            # Executar todas as buscas em paralelo
-            tasks = []
-            for idx, client in enumerate(self.mcp_clients):
-                tasks.append(fetch_tools_from_server(idx, client))
-            
-            # Aguardar todas as respostas em paralelo
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Agregar todas as ferramentas
-            all_tools = []
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error("Exceção ao buscar ferramentas: %s", result, exc_info=True)
-                elif isinstance(result, list):
-                    all_tools.extend(result)
-            
-            # Cachear ferramentas agregadas
-            self._aggregated_tools = all_tools
+            all_tools = await self._fetch_all_tools() + self._local_tool_definitions()
             
             # Enviar resposta agregada para cloud
             response = {
@@ -308,192 +512,328 @@ class MultiWebSocketBridge:
             )
             await self._forward_response_to_cloud(error_response, endpoint_id)
     
+    async def _fetch_all_tools(self, allow_stale: bool = True) -> List[Dict[str, Any]]:
+        """Obtém ferramentas de todos os servidores em paralelo, usando o cache quando possível
+        
+        Cada servidor tem um prazo (tools_list_timeout). Servidores que não respondem a tempo
+        entram com o último conjunto conhecido; a resposta tardia atualiza o cache em segundo plano.
+        """
+        tasks = []
+        for idx in range(len(self.mcp_clients)):
+            tasks.append(self._get_server_tools_within_deadline(idx, allow_stale))
+        
+        # Aguardar todas as respostas em paralelo
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Agregar todas as ferramentas
+        all_tools = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Exceção ao buscar ferramentas: %s", result, exc_info=True)
+            elif isinstance(result, list):
+                all_tools.extend(result)
+        return all_tools
+    
+    def _server_option(self, client_idx: int, key: str, default: Any) -> Any:
+        """Lê uma opção do servidor (config por servidor > seção 'bridge' > padrão)"""
+        if client_idx < len(self.mcp_server_configs) and key in self.mcp_server_configs[client_idx]:
+            return self.mcp_server_configs[client_idx][key]
+        return self.bridge_config.get(key, default)
+    
+    async def _get_server_tools(self, idx: int, allow_stale: bool = True) -> List[Dict[str, Any]]:
+        """Retorna as ferramentas de um servidor a partir do cache
+        
+        Entradas frescas são retornadas diretamente. Entradas expiradas são retornadas
+        (se allow_stale) enquanto uma atualização roda em segundo plano. Sem entrada,
+        aguarda a busca no servidor.
+        """
+        client = self.mcp_clients[idx]
+        if not client.connected:
+            logger.warning("Cliente MCP %d (%s) não conectado, pulando",
+                           idx, getattr(client, 'server_name', f'MCP-{idx}'))
+            return []
+        
+        entry = self._tools_cache.get(idx)
+        if entry is not None:
+            if time.monotonic() < entry["expires_at"]:
+                return entry["tools"]
+            # Entrada invalidada (servidor avisou mudança ou reconectou) não é servida sem nova busca
+            if allow_stale and not entry.get("invalidated"):
+                self._refresh_server_tools(idx)
+                return entry["tools"]
+        
+        tools = await asyncio.shield(self._refresh_server_tools(idx))
+        if tools is None:
+            # Falha na busca: usar o último conjunto conhecido, se houver
+            return entry["tools"] if entry is not None else []
+        return tools
+    
+    async def _get_server_tools_within_deadline(self, idx: int, allow_stale: bool = True) -> List[Dict[str, Any]]:
+        """Como _get_server_tools, mas limitado ao prazo do servidor (resultado parcial)"""
+        timeout = self._server_option(idx, 'tools_list_timeout', DEFAULT_TOOLS_LIST_TIMEOUT)
+        if not timeout:
+            return await self._get_server_tools(idx, allow_stale)
+        
+        try:
+            return await asyncio.wait_for(self._get_server_tools(idx, allow_stale), timeout=float(timeout))
+        except asyncio.TimeoutError:
+            server_name = getattr(self.mcp_clients[idx], 'server_name', f'MCP-{idx}')
+            entry = self._tools_cache.get(idx)
+            logger.warning("Servidor %s não respondeu tools/list em %.1fs, usando último conjunto conhecido (%d ferramentas)",
+                           server_name, float(timeout), len(entry["tools"]) if entry else 0)
+            # A busca continua em segundo plano; avisar o agente quando chegar
+            task = self._tools_refresh_tasks.get(idx)
+            if task is not None and not task.done():
+                self._announce_when_refreshed(idx, task)
+            return entry["tools"] if entry is not None else []
+    
+    def _announce_when_refreshed(self, idx: int, task: asyncio.Task):
+        """Avisa o agente quando a busca de ferramentas em andamento terminar (se a lista mudou)"""
+        if task in self._late_tools_tasks:
+            return
+        self._late_tools_tasks.add(task)
+        task.add_done_callback(lambda done: self._on_late_tools_refresh(idx, done))
+    
+    def _on_late_tools_refresh(self, idx: int, task: asyncio.Task):
+        """Callback de busca de ferramentas concluída após o prazo da agregação"""
+        self._late_tools_tasks.discard(task)
+        if task.cancelled() or task.exception() is not None or task.result() is None:
+            return
+        entry = self._tools_cache.get(idx)
+        if entry is None or not entry.get("changed", True):
+            server_name = getattr(self.mcp_clients[idx], 'server_name', f'MCP-{idx}')
+            logger.debug("Ferramentas de %s não mudaram, sem notifications/tools/list_changed", server_name)
+            return
+        self._announce_tools_changed()
+    
+    def _announce_tools_changed(self):
+        """Notifica todos os endpoints que a lista de ferramentas mudou"""
+        notification = {
+            "jsonrpc": "2.0",
+            "method": "notifications/tools/list_changed"
+        }
+        for ws_client in self.ws_clients:
+            if ws_client.is_connected():
+                endpoint_id = getattr(ws_client, 'endpoint_id', 'unknown')
+                asyncio.create_task(self._forward_notification_to_cloud(notification, endpoint_id))
+    
+    def _refresh_server_tools(self, idx: int) -> asyncio.Task:
+        """Inicia (ou reaproveita) a atualização em segundo plano das ferramentas de um servidor"""
+        task = self._tools_refresh_tasks.get(idx)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch_server_tools(idx))
+            self._tools_refresh_tasks[idx] = task
+        return task
+    
+    async def _fetch_after(self, previous: asyncio.Task, idx: int) -> Optional[List[Dict[str, Any]]]:
+        """Busca as ferramentas de novo depois de uma busca em andamento (que pode ter a lista antiga)"""
+        await asyncio.wait([previous])
+        return await self._fetch_server_tools(idx)
+    
+    def _invalidate_server_tools(self, idx: int):
+        """Marca as ferramentas de um servidor como expiradas e agenda nova busca
+        
+        Até a busca terminar, tools/list aguarda a nova lista (dentro do prazo do servidor)
+        em vez de servir a antiga.
+        """
+        entry = self._tools_cache.get(idx)
+        if entry is not None:
+            entry["expires_at"] = 0.0
+            entry["invalidated"] = True
+        if self.mcp_clients[idx].connected:
+            task = self._tools_refresh_tasks.get(idx)
+            if task is not None and not task.done():
+                # A busca em andamento começou antes da mudança: buscar de novo quando terminar
+                self._tools_refresh_tasks[idx] = asyncio.create_task(self._fetch_after(task, idx))
+            else:
+                self._refresh_server_tools(idx)
+    
+    async def _fetch_server_tools(self, idx: int) -> Optional[List[Dict[str, Any]]]:
+        """Busca ferramentas de um servidor MCP específico e atualiza o cache
+        
+        Returns:
+            Ferramentas com os nomes expostos ao agente, ou None em caso de falha
+        """
+        client = self.mcp_clients[idx]
+        server_name = getattr(client, 'server_name', f'MCP-{idx}')
+        
+        if not client.connected:
+            logger.warning("Cliente MCP %d (%s) não conectado, pulando", idx, server_name)
+            return None
+        
+        # Enviar tools/list para este servidor
+        tools_list_request = {
+            "jsonrpc": "2.0",
+            "method": "tools/list",
+            "params": {},
+            "id": self._get_next_local_id()
+        }
+        
+        logger.info("Enviando tools/list para %s (id=%s)", server_name, tools_list_request["id"])
+        try:
+            started = time.monotonic()
+            response = await client.send_message(tools_list_request)
+            if self.recorder:
+                self.recorder.record_mcp(server_name, tools_list_request, response, time.monotonic() - started)
+            logger.info("Resposta recebida de %s: %s", server_name, "result" in response if response else "None")
+            
+            if response and "result" in response:
+                tools = response["result"].get("tools", [])
+                logger.info("Ferramentas brutas de %s: %d ferramentas", server_name, len(tools))
+                exposed_tools = self._update_server_tools(idx, tools)
+                
+                # Servidor ApeRAG: carregar o índice de collections antecipadamente
+                if idx not in self._collection_resolvers and any(
+                        tool.get("name") == "list_collections" for tool in tools):
+                    self._get_collection_resolver(idx).refresh()
+                
+                if self._tools_refresh_tasks.get(idx) not in (None, asyncio.current_task()):
+                    # Cache invalidado durante a busca: a busca seguinte atualiza o cache e avisa o agente
+                    logger.debug("Lista de ferramentas de %s substituída por busca mais nova", server_name)
+                    return exposed_tools
+                ttl = float(self._server_option(idx, 'tools_cache_ttl', DEFAULT_TOOLS_CACHE_TTL))
+                previous = self._tools_cache.get(idx)
+                self._tools_cache[idx] = {
+                    "tools": exposed_tools,
+                    "expires_at": time.monotonic() + ttl,
+                    # Nomes, descrições ou schemas diferentes do último conjunto servido ao agente
+                    "changed": previous is None or self._tools_differ(previous["tools"], exposed_tools)
+                }
+                logger.info("[OK] Recebidas %d ferramentas de %s", len(exposed_tools), server_name)
+                return exposed_tools
+            else:
+                logger.warning("Resposta inválida de %s: %s", server_name, response)
+                return None
+        except Exception as e:
+            logger.error("[ERRO] Erro ao buscar ferramentas de %s: %s", server_name, e, exc_info=True)
+            return None
+    
+    @staticmethod
+    def _tools_differ(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> bool:
+        """Compara dois conjuntos de ferramentas por nome (a ordem não importa)"""
+        return {tool.get("name"): tool for tool in old} != {tool.get("name"): tool for tool in new}
+    
+    @staticmethod
+    def _expose_tool_name(server_prefix: str, tool_name: str) -> str:
+        """Retorna o nome com que a ferramenta é exposta ao agente (prefixo do servidor se necessário)"""
+        # Só adicionar prefixo se não tiver já
+        if tool_name.startswith(KNOWN_TOOL_PREFIXES) or tool_name.startswith(f"{server_prefix}_"):
+            return tool_name
+        return f"{server_prefix}_{tool_name}"
+    
+    def _update_server_tools(self, client_idx: int, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Registra as ferramentas de um servidor e reconstrói o índice de roteamento se mudaram
+        
+        Returns:
+            Cópia das ferramentas com os nomes expostos ao agente
+        """
+        server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+        server_prefix = server_name.lower().replace('-', '_')
+        
+        exposed_tools = []
+        names: Dict[str, str] = {}
+        for tool in tools:
+            original_name = tool.get("name", "")
+            if not original_name:
+                continue
+            exposed_name = self._expose_tool_name(server_prefix, original_name)
+            exposed_tool = dict(tool)
+            exposed_tool["name"] = exposed_name
+            exposed_tools.append(exposed_tool)
+            names[exposed_name] = original_name
+        
+        if self._server_tool_names.get(client_idx) != names:
+            self._server_tool_names[client_idx] = names
+            self._rebuild_tool_routes()
+        return exposed_tools
+    
+    def _rebuild_tool_routes(self):
+        """Reconstrói o índice nome exposto -> (client_index, nome original)"""
+        routes: Dict[str, Tuple[int, str]] = {}
+        aliases: Dict[str, Tuple[int, str]] = {}
+        for client_idx in sorted(self._server_tool_names):
+            server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+            server_prefix = server_name.lower().replace('-', '_')
+            for exposed_name, original_name in self._server_tool_names[client_idx].items():
+                if exposed_name in routes:
+                    logger.warning("Ferramenta '%s' exposta por mais de um servidor, mantendo %s",
+                                   exposed_name, routes[exposed_name])
+                    continue
+                routes[exposed_name] = (client_idx, original_name)
+                # Aliases aceitos por compatibilidade com prompts antigos
+                # (ex: google_calendar_google_calendar_list_events, nome original sem prefixo)
+                for alias in (f"{server_prefix}_{exposed_name}", original_name):
+                    aliases.setdefault(alias, (client_idx, original_name))
+        
+        for alias, route in aliases.items():
+            routes.setdefault(alias, route)
+        self._tool_routes = routes
+        logger.info("Índice de roteamento reconstruído: %d nomes de ferramentas", len(routes))
+    
+    async def _resolve_tool_route(self, tool_name: str) -> Optional[Tuple[int, str]]:
+        """Resolve o servidor e o nome original de uma ferramenta exposta
+        
+        Nome fora do índice (agente chamou antes do tools/list ou ferramenta nova no servidor):
+        as listas de todos os servidores são buscadas de novo, mesmo as ainda frescas no cache,
+        no máximo uma vez a cada TOOL_MISS_REFRESH_INTERVAL (nomes inválidos não geram uma
+        busca por chamada).
+        """
+        route = self._tool_routes.get(tool_name)
+        if route is None:
+            now = time.monotonic()
+            if now - self._last_tool_miss_refresh >= TOOL_MISS_REFRESH_INTERVAL:
+                self._last_tool_miss_refresh = now
+                logger.info("Ferramenta '%s' fora do índice de roteamento, atualizando ferramentas...", tool_name)
+                for idx in range(len(self.mcp_clients)):
+                    self._invalidate_server_tools(idx)
+            await self._fetch_all_tools(allow_stale=False)
+            route = self._tool_routes.get(tool_name)
+        return route
+    
     async def _handle_routed_tool_call(self, request: Dict[str, Any], endpoint_id: str):
         """Roteia tools/call para o servidor correto baseado no nome da ferramenta"""
         try:
             cloud_id = request.get("id")
             params = request.get("params", {})
-            tool_name = params.get("name", "")
-            
-            # Determinar qual servidor deve processar esta ferramenta
-            client_idx = None
-            
-            # Verificar prefixos dos servidores (sql-dw_, portal-transparencia_, google-calendar_, notion_)
-            for idx, client in enumerate(self.mcp_clients):
-                server_name = getattr(client, 'server_name', '').lower()
-                # Tentar com hífen e underscore
-                prefix_with_hyphen = f"{server_name}_"
-                prefix_with_underscore = f"{server_name.replace('-', '_')}_"
-                # Também verificar se o nome da ferramenta contém o padrão do servidor (mesmo com duplicação)
-                if (tool_name.startswith(prefix_with_hyphen) or 
-                    tool_name.startswith(prefix_with_underscore) or
-                    # Verificar padrões específicos mesmo com duplicação
-                    (server_name == 'google-calendar' and 'google_calendar_' in tool_name) or
-                    (server_name == 'notion' and 'notion_' in tool_name)):
-                    client_idx = idx
-                    break
-            
-            # Se não encontrou pelo prefixo, tentar padrões conhecidos
-            if client_idx is None:
-                if tool_name.startswith("portal_"):
-                    # Ferramentas do Portal da Transparência (sem prefixo)
-                    for idx, client in enumerate(self.mcp_clients):
-                        server_name = getattr(client, 'server_name', '').lower()
-                        if 'portal' in server_name or 'transparencia' in server_name:
-                            client_idx = idx
-                            break
-                elif "google_calendar_" in tool_name:
-                    # Ferramentas do Google Calendar (mesmo com prefixo duplicado)
-                    for idx, client in enumerate(self.mcp_clients):
-                        server_name = getattr(client, 'server_name', '').lower()
-                        if 'google' in server_name and 'calendar' in server_name:
-                            client_idx = idx
-                            break
-                elif tool_name.startswith("notion_"):
-                    # Ferramentas do Notion
-                    for idx, client in enumerate(self.mcp_clients):
-                        server_name = getattr(client, 'server_name', '').lower()
-                        if 'notion' in server_name:
-                            client_idx = idx
-                            break
-                elif tool_name.startswith("aperag_") or tool_name.startswith("aperag-mcp_"):
-                    # Ferramentas do ApeRAG
-                    for idx, client in enumerate(self.mcp_clients):
-                        server_name = getattr(client, 'server_name', '').lower()
-                        if 'aperag' in server_name:
-                            client_idx = idx
-                            break
-                elif tool_name.startswith("sql_") or any(tool_name.startswith(prefix) for prefix in ["list_tables", "execute_select", "count_records", "get_table_sample", "describe_table", "list_schemas"]):
-                    # Ferramentas SQL/DW (sem prefixo)
-                    for idx, client in enumerate(self.mcp_clients):
-                        server_name = getattr(client, 'server_name', '').lower()
-                        if 'sql' in server_name or 'dw' in server_name or 'sensr' in server_name:
-                            client_idx = idx
-                            break
-            
-            # Se não encontrou, tentar primeiro servidor
-            if client_idx is None:
-                client_idx = 0
-                logger.warning("Não foi possível determinar servidor para %s, usando primeiro servidor", tool_name)
+            original_tool_name = params.get("name", "")
             
-            if client_idx >= len(self.mcp_clients):
-                error_response = self.message_handler.create_error_response(
-                    cloud_id, -32601, f"Servidor MCP não encontrado para ferramenta: {tool_name}"
-                )
-                await self._forward_response_to_cloud(error_response, endpoint_id)
+            # Ferramentas da própria bridge (não vão para nenhum servidor MCP)
+            local_handler = self._local_tool_handlers().get(original_tool_name)
+            if local_handler is not None:
+                # Em task própria para não segurar a leitura do WebSocket (ex: lote demorado)
+                asyncio.create_task(self._run_local_tool(local_handler, params.get("arguments") or {}, cloud_id, endpoint_id))
                 return
             
-            client = self.mcp_clients[client_idx]
-            server_name = getattr(client, 'server_name', f'MCP-{client_idx}')
-            
-            if not client.connected:
-                error_response = self.message_handler.create_error_response(
-                    cloud_id, -32000, f"Servidor MCP {server_name} não está conectado"
-                )
+            error_response, client_idx, local_message = await self._prepare_routed_call(request, endpoint_id)
+            if error_response:
                 await self._forward_response_to_cloud(error_response, endpoint_id)
                 return
+            server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+            tool_name = local_message["params"]["name"]
+            
+            # Responder direto do cache para ferramentas somente leitura
+            cached_result = self.result_cache.get(server_name, tool_name, local_message["params"].get("arguments"))
+            if cached_result is not None:
+                logger.info("Cache hit para %s [%s]: %s (cloud_id=%s)", server_name, endpoint_id, tool_name, cloud_id)
+                self._m_tool_latency.observe(0.0, server_name, tool_name, "cache")
+                self._trace_mark(endpoint_id, cloud_id, "cache_hit")
+                response = {
+                    "jsonrpc": "2.0",
+                    "id": cloud_id,
+                    "result": cached_result
+                }
+                await self._forward_response_to_cloud(response, endpoint_id)
+                return
             
-            # Mapear IDs (por endpoint)
-            if endpoint_id not in self.id_mappings:
-                self.id_mappings[endpoint_id] = {}
-                self.reverse_id_mappings[endpoint_id] = {}
-            
-            local_id = self._get_next_local_id()
-            self.id_mappings[endpoint_id][cloud_id] = (client_idx, local_id)
-            self.reverse_id_mappings[endpoint_id][(client_idx, local_id)] = cloud_id
-            
-            # Criar mensagem local (deep copy para poder modificar)
-            import copy
-            local_message = copy.deepcopy(request)
+            # Registrar requisição em andamento
+            local_id = self._register_in_flight(client_idx, endpoint_id, cloud_id, "tools/call", tool_name)
             local_message["id"] = local_id
             
-            # Remover prefixo do nome da ferramenta se necessário
-            original_tool_name = tool_name
-            server_name_normalized = server_name.lower().replace('-', '_')
-            
-            # Para Google Calendar e Notion, as ferramentas já têm o prefixo no nome
-            # NUNCA remover o prefixo, apenas verificar se está duplicado
-            if server_name_normalized in ["google_calendar", "notion"]:
-                # Verificar se está duplicado (ex: google_calendar_google_calendar_list_events)
-                prefix = f"{server_name_normalized}_"
-                double_prefix = f"{prefix}{prefix}"
-                if tool_name.startswith(double_prefix):
-                    # Está duplicado, remover apenas um prefixo (deixar google_calendar_list_events)
-                    tool_name = tool_name[len(prefix):]
-                    logger.debug("Removido prefixo duplicado: %s -> %s", original_tool_name, tool_name)
-                else:
-                    # Não está duplicado, manter o nome original (já tem o prefixo correto)
-                    tool_name = tool_name
-                    logger.debug("Mantido nome original para %s: %s", server_name_normalized, tool_name)
-            else:
-                # Para outros servidores, aplicar lógica normal de remoção de prefixo
-                # Remover prefixos comuns do ApeRAG
-                if tool_name.startswith("aperag-mcp_"):
-                    tool_name = tool_name[len("aperag-mcp_"):]
-                elif tool_name.startswith("aperag_mcp_"):
-                    tool_name = tool_name[len("aperag_mcp_"):]
-                elif tool_name.startswith("aperag_"):
-                    tool_name = tool_name[len("aperag_"):]
-                    if tool_name.startswith("mcp_"):
-                        tool_name = tool_name[len("mcp_"):]
-                elif tool_name.startswith(f"{server_name_normalized}_"):
-                    temp_name = tool_name[len(f"{server_name_normalized}_"):]
-                    if temp_name.startswith(f"{server_name_normalized}_"):
-                        # Duplicado, remover ambos
-                        tool_name = temp_name[len(f"{server_name_normalized}_"):]
-                    else:
-                        tool_name = temp_name
-                    if tool_name.startswith("mcp_"):
-                        tool_name = tool_name[len("mcp_"):]
-                elif tool_name.startswith(f"{server_name.lower()}_"):
-                    temp_name = tool_name[len(f"{server_name.lower()}_"):]
-                    if temp_name.startswith(f"{server_name.lower()}_"):
-                        tool_name = temp_name[len(f"{server_name.lower()}_"):]
-                    else:
-                        tool_name = temp_name
-                    if tool_name.startswith("mcp_"):
-                        tool_name = tool_name[len("mcp_"):]
-            
-            local_message["params"]["name"] = tool_name
-            
-            # Log para debug
-            logger.debug("Nome da ferramenta após processamento: '%s' (original: '%s', servidor: '%s')", 
-                        tool_name, original_tool_name, server_name)
-            
-            # Se é uma busca em collection e o collection_id não começa com "col",
-            # tentar converter nome para ID
-            logger.debug("Verificando se tool_name '%s' requer conversão de collection_id", tool_name)
-            if tool_name in ["search_collection", "search_chat_files"]:
-                # Garantir que params e arguments existem
-                if "params" not in local_message:
-                    local_message["params"] = {}
-                if "arguments" not in local_message["params"]:
-                    local_message["params"]["arguments"] = {}
-                
-                arguments = local_message["params"]["arguments"]
-                collection_id = arguments.get("collection_id")
-                
-                logger.info("Verificando collection_id: '%s' (tipo: %s, tool_name: %s)", collection_id, type(collection_id), tool_name)
-                
-                if collection_id and isinstance(collection_id, str) and not collection_id.startswith("col"):
-                    # É um nome, não um ID - tentar converter
-                    logger.info("Collection ID '%s' parece ser um nome (não começa com 'col'), tentando converter para ID...", collection_id)
-                    converted_id = await self._convert_collection_name_to_id(collection_id, client_idx)
-                    if converted_id:
-                        arguments["collection_id"] = converted_id
-                        logger.info("Convertido '%s' -> '%s'", collection_id, converted_id)
-                    else:
-                        logger.warning("Não foi possível converter collection '%s' para ID, tentando usar como está", collection_id)
-                elif collection_id:
-                    logger.debug("Collection ID '%s' já parece ser um ID válido (começa com 'col')", collection_id)
-                else:
-                    logger.warning("collection_id não encontrado ou está vazio nos arguments")
-            
             logger.info("Roteando tools/call para %s [%s]: %s -> %s (cloud_id=%s -> local_id=%s)",
                        server_name, endpoint_id, original_tool_name, tool_name, cloud_id, local_id)
             
             # Encaminhar para o servidor correto
-            asyncio.create_task(self._forward_request_to_mcp(local_message, cloud_id, client_idx, endpoint_id))
+            asyncio.create_task(self._forward_request_to_mcp(local_message, client_idx))
             
         except Exception as e:
             logger.error("Erro ao rotear tools/call [%s]: %s", endpoint_id, e, exc_info=True)
@@ -502,6 +842,81 @@ class MultiWebSocketBridge:
             )
             await self._forward_response_to_cloud(error_response, endpoint_id)
     
+    async def _prepare_routed_call(self, request: Dict[str, Any], endpoint_id: Optional[str] = None
+                                   ) -> Tuple[Optional[Dict[str, Any]], Optional[int], Optional[Dict[str, Any]]]:
+        """Resolve o servidor de um tools/call e monta a mensagem local (nome original, collection convertida)
+        
+        Args:
+            request: tools/call recebido (nome exposto ao agente)
+            endpoint_id: Endpoint de origem, para o trace da requisição (None em chamadas da própria bridge)
+        
+        Returns:
+            (resposta de erro ou None, client_index, mensagem local)
+        """
+        cloud_id = request.get("id")
+        params = request.get("params", {})
+        original_tool_name = params.get("name", "") if isinstance(params, dict) else ""
+        
+        # Determinar qual servidor deve processar esta ferramenta (lookup no índice)
+        route = await self._resolve_tool_route(original_tool_name)
+        if route is None:
+            logger.warning("Nenhum servidor MCP expõe a ferramenta %s", original_tool_name)
+            error_response = self.message_handler.create_error_response(
+                cloud_id, -32601, f"Servidor MCP não encontrado para ferramenta: {original_tool_name}"
+            )
+            return error_response, None, None
+        client_idx, tool_name = route
+        
+        client = self.mcp_clients[client_idx]
+        server_name = getattr(client, 'server_name', f'MCP-{client_idx}')
+        self._trace_mark(endpoint_id, cloud_id, "routed", tool=tool_name, server=server_name)
+        
+        error_response = self._server_unavailable_error(client_idx, cloud_id)
+        if error_response:
+            return error_response, None, None
+        
+        # Criar mensagem local (deep copy para poder modificar)
+        local_message = copy.deepcopy(request)
+        if not isinstance(local_message.get("params"), dict):
+            local_message["params"] = {}
+        local_message["params"]["name"] = tool_name
+        
+        # Log para debug
+        logger.debug("Nome da ferramenta após processamento: '%s' (original: '%s', servidor: '%s')", 
+                    tool_name, original_tool_name, server_name)
+        
+        # Se é uma busca em collection e o collection_id não começa com "col",
+        # tentar converter nome para ID
+        logger.debug("Verificando se tool_name '%s' requer conversão de collection_id", tool_name)
+        if tool_name in ["search_collection", "search_chat_files"]:
+            # Garantir que params e arguments existem
+            if "params" not in local_message:
+                local_message["params"] = {}
+            if "arguments" not in local_message["params"]:
+                local_message["params"]["arguments"] = {}
+            
+            arguments = local_message["params"]["arguments"]
+            collection_id = arguments.get("collection_id")
+            
+            logger.debug("Verificando collection_id: '%s' (tipo: %s, tool_name: %s)", collection_id, type(collection_id), tool_name)
+            
+            if collection_id and isinstance(collection_id, str) and not collection_id.startswith("col"):
+                # É um nome, não um ID - tentar converter
+                logger.info("Collection ID '%s' parece ser um nome (não começa com 'col'), tentando converter para ID...", collection_id)
+                converted_id = await self._convert_collection_name_to_id(collection_id, client_idx)
+                self._trace_mark(endpoint_id, cloud_id, "collection_resolved")
+                if converted_id:
+                    arguments["collection_id"] = converted_id
+                    logger.info("Convertido '%s' -> '%s'", collection_id, converted_id)
+                else:
+                    logger.warning("Não foi possível converter collection '%s' para ID, tentando usar como está", collection_id)
+            elif collection_id:
+                logger.debug("Collection ID '%s' já parece ser um ID válido (começa com 'col')", collection_id)
+            else:
+                logger.warning("collection_id não encontrado ou está vazio nos arguments")
+        
+        return None, client_idx, local_message
+    
     def _on_mcp_message(self, message: Dict[str, Any], client_idx: int):
         """Processa mensagem recebida do MCP local"""
         try:
@@ -512,31 +927,23 @@ class MultiWebSocketBridge:
             
             server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
             
-            # Se é uma resposta, mapear ID de volta e enviar para todos os WebSockets que têm essa requisição
+            # Se é uma resposta, mapear ID de volta e enviar ao endpoint que fez a requisição
             if self.message_handler.is_response(message):
                 local_id = message.get("id")
+                entry = self._in_flight.get(local_id)
                 
-                # Procurar em todos os endpoints qual tem esse ID mapeado
-                for endpoint_id, reverse_mapping in self.reverse_id_mappings.items():
-                    key = (client_idx, local_id)
-                    cloud_id = reverse_mapping.get(key)
+                if entry is not None and entry.client_idx == client_idx:
+                    del self._in_flight[local_id]
+                    
+                    # Criar mensagem com ID cloud
+                    cloud_message = message.copy()
+                    cloud_message["id"] = entry.cloud_id
                     
-                    if cloud_id is not None:
-                        # Criar mensagem com ID cloud
-                        cloud_message = message.copy()
-                        cloud_message["id"] = cloud_id
-                        
-                        # Remover do mapeamento
-                        if endpoint_id in self.id_mappings:
-                            del self.id_mappings[endpoint_id][cloud_id]
-                        del reverse_mapping[key]
-                        
-                        logger.debug("Proxy Local -> Cloud [%s] [%s]: resposta (local_id=%s -> cloud_id=%s)",
-                                   server_name, endpoint_id, local_id, cloud_id)
-                        
-                        # Enviar para cloud (apenas para o endpoint que fez a requisição)
-                        asyncio.create_task(self._forward_response_to_cloud(cloud_message, endpoint_id))
-                        break
+                    logger.debug("Proxy Local -> Cloud [%s] [%s]: resposta (local_id=%s -> cloud_id=%s)",
+                               server_name, entry.endpoint_id, local_id, entry.cloud_id)
+                    
+                    # Enviar para cloud (apenas para o endpoint que fez a requisição)
+                    asyncio.create_task(self._forward_response_to_cloud(cloud_message, entry.endpoint_id))
                 else:
                     logger.warning("ID local não encontrado no mapeamento: %s (servidor: %s)", local_id, server_name)
             
@@ -544,6 +951,15 @@ class MultiWebSocketBridge:
             elif self.message_handler.is_notification(message):
                 logger.debug("Proxy Local -> Cloud [%s] (notification): %s",
                            server_name, message.get("method"))
+                if message.get("method") == "notifications/tools/list_changed":
+                    # O agente é avisado quando a nova lista estiver no cache (e se de fato mudou);
+                    # repassar agora faria o tools/list seguinte receber a lista antiga
+                    logger.info("Ferramentas de %s mudaram, invalidando cache", server_name)
+                    self._invalidate_server_tools(client_idx)
+                    refresh = self._tools_refresh_tasks.get(client_idx)
+                    if refresh is not None and not refresh.done():
+                        self._announce_when_refreshed(client_idx, refresh)
+                    return
                 for ws_client in self.ws_clients:
                     endpoint_id = getattr(ws_client, 'endpoint_id', 'unknown')
                     asyncio.create_task(self._forward_notification_to_cloud(message, endpoint_id))
@@ -556,44 +972,216 @@ class MultiWebSocketBridge:
         except Exception as e:
             logger.error("Erro ao processar mensagem do MCP: %s", e, exc_info=True)
     
-    async def _forward_request_to_mcp(self, local_message: Dict[str, Any], cloud_id: Any, client_idx: int, endpoint_id: str):
+    async def _forward_request_to_mcp(self, local_message: Dict[str, Any], client_idx: int):
         """Encaminha requisição do cloud para MCP local"""
+        local_id = local_message.get("id")
+        entry = self._in_flight.get(local_id)
         try:
-            client = self.mcp_clients[client_idx]
-            response = await client.send_message(local_message)
+            response = await self._send_to_mcp(client_idx, local_message,
+                                               deadline=entry.deadline if entry else None, raw=True)
+            
+            # A entrada some se a requisição expirou (o varredor já respondeu ao cloud)
+            entry = self._in_flight.pop(local_id, None)
+            if entry is None:
+                logger.warning("Resposta descartada para requisição expirada ou já respondida (local_id=%s)", local_id)
+                return
+            
+            failed = not response or self._response_failed(response)
+            self._observe_tool_call(entry, "error" if failed else "ok")
             
             if response:
-                # Mapear ID de volta
-                local_id = response.get("id")
-                key = (client_idx, local_id)
+                # Mapear ID de volta (em bytes, a resposta não passa por parse)
+                if isinstance(response, RawResponse):
+                    cloud_response = response.with_id(entry.cloud_id)
+                else:
+                    cloud_response = response.copy()
+                    cloud_response["id"] = entry.cloud_id
                 
-                if endpoint_id in self.reverse_id_mappings:
-                    reverse_mapping = self.reverse_id_mappings[endpoint_id]
-                    if key in reverse_mapping:
-                        cloud_id = reverse_mapping[key]
-                        cloud_response = response.copy()
-                        cloud_response["id"] = cloud_id
-                        
-                        # Remover do mapeamento
-                        if endpoint_id in self.id_mappings:
-                            del self.id_mappings[endpoint_id][cloud_id]
-                        del reverse_mapping[key]
-                        
-                        # Enviar resposta para cloud (apenas para o endpoint que fez a requisição)
-                        await self._forward_response_to_cloud(cloud_response, endpoint_id)
+                # Enviar resposta para cloud (apenas para o endpoint que fez a requisição)
+                await self._forward_response_to_cloud(cloud_response, entry.endpoint_id)
             else:
                 # Enviar erro para cloud
                 error_response = self.message_handler.create_error_response(
-                    cloud_id, -32000, "Erro ao processar requisição no servidor MCP"
+                    entry.cloud_id, -32000, "Erro ao processar requisição no servidor MCP"
                 )
-                await self._forward_response_to_cloud(error_response, endpoint_id)
+                await self._forward_response_to_cloud(error_response, entry.endpoint_id)
+        
+        except ServerBusyError:
+            entry = self._in_flight.pop(local_id, None)
+            if entry is not None:
+                self._observe_tool_call(entry, "busy")
+                server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+                error_response = self.message_handler.create_error_response(
+                    entry.cloud_id, SERVER_BUSY_ERROR_CODE,
+                    f"Servidor MCP {server_name} ocupado, tente novamente em instantes"
+                )
+                await self._forward_response_to_cloud(error_response, entry.endpoint_id)
                 
         except Exception as e:
             logger.error("Erro ao encaminhar requisição para MCP: %s", e)
-            error_response = self.message_handler.create_error_response(
-                cloud_id, -32000, f"Erro interno: {str(e)}"
-            )
-            await self._forward_response_to_cloud(error_response, endpoint_id)
+            entry = self._in_flight.pop(local_id, None)
+            if entry is not None:
+                self._observe_tool_call(entry, "error")
+                error_response = self.message_handler.create_error_response(
+                    entry.cloud_id, -32000, f"Erro interno: {str(e)}"
+                )
+                await self._forward_response_to_cloud(error_response, entry.endpoint_id)
+    
+    async def _send_to_mcp(self, client_idx: int, message: Dict[str, Any], deadline: Optional[float] = None,
+                           raw: bool = False) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Envia requisição ao servidor MCP e aguarda a resposta
+        
+        tools/call idênticos (mesmo servidor, ferramenta e argumentos) em andamento são
+        coalescidos: chamadas posteriores aguardam a mesma resposta em vez de reenviar.
+        Só para ferramentas somente leitura (com política em result_cache) ou servidores
+        com coalesce_tool_calls: ferramentas de escrita precisam executar a cada chamada.
+        
+        Com raw=True a resposta pode vir como RawResponse (bytes do servidor), exceto para
+        ferramentas com cache de resultados, que precisam do dict para guardar o result.
+        
+        Raises:
+            ServerBusyError: Se a fila do servidor está cheia
+        """
+        client = self.mcp_clients[client_idx]
+        if message.get("method") != "tools/call":
+            return await self._limited_send(client_idx, message, deadline, raw)
+        
+        params = message.get("params", {})
+        tool_name = params.get("name", "")
+        arguments = params.get("arguments")
+        server_name = getattr(client, 'server_name', f'MCP-{client_idx}')
+        cacheable = self.result_cache.is_cacheable(server_name, tool_name)
+        raw = raw and not cacheable
+        
+        if not (cacheable or self._server_option(client_idx, 'coalesce_tool_calls', False)):
+            response = await self._limited_send(client_idx, message, deadline, raw)
+            if response:
+                self.result_cache.put(server_name, tool_name, arguments, response)
+            return response
+        
+        key = (client_idx, tool_name, canonical_arguments(arguments))
+        future = self._coalesced_calls.get(key)
+        if future is not None:
+            logger.info("Coalescendo tools/call idêntico em andamento: %s -> %s (local_id=%s)",
+                        server_name, tool_name, message.get("id"))
+            self._m_coalesced.inc(server_name)
+            self._trace_local(message.get("id"), "coalesced")
+            response = await asyncio.shield(future)
+            if isinstance(response, RawResponse) and not raw:
+                return response.parse()
+            return response
+        
+        future = asyncio.get_running_loop().create_future()
+        self._coalesced_calls[key] = future
+        response = None
+        try:
+            response = await self._limited_send(client_idx, message, deadline, raw)
+            if response:
+                self.result_cache.put(server_name, tool_name, arguments, response)
+            return response
+        except ServerBusyError as e:
+            # Quem aguarda esta chamada também recebe "ocupado"
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            # Liberar quem aguarda mesmo em caso de erro/cancelamento (None vira erro para o cloud)
+            del self._coalesced_calls[key]
+            if not future.done():
+                future.set_result(response)
+    
+    async def _limited_send(self, client_idx: int, message: Dict[str, Any], deadline: Optional[float] = None,
+                            raw: bool = False) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Envia ao servidor respeitando o limite de requisições simultâneas
+        
+        Se a requisição expirou enquanto aguardava na fila, não é enviada. Com prazo, a
+        espera pela resposta também termina nele (retorna None): requisições expiradas não
+        seguram vagas de max_in_flight até o timeout do cliente.
+        """
+        self._trace_local(message.get("id"), "mcp_queued")
+        async with self.request_limiters[client_idx]:
+            self._trace_local(message.get("id"), "mcp_slot_acquired")
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning("Requisição expirou na fila de %s, não enviada (local_id=%s)",
+                               getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}'),
+                               message.get("id"))
+                return None
+            started = time.monotonic()
+            response = None
+            try:
+                send = self.mcp_clients[client_idx].send_message(message, raw=raw)
+                if deadline is None:
+                    response = await send
+                else:
+                    response = await asyncio.wait_for(send, timeout=deadline - started)
+                return response
+            except asyncio.TimeoutError:
+                logger.warning("Requisição sem resposta de %s até o prazo, liberando vaga (local_id=%s)",
+                               self._server_label(client_idx), message.get("id"))
+                return None
+            finally:
+                elapsed = time.monotonic() - started
+                self._m_mcp_latency.observe(elapsed, self._server_label(client_idx), message.get("method", ""))
+                self._trace_local(message.get("id"), "mcp_responded")
+                if self.recorder:
+                    recorded = response.parse() if isinstance(response, RawResponse) else response
+                    self.recorder.record_mcp(self._server_label(client_idx), message, recorded, elapsed)
+    
+    def _trace_mark(self, endpoint_id: Optional[str], cloud_id: Any, stage: str, **attributes: Any):
+        """Marca uma etapa no trace da requisição do cloud (se houver)"""
+        if self.tracer and endpoint_id is not None:
+            self.tracer.mark(endpoint_id, cloud_id, stage, **attributes)
+    
+    def _trace_local(self, local_id: Any, stage: str):
+        """Marca uma etapa no trace a partir do ID local (requisição em andamento)"""
+        if self.tracer:
+            entry = self._in_flight.get(local_id)
+            if entry is not None:
+                self.tracer.mark(entry.endpoint_id, entry.cloud_id, stage)
+    
+    def get_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Requisições em andamento, na fila e rejeitadas por servidor MCP"""
+        return {
+            getattr(client, 'server_name', f'MCP-{idx}'): self.request_limiters[idx].stats()
+            for idx, client in enumerate(self.mcp_clients)
+        }
+    
+    def _register_in_flight(self, client_idx: int, endpoint_id: str, cloud_id: Any, method: str,
+                            tool: str = "") -> int:
+        """Registra uma requisição do cloud em andamento e retorna o ID local"""
+        local_id = self._get_next_local_id()
+        timeout = float(self._server_option(client_idx, 'request_timeout', DEFAULT_REQUEST_TIMEOUT))
+        now = time.monotonic()
+        self._in_flight[local_id] = InFlightRequest(
+            local_id=local_id,
+            client_idx=client_idx,
+            endpoint_id=endpoint_id,
+            cloud_id=cloud_id,
+            method=method,
+            started_at=now,
+            deadline=now + timeout,
+            tool=tool
+        )
+        return local_id
+    
+    async def _sweep_in_flight(self):
+        """Expira requisições sem resposta dentro do prazo e envia erro de timeout ao cloud"""
+        while self.running:
+            await asyncio.sleep(IN_FLIGHT_SWEEP_INTERVAL)
+            now = time.monotonic()
+            expired = [entry for entry in self._in_flight.values() if entry.deadline <= now]
+            for entry in expired:
+                del self._in_flight[entry.local_id]
+                self._observe_tool_call(entry, "timeout")
+                server_name = getattr(self.mcp_clients[entry.client_idx], 'server_name', f'MCP-{entry.client_idx}')
+                elapsed = now - entry.started_at
+                logger.error("Timeout aguardando %s de %s após %.1fs (local_id=%s, cloud_id=%s) [%s]",
+                             entry.method, server_name, elapsed, entry.local_id, entry.cloud_id, entry.endpoint_id)
+                error_response = self.message_handler.create_error_response(
+                    entry.cloud_id, -32000,
+                    f"Timeout aguardando resposta do servidor MCP {server_name} ({elapsed:.0f}s)"
+                )
+                asyncio.create_task(self._forward_response_to_cloud(error_response, entry.endpoint_id))
     
     async def _forward_notification_to_mcp(self, notification: Dict[str, Any], client_idx: int):
         """Encaminha notificação do cloud para MCP local"""
@@ -603,26 +1191,202 @@ class MultiWebSocketBridge:
         except Exception as e:
             logger.error("Erro ao encaminhar notificação para MCP: %s", e)
     
-    async def _forward_response_to_cloud(self, response: Dict[str, Any], endpoint_id: str):
-        """Encaminha resposta do MCP local para cloud (endpoint específico)"""
+    async def _forward_response_to_cloud(self, response: Union[Dict[str, Any], RawResponse], endpoint_id: str):
+        """Encaminha resposta do MCP local para cloud (endpoint específico)
+        
+        RawResponse (já com o ID do cloud) que cabe no limite de tamanho e tem estrutura JSON
+        válida segue com os bytes recebidos do servidor MCP; as demais passam por parse (JSON
+        inválido vira erro -32700) e são serializadas (e paginadas/truncadas).
+        """
+        cloud_id = response.id if isinstance(response, RawResponse) else response.get("id")
         try:
-            # Encontrar o WebSocket client correto
-            ws_client = None
-            for ws in self.ws_clients:
-                if getattr(ws, 'endpoint_id', 'unknown') == endpoint_id:
-                    ws_client = ws
-                    break
-            
+            ws_client = self._get_ws_client(endpoint_id)
             if not ws_client:
                 logger.error("WebSocket client não encontrado para endpoint_id: %s", endpoint_id)
                 return
             
-            # Truncar resposta se muito grande
-            truncated_response = self._truncate_response(response)
-            await ws_client.send_message(truncated_response)
-            logger.debug("Resposta enviada para cloud [%s]: %s", endpoint_id, truncated_response.get("id"))
+            if (isinstance(response, RawResponse) and len(response.data) <= MAX_MESSAGE_SIZE
+                    and response.well_formed):
+                data = response.data
+                self._m_passthrough.inc()
+            else:
+                if isinstance(response, RawResponse):
+                    response = response.parse()
+                data = self._encode_for_cloud(response)
+            self._trace_mark(endpoint_id, cloud_id, "encoded")
+            await ws_client.send_text(data)
+            self._trace_mark(endpoint_id, cloud_id, "ws_sent")
+            logger.debug("Resposta enviada para cloud [%s]: %s (%d bytes)", endpoint_id, cloud_id, len(data))
         except Exception as e:
             logger.error("Erro ao encaminhar resposta para cloud [%s]: %s", endpoint_id, e)
+        finally:
+            if self.tracer:
+                self.tracer.finish(endpoint_id, cloud_id, "error" if self._response_failed(response) else "ok")
+    
+    @staticmethod
+    def _response_failed(response: Union[Dict[str, Any], RawResponse]) -> bool:
+        """Resposta de erro JSON-RPC ou result com isError"""
+        if isinstance(response, RawResponse):
+            return response.is_error
+        result = response.get("result")
+        return "error" in response or (isinstance(result, dict) and bool(result.get("isError")))
+    
+    def _get_ws_client(self, endpoint_id: str) -> Optional[WebSocketClient]:
+        """Encontra o WebSocket client de um endpoint"""
+        for ws in self.ws_clients:
+            if getattr(ws, 'endpoint_id', 'unknown') == endpoint_id:
+                return ws
+        return None
+    
+    def _encode_for_cloud(self, response: Dict[str, Any]) -> bytes:
+        """Serializa a resposta dentro do limite de tamanho
+        
+        Resultados grandes são paginados (primeira página + cursor para bridge_fetch_more);
+        sem paginação, ou se não houver listas para paginar, a resposta é truncada.
+        """
+        if self.result_store is not None and isinstance(response.get("result"), dict):
+            data = encode_if_fits(response, MAX_MESSAGE_SIZE)
+            if data is not None:
+                return data
+            paged = self._paginate_response(response)
+            if paged is not None:
+                self._m_paginated.inc()
+                response = paged
+        encoded = encode_response(response, MAX_MESSAGE_SIZE, MAX_CONTENT_LENGTH)
+        if encoded.truncated:
+            self._m_truncated.inc()
+            self._m_truncation_saved.inc(amount=encoded.bytes_saved)
+        return encoded.data
+    
+    def _paginate_response(self, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Guarda o resultado em páginas e retorna a resposta com a primeira página"""
+        split = split_pages(response["result"], MAX_MESSAGE_SIZE - PAGE_OVERHEAD_RESERVE)
+        if split is None or len(split[0]) < 2:
+            return None
+        pages, size_bytes = split
+        cursor = self.result_store.put(pages, size_bytes)
+        logger.info("Resultado grande (~%d bytes) paginado em %d páginas (cursor=%s)", size_bytes, len(pages), cursor)
+        paged = dict(response)
+        paged["result"] = page_result(pages, cursor, 1)
+        return paged
+    
+    def _local_tool_definitions(self) -> List[Dict[str, Any]]:
+        """Ferramentas da própria bridge anunciadas no tools/list agregado"""
+        definitions = [BATCH_CALL_TOOL_DEFINITION]
+        if self.result_store is not None:
+            definitions.append(FETCH_MORE_TOOL_DEFINITION)
+        return definitions
+    
+    def _local_tool_handlers(self) -> Dict[str, Any]:
+        """Nome da ferramenta da bridge -> corrotina(arguments, endpoint_id) que retorna o result"""
+        handlers = {BATCH_CALL_TOOL: self._tool_batch_call}
+        if self.result_store is not None:
+            handlers[FETCH_MORE_TOOL] = self._tool_fetch_more
+        return handlers
+    
+    async def _run_local_tool(self, handler, arguments: Dict[str, Any], cloud_id: Any, endpoint_id: str):
+        """Executa uma ferramenta da bridge e responde ao cloud"""
+        try:
+            result = await handler(arguments, endpoint_id)
+            response = {"jsonrpc": "2.0", "id": cloud_id, "result": result}
+        except InvalidBatchArguments as e:
+            logger.warning("Argumentos inválidos para ferramenta da bridge [%s]: %s", endpoint_id, e)
+            response = self.message_handler.create_error_response(cloud_id, -32602, str(e))
+        except Exception as e:
+            logger.error("Erro na ferramenta da bridge [%s]: %s", endpoint_id, e, exc_info=True)
+            response = self.message_handler.create_error_response(cloud_id, -32000, f"Erro interno: {str(e)}")
+        await self._forward_response_to_cloud(response, endpoint_id)
+    
+    async def _tool_batch_call(self, arguments: Dict[str, Any], endpoint_id: str) -> Dict[str, Any]:
+        """bridge_batch_call: executa várias ferramentas em paralelo e combina os resultados"""
+        max_calls = int(self.bridge_config.get('batch_max_calls', DEFAULT_BATCH_MAX_CALLS))
+        calls, error = parse_batch_arguments(arguments, max_calls)
+        if error:
+            logger.warning("%s inválido [%s]: %s", BATCH_CALL_TOOL, endpoint_id, error)
+            return {"content": [{"type": "text", "text": error}], "isError": True}
+        
+        # Prazo pedido (mínimo MIN_BATCH_CALL_TIMEOUT); cada chamada é limitada ainda pelo
+        # request_timeout do servidor de destino (_call_tool)
+        timeout = parse_batch_timeout(arguments.get("timeout"),
+                                      float(self.bridge_config.get('batch_call_timeout', DEFAULT_BATCH_CALL_TIMEOUT)))
+        
+        logger.info("Executando lote de %d chamadas [%s]: %s (prazo %.0fs cada)",
+                    len(calls), endpoint_id, ", ".join(call["name"] for call in calls), timeout)
+        started = time.monotonic()
+        outcomes = await asyncio.gather(*(self._run_batch_item(call, timeout) for call in calls))
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        logger.info("Lote de %d chamadas concluído em %d ms [%s]", len(calls), elapsed_ms, endpoint_id)
+        return combine_results(outcomes, MAX_MESSAGE_SIZE - PAGE_OVERHEAD_RESERVE, elapsed_ms)
+    
+    async def _run_batch_item(self, call: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Executa uma chamada do lote com prazo; retorna {name, ok, elapsed_ms, text}"""
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self._call_tool(call["name"], call["arguments"], started + timeout), timeout)
+            if response is None:
+                ok, text = False, "Erro ao processar requisição no servidor MCP"
+            elif "error" in response:
+                ok, text = False, str(response["error"].get("message", response["error"]))
+            else:
+                result = response.get("result") or {}
+                ok, text = not result.get("isError"), result_text(result)
+        except asyncio.TimeoutError:
+            # O prazo pode ter sido o request_timeout do servidor (menor que o do lote)
+            ok, text = False, f"Timeout após {time.monotonic() - started:.1f}s"
+        except ServerBusyError as e:
+            ok, text = False, f"Servidor MCP {e} ocupado, tente novamente em instantes"
+        except Exception as e:
+            logger.error("Erro na chamada %s do lote: %s", call["name"], e, exc_info=True)
+            ok, text = False, f"Erro interno: {str(e)}"
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        return {"name": call["name"], "ok": ok, "elapsed_ms": elapsed_ms, "text": text}
+    
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any], deadline: float) -> Optional[Dict[str, Any]]:
+        """Roteia e executa um tools/call da própria bridge (mesmo caminho das chamadas do cloud)
+        
+        Returns:
+            Resposta JSON-RPC do servidor (ou de erro), ou None em caso de falha
+        """
+        request = {"jsonrpc": "2.0", "id": None, "method": "tools/call",
+                   "params": {"name": tool_name, "arguments": arguments}}
+        error_response, client_idx, local_message = await self._prepare_routed_call(request)
+        if error_response:
+            return error_response
+        
+        server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+        local_tool_name = local_message["params"]["name"]
+        cached_result = self.result_cache.get(server_name, local_tool_name, local_message["params"].get("arguments"))
+        if cached_result is not None:
+            logger.info("Cache hit para %s (lote): %s", server_name, local_tool_name)
+            return {"jsonrpc": "2.0", "id": None, "result": cached_result}
+        
+        local_message["id"] = self._get_next_local_id()
+        server_deadline = time.monotonic() + float(self._server_option(client_idx, 'request_timeout', DEFAULT_REQUEST_TIMEOUT))
+        deadline = min(deadline, server_deadline)
+        # shield: no prazo esgotado a chamada continua (pode estar coalescida com outras e popular o cache)
+        task = asyncio.create_task(self._send_to_mcp(client_idx, local_message, deadline=deadline))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.wait_for(asyncio.shield(task), max(deadline - time.monotonic(), 0))
+    
+    async def _tool_fetch_more(self, arguments: Dict[str, Any], endpoint_id: str) -> Dict[str, Any]:
+        """bridge_fetch_more: serve uma página de um resultado paginado"""
+        cursor = arguments.get("cursor")
+        try:
+            page = int(arguments.get("page", 2))
+        except (TypeError, ValueError):
+            page = 0
+        
+        pages = self.result_store.get(cursor) if isinstance(cursor, str) else None
+        if pages is None:
+            message = "Cursor expirado ou desconhecido. Repita a chamada original da ferramenta."
+        elif not 1 <= page <= len(pages):
+            message = f"Página inválida: {arguments.get('page')}. O resultado tem {len(pages)} páginas."
+        else:
+            logger.info("Servindo página %d de %d do cursor %s [%s]", page, len(pages), cursor, endpoint_id)
+            return page_result(pages, cursor, page)
+        
+        logger.warning("%s: %s (cursor=%s) [%s]", FETCH_MORE_TOOL, message, cursor, endpoint_id)
+        return {"content": [{"type": "text", "text": message}], "isError": True}
     
     async def _forward_notification_to_cloud(self, notification: Dict[str, Any], endpoint_id: str):
         """Encaminha notificação do MCP local para cloud (endpoint específico)"""
@@ -649,244 +1413,93 @@ class MultiWebSocketBridge:
         return self._local_id_counter
     
     async def _convert_collection_name_to_id(self, collection_name: str, client_idx: int) -> Optional[str]:
-        """Converte nome de collection para ID usando list_collections"""
+        """Converte nome de collection para ID usando o índice de collections do servidor"""
         try:
-            # Verificar cache primeiro
-            if collection_name in self._collection_name_to_id:
-                return self._collection_name_to_id[collection_name]
-            
-            client = self.mcp_clients[client_idx]
-            if not client.connected:
+            if not self.mcp_clients[client_idx].connected:
                 logger.warning("Cliente MCP não conectado, não é possível converter nome para ID")
                 return None
             
-            # Chamar list_collections
-            list_request = {
-                "jsonrpc": "2.0",
-                "method": "tools/call",
-                "params": {
-                    "name": "list_collections",
-                    "arguments": {}
-                },
-                "id": self._get_next_local_id()
-            }
-            
-            logger.debug("Chamando list_collections para converter '%s' para ID", collection_name)
-            response = await client.send_message(list_request)
-            
-            if response and "result" in response:
-                result = response["result"]
-                
-                # Tentar structuredContent primeiro
-                if "structuredContent" in result:
-                    structured = result["structuredContent"]
-                    if "items" in structured:
-                        collections = structured["items"]
-                        for coll in collections:
-                            coll_id = coll.get("id", "")
-                            coll_title = coll.get("title", "").lower()
-                            coll_name_lower = collection_name.lower()
-                            
-                            # Comparar título (case-insensitive)
-                            if coll_title == coll_name_lower:
-                                self._collection_name_to_id[collection_name] = coll_id
-                                logger.info("Encontrado ID para '%s': %s", collection_name, coll_id)
-                                return coll_id
-                
-                # Tentar content (formato alternativo)
-                if "content" in result:
-                    content = result["content"]
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and "text" in item:
-                                try:
-                                    text_data = json.loads(item["text"])
-                                    if "items" in text_data:
-                                        collections = text_data["items"]
-                                        for coll in collections:
-                                            coll_id = coll.get("id", "")
-                                            coll_title = coll.get("title", "").lower()
-                                            coll_name_lower = collection_name.lower()
-                                            
-                                            if coll_title == coll_name_lower:
-                                                self._collection_name_to_id[collection_name] = coll_id
-                                                logger.info("Encontrado ID para '%s': %s", collection_name, coll_id)
-                                                return coll_id
-                                except (json.JSONDecodeError, KeyError):
-                                    continue
-            
-            logger.warning("Collection '%s' não encontrada em list_collections", collection_name)
-            return None
+            coll_id = await self._get_collection_resolver(client_idx).resolve(collection_name)
+            if coll_id is None:
+                logger.warning("Collection '%s' não encontrada em list_collections", collection_name)
+            return coll_id
             
         except Exception as e:
             logger.error("Erro ao converter nome de collection para ID: %s", e, exc_info=True)
             return None
     
-    def _truncate_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
-        """Trunca resposta se muito grande para evitar erro 'message too big'"""
-        try:
-            # Serializar para verificar tamanho
-            response_str = json.dumps(response, ensure_ascii=False)
-            response_size = len(response_str.encode('utf-8'))
-            
-            if response_size <= MAX_MESSAGE_SIZE:
-                return response
-            
-            logger.warning("Resposta muito grande (%d bytes), truncando...", response_size)
-            
-            # Se é uma resposta de ferramenta, tentar truncar o conteúdo dos resultados
-            result = response.get("result", {})
-            
-            # Verificar se é resposta de search_collection ou search_chat_files
-            if isinstance(result, dict):
-                # Truncar conteúdo de resultados de busca
-                if "items" in result:
-                    items = result["items"]
-                    truncated_items = []
-                    for item in items:
-                        truncated_item = item.copy()
-                        content = truncated_item.get("content", "")
-                        if isinstance(content, str):
-                            # Limitar tamanho do conteúdo
-                            if len(content) > MAX_CONTENT_LENGTH:
-                                truncated_item["content"] = content[:MAX_CONTENT_LENGTH] + "... [truncado]"
-                        truncated_items.append(truncated_item)
-                    
-                    # Se ainda muito grande, reduzir número de itens
-                    if len(truncated_items) > 5:
-                        truncated_items = truncated_items[:5]
-                        logger.info("Reduzido número de resultados de %d para 5", len(items))
-                    
-                    result["items"] = truncated_items
-                    logger.info("Truncados %d resultados de busca", len(truncated_items))
-                
-                # Truncar conteúdo direto se existir
-                if "content" in result:
-                    content = result["content"]
-                    if isinstance(content, str):
-                        if len(content) > MAX_CONTENT_LENGTH:
-                            result["content"] = content[:MAX_CONTENT_LENGTH] + "... [truncado]"
-                    elif isinstance(content, list):
-                        truncated_content = []
-                        total_length = 0
-                        max_items = 10  # Limite inicial de itens
-                        for idx, item in enumerate(content):
-                            if isinstance(item, dict) and "text" in item:
-                                text = item["text"]
-                                if isinstance(text, str):
-                                    # Limitar tamanho de cada texto de forma mais agressiva
-                                    max_text_length = min(MAX_CONTENT_LENGTH, (MAX_MESSAGE_SIZE // 4) - 100)
-                                    if len(text) > max_text_length:
-                                        item = item.copy()
-                                        item["text"] = text[:max_text_length] + "... [truncado]"
-                                    total_length += len(item.get("text", ""))
-                                    # Limitar número de itens se muito grande
-                                    if total_length > MAX_MESSAGE_SIZE // 2 or idx >= max_items:
-                                        logger.info("Parando truncamento de content em item %d (tamanho total: %d)", idx, total_length)
-                                        break
-                            truncated_content.append(item)
-                        result["content"] = truncated_content
-                        logger.info("Truncado content de %d para %d itens", len(content), len(truncated_content))
-            
-            # Verificar tamanho novamente após truncamento
-            response_str = json.dumps(response, ensure_ascii=False)
-            response_size = len(response_str.encode('utf-8'))
-            
-            # Se ainda muito grande, tentar reduzir ainda mais
-            if response_size > MAX_MESSAGE_SIZE:
-                logger.warning("Resposta ainda muito grande após primeiro truncamento (%d bytes), aplicando truncamento mais agressivo...", response_size)
-                
-                # Reduzir ainda mais o conteúdo
-                if isinstance(result, dict):
-                    # Reduzir items se existir
-                    if "items" in result:
-                        items = result["items"]
-                        if len(items) > 2:
-                            result["items"] = items[:2]
-                            logger.warning("Reduzido para apenas 2 resultados devido ao tamanho")
-                        # Truncar ainda mais o conteúdo de cada item
-                        for item in result["items"]:
-                            if "content" in item and isinstance(item["content"], str):
-                                if len(item["content"]) > 1000:
-                                    item["content"] = item["content"][:1000] + "... [truncado]"
-                    
-                    # Reduzir content se existir
-                    if "content" in result:
-                        content = result["content"]
-                        if isinstance(content, list):
-                            # Manter apenas primeiros 3 itens e truncar cada um
-                            result["content"] = content[:3]
-                            for item in result["content"]:
-                                if isinstance(item, dict) and "text" in item:
-                                    text = item["text"]
-                                    if isinstance(text, str) and len(text) > 5000:
-                                        item["text"] = text[:5000] + "... [truncado]"
-                        elif isinstance(content, str):
-                            if len(content) > 10000:
-                                result["content"] = content[:10000] + "... [truncado]"
-                
-                # Verificar tamanho novamente
-                response_str = json.dumps(response, ensure_ascii=False)
-                response_size = len(response_str.encode('utf-8'))
-                logger.info("Tamanho após truncamento agressivo: %d bytes", response_size)
-            
-            if response_size > MAX_MESSAGE_SIZE:
-                # Se ainda muito grande, criar resposta de erro
-                logger.error("Resposta ainda muito grande após truncamento (%d bytes), retornando erro", response_size)
-                return {
+    def _get_collection_resolver(self, client_idx: int) -> CollectionResolver:
+        """Retorna (criando se necessário) o índice de collections de um servidor ApeRAG"""
+        resolver = self._collection_resolvers.get(client_idx)
+        if resolver is None:
+            async def fetch_collections() -> Optional[Dict[str, Any]]:
+                list_request = {
                     "jsonrpc": "2.0",
-                    "id": response.get("id"),
-                    "error": {
-                        "code": -32603,
-                        "message": "Resposta muito grande. Tente reduzir o número de resultados (topk) ou refinar a busca.",
-                        "data": {
-                            "original_size": response_size,
-                            "max_size": MAX_MESSAGE_SIZE
-                        }
-                    }
+                    "method": "tools/call",
+                    "params": {
+                        "name": "list_collections",
+                        "arguments": {}
+                    },
+                    "id": self._get_next_local_id()
                 }
+                response = await self._send_to_mcp(client_idx, list_request)
+                return response.get("result") if response else None
             
-            logger.info("Resposta truncada para %d bytes", response_size)
-            return response
-            
-        except Exception as e:
-            logger.error("Erro ao truncar resposta: %s", e, exc_info=True)
-            return response
+            server_name = getattr(self.mcp_clients[client_idx], 'server_name', f'MCP-{client_idx}')
+            ttl = float(self._server_option(client_idx, 'collection_cache_ttl', DEFAULT_COLLECTION_CACHE_TTL))
+            resolver = CollectionResolver(fetch_collections, ttl, server_name)
+            self._collection_resolvers[client_idx] = resolver
+        return resolver
     
     async def start(self):
         """Inicia a bridge"""
         logger.info("Iniciando Multi-WebSocket Bridge com %d endpoints e %d servidores MCP...", 
                    len(self.ws_clients), len(self.mcp_clients))
         self.running = True
+        self._stop_event.clear()
+        self._sweeper_task = asyncio.create_task(self._sweep_in_flight())
+        for supervisor in self._supervisors:
+            supervisor.start()
         
-        # Conectar a todos os servidores MCP PRIMEIRO (antes dos WebSockets)
-        # Isso garante que quando o agente solicitar tools/list, os servidores já estarão prontos
-        for idx, client in enumerate(self.mcp_clients):
-            server_name = getattr(client, 'server_name', f'MCP-{idx}')
-            logger.info("Conectando ao servidor MCP: %s", server_name)
-            
-            mcp_connected = await client.connect()
-            if not mcp_connected:
-                logger.error("Falha ao conectar ao servidor MCP: %s", server_name)
-                continue
-            
-            # Inicializar sessão MCP
-            mcp_initialized = await client.initialize()
-            if not mcp_initialized:
-                logger.error("Falha ao inicializar sessão MCP: %s", server_name)
-                await client.disconnect()
-                continue
-            
-            logger.info("Servidor MCP conectado e inicializado: %s", server_name)
+        metrics_config = self.bridge_config.get('metrics', {}) or {}
+        if metrics_config.get('enabled', False):
+            self._metrics_server = MetricsServer(
+                self.metrics,
+                host=metrics_config.get('host', DEFAULT_METRICS_HOST),
+                port=int(metrics_config.get('port', DEFAULT_METRICS_PORT)),
+                loop_lag=self._m_loop_lag,
+                json_routes={"/traces": self.tracer.recent} if self.tracer else None
+            )
+            await self._metrics_server.start()
+        
+        # Conectar a todos os servidores MCP PRIMEIRO (antes dos WebSockets), em paralelo
+        # Os WebSockets abrem assim que um quórum de servidores está pronto; os demais entram depois
+        startup_tasks = [asyncio.create_task(self._start_mcp_server(idx)) for idx in range(len(self.mcp_clients))]
+        quorum = max(1, min(int(self.bridge_config.get('startup_quorum', DEFAULT_STARTUP_QUORUM)), len(startup_tasks)))
+        
+        ready_count = 0
+        pending = set(startup_tasks)
+        while pending and ready_count < quorum:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            ready_count += sum(1 for task in done if task.result())
+        
+        # Servidores atrasados continuam inicializando e entram na agregação quando ficarem prontos
+        self._endpoints_open = True
+        self._startup_tasks = pending
+        for task in pending:
+            task.add_done_callback(self._startup_tasks.discard)
         
         # Verificar se pelo menos um servidor está conectado
         connected_count = sum(1 for client in self.mcp_clients if client.connected)
         if connected_count == 0:
             logger.error("Nenhum servidor MCP conectado")
             return False
+        if ready_count < quorum:
+            logger.warning("Quórum de inicialização não atingido (%d/%d servidores prontos), continuando mesmo assim",
+                           ready_count, quorum)
         
-        # AGORA conectar a todos os WebSockets (depois que os servidores estão prontos)
-        for ws_client in self.ws_clients:
+        # AGORA conectar a todos os WebSockets (depois que o quórum de servidores está pronto)
+        async def connect_ws(ws_client: WebSocketClient):
             endpoint_id = getattr(ws_client, 'endpoint_id', 'unknown')
             logger.info("Conectando ao WebSocket [%s]...", endpoint_id)
             ws_connected = await ws_client.connect()
@@ -895,6 +1508,8 @@ class MultiWebSocketBridge:
             else:
                 logger.info("WebSocket conectado [%s]", endpoint_id)
         
+        await asyncio.gather(*(connect_ws(ws_client) for ws_client in self.ws_clients))
+        
         # Verificar se pelo menos um WebSocket está conectado
         ws_connected_count = sum(1 for ws in self.ws_clients if ws.is_connected())
         if ws_connected_count == 0:
@@ -905,11 +1520,77 @@ class MultiWebSocketBridge:
                    ws_connected_count, len(self.ws_clients), connected_count, len(self.mcp_clients))
         return True
     
+    async def _start_mcp_server(self, idx: int) -> bool:
+        """Conecta e inicializa um servidor MCP dentro do prazo de inicialização"""
+        client = self.mcp_clients[idx]
+        server_name = getattr(client, 'server_name', f'MCP-{idx}')
+        timeout = float(self._server_option(idx, 'startup_timeout', DEFAULT_STARTUP_TIMEOUT))
+        
+        async def connect_and_initialize() -> bool:
+            logger.info("Conectando ao servidor MCP: %s", server_name)
+            
+            mcp_connected = await client.connect()
+            if not mcp_connected:
+                logger.error("Falha ao conectar ao servidor MCP: %s", server_name)
+                return False
+            
+            # Inicializar sessão MCP
+            mcp_initialized = await client.initialize()
+            if not mcp_initialized:
+                logger.error("Falha ao inicializar sessão MCP: %s", server_name)
+                await client.disconnect()
+                return False
+            
+            logger.info("Servidor MCP conectado e inicializado: %s", server_name)
+            return True
+        
+        supervisor = self._supervisors[idx]
+        try:
+            async with supervisor.connect_lock:
+                started = await asyncio.wait_for(connect_and_initialize(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("Servidor MCP %s não ficou pronto em %.0fs", server_name, timeout)
+            await client.disconnect()
+            started = False
+        except Exception as e:
+            logger.error("Erro ao iniciar servidor MCP %s: %s", server_name, e, exc_info=True)
+            started = False
+        
+        if not started:
+            # O supervisor assume as novas tentativas (com backoff)
+            supervisor.notify_disconnected()
+            return False
+        supervisor.mark_connected()
+        
+        # Carregar ferramentas antecipadamente (o agente pede tools/list logo após conectar)
+        refresh = self._refresh_server_tools(idx)
+        if self._endpoints_open:
+            # Servidor atrasado: anunciar as novas ferramentas quando a lista chegar
+            self._announce_when_refreshed(idx, refresh)
+        return True
+    
     async def stop(self):
         """Para a bridge"""
         logger.info("Parando Multi-WebSocket Bridge...")
         self.running = False
         
+        self._stop_event.set()
+        
+        if self._sweeper_task:
+            self._sweeper_task.cancel()
+        
+        for task in list(self._startup_tasks):
+            task.cancel()
+        
+        for supervisor in self._supervisors:
+            await supervisor.stop()
+        
+        if self._metrics_server:
+            await self._metrics_server.stop()
+        
+        if self.recorder:
+            self.recorder.close()
+        
         # Desconectar todos os WebSockets
         for ws_client in self.ws_clients:
             await ws_client.disconnect()
@@ -917,35 +1598,28 @@ class MultiWebSocketBridge:
         # Desconectar todos os servidores MCP
         for client in self.mcp_clients:
             await client.disconnect()
+        self.ssh_pool.close_all()
+        
+        logger.info("Filas dos servidores MCP: %s", self.get_queue_stats())
+        
+        if self.result_store is not None:
+            logger.info("Estatísticas da paginação de resultados: %s", self.result_store.stats())
+        
+        cache_stats = self.result_cache.stats()
+        if cache_stats:
+            logger.info("Estatísticas do cache de resultados: %s", cache_stats)
         
         logger.info("Multi-WebSocket Bridge parada")
     
     async def run(self):
         """Executa a bridge até ser interrompida"""
-        if not await self.start():
-            return
-        
         try:
-            # Manter rodando
-            while self.running:
-                await asyncio.sleep(1)
-                
-                # Verificar conexões WebSocket
-                for ws_client in self.ws_clients:
-                    if not ws_client.is_connected():
-                        pass  # WebSocket tem reconexão automática
-                
-                # Verificar reconexão de servidores MCP
-                for idx, client in enumerate(self.mcp_clients):
-                    if not client.connected:
-                        server_name = getattr(client, 'server_name', f'MCP-{idx}')
-                        logger.warning("MCP desconectado [%s], tentando reconectar...", server_name)
-                        try:
-                            if await client.connect():
-                                if not await client.initialize():
-                                    logger.error("Falha ao inicializar sessão MCP após reconexão: %s", server_name)
-                        except Exception as e:
-                            logger.error("Erro ao reconectar MCP [%s]: %s", server_name, e)
+            # Mesmo se a partida falhar, stop() encerra o que já foi iniciado (supervisores, servidores, métricas)
+            if not await self.start():
+                return
+            
+            # Manter rodando (WebSockets têm reconexão automática e cada servidor MCP tem seu supervisor)
+            await self._stop_event.wait()
         
         except KeyboardInterrupt:
             logger.info("Interrompido pelo usuário")
@@ -0,0 +1,116 @@
+"""
+Resolução de nomes de collections do ApeRAG para IDs com índice em memória
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (segundos) entre atualizações disparadas por nomes não encontrados
+MISS_REFRESH_INTERVAL = 10.0
+
+
+def parse_collections(result: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Extrai a lista de collections de um resultado de list_collections
+
+    Junta structuredContent.items e o JSON dentro de content[].text (formato alternativo),
+    nesta ordem: servidores que enviam os dois formatos podem ter o structuredContent sem
+    títulos ou IDs, e nesse caso as collections vêm do texto.
+    """
+    collections: List[Dict[str, Any]] = []
+    found = False
+    structured = result.get("structuredContent")
+    if isinstance(structured, dict) and isinstance(structured.get("items"), list):
+        collections.extend(structured["items"])
+        found = True
+
+    content = result.get("content")
+    if isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict) and "text" in item:
+                try:
+                    text_data = json_codec.loads(item["text"])
+                except (json_codec.JSONDecodeError, TypeError):
+                    continue
+                if isinstance(text_data, dict) and isinstance(text_data.get("items"), list):
+                    collections.extend(text_data["items"])
+                    found = True
+    return collections if found else None
+
+
+class CollectionResolver:
+    """Índice título (minúsculo) -> ID das collections de um servidor ApeRAG
+
+    O índice é carregado de uma vez via list_collections, atualizado em segundo plano
+    quando expira (ttl) ou quando um nome não é encontrado, e atualizações concorrentes
+    são coalescidas em uma única chamada.
+    """
+
+    def __init__(self, fetch_collections: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                 ttl: float, server_name: str = ""):
+        """
+        Args:
+            fetch_collections: Corrotina que chama list_collections e retorna o 'result' (ou None)
+            ttl: Validade do índice em segundos
+            server_name: Nome do servidor (para logs)
+        """
+        self._fetch_collections = fetch_collections
+        self.ttl = ttl
+        self.server_name = server_name
+        self._index: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_refresh_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def refresh(self) -> asyncio.Task:
+        """Inicia (ou reaproveita) a atualização do índice"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._load())
+        return self._refresh_task
+
+    async def _load(self) -> bool:
+        self._last_refresh_at = time.monotonic()
+        try:
+            result = await self._fetch_collections()
+        except Exception as e:
+            logger.error("Erro ao carregar collections de %s: %s", self.server_name, e, exc_info=True)
+            return False
+
+        collections = parse_collections(result) if isinstance(result, dict) else None
+        if collections is None:
+            logger.warning("Resposta de list_collections inválida de %s", self.server_name)
+            return False
+
+        index = {}
+        for coll in collections:
+            if not isinstance(coll, dict):
+                continue
+            coll_id = coll.get("id")
+            title = coll.get("title")
+            if coll_id and isinstance(title, str):
+                index.setdefault(title.lower(), coll_id)
+
+        self._index = index
+        self._expires_at = time.monotonic() + self.ttl
+        logger.info("Índice de collections de %s carregado: %d collections", self.server_name, len(index))
+        return True
+
+    async def resolve(self, collection_name: str) -> Optional[str]:
+        """Converte um nome (título, sem diferenciar maiúsculas) para ID"""
+        key = collection_name.lower()
+        coll_id = self._index.get(key)
+        if coll_id is not None:
+            if time.monotonic() >= self._expires_at:
+                # Índice expirado: servir o valor atual e atualizar em segundo plano
+                self.refresh()
+            return coll_id
+
+        # Nome desconhecido: pode ser collection nova ou renomeada
+        refreshing = self._refresh_task is not None and not self._refresh_task.done()
+        if refreshing or time.monotonic() - self._last_refresh_at >= MISS_REFRESH_INTERVAL:
+            await asyncio.shield(self.refresh())
+        return self._index.get(key)
@@ -0,0 +1,66 @@
+"""
+Codec JSON da bridge: orjson quando instalado, biblioteca padrão caso contrário
+
+Trabalha com bytes UTF-8 nas duas direções, para que as mensagens não sejam
+codificadas/decodificadas de novo a cada salto (WebSocket, stdio, HTTP).
+"""
+import json
+import logging
+from typing import Any, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional (requirements.txt)
+    orjson = None
+
+# Nome do backend em uso ("orjson" ou "json")
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Erro de parse (orjson.JSONDecodeError é subclasse de json.JSONDecodeError)
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    _ORJSON_SORTED_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serializa para bytes UTF-8 compactos (sem escapar caracteres não ASCII)
+
+    Raises:
+        TypeError/ValueError: Se o objeto não é serializável
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_SORTED_OPTIONS if sort_keys else _ORJSON_OPTIONS)
+        except TypeError:
+            # Tipos que o orjson rejeita e a biblioteca padrão aceita (ex: inteiros > 64 bits)
+            pass
+    return _stdlib_dumps(obj, sort_keys)
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    """Serializa para str (quando a API de destino exige texto)"""
+    return dumps(obj, sort_keys).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Faz o parse de bytes UTF-8 ou str
+
+    Raises:
+        JSONDecodeError: Se o conteúdo não é JSON válido
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError as e:
+        raise JSONDecodeError(f"UTF-8 inválido: {e}", "", 0) from e
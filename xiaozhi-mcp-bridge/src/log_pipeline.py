@@ -0,0 +1,203 @@
+"""
+Logging sem bloquear o event loop: fila + thread de gravação, amostragem e limite por classe de mensagem
+"""
+import atexit
+import copy
+import fnmatch
+import logging
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional, List, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_QUEUE_SIZE = 10000
+DEFAULT_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+# Limite de classes de mensagem acompanhadas pelo limite por segundo (mensagens montadas com f-string)
+MAX_RATE_LIMITED_CLASSES = 10000
+
+# Atributos padrão de LogRecord (o restante veio de extra= e entra no JSON)
+_RECORD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# Listeners em execução (parados, com a fila drenada, ao encerrar o processo)
+_listeners: List[QueueListener] = []
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, exc e os campos de extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        try:
+            return json_codec.dumps_str(entry)
+        except (TypeError, ValueError):
+            return json_codec.dumps_str({k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v)
+                                         for k, v in entry.items()})
+
+
+class _Rule:
+    """Regra de amostragem/limite para uma classe de mensagem (logger + texto do formato)"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.logger = str(config.get("logger", "*"))
+        self.match = str(config.get("match", ""))
+        self.sample_rate = float(config.get("sample_rate", 1.0))
+        self.rate_limit = float(config.get("rate_limit", 0))
+
+    def applies(self, record: logging.LogRecord) -> bool:
+        if not fnmatch.fnmatchcase(record.name, self.logger):
+            return False
+        return not self.match or str(record.msg).startswith(self.match)
+
+
+class SamplingFilter(logging.Filter):
+    """Amostragem e limite por segundo para mensagens ruidosas
+
+    A classe de uma mensagem é (logger, texto do formato antes dos argumentos), então
+    "Roteando tools/call para %s" é uma classe só, qualquer que seja a ferramenta. Vale a
+    primeira regra que casar; sem regra, default_rate_limit (0: sem limite). WARNING e
+    acima nunca são descartados. As mensagens cortadas pelo limite são contadas e
+    informadas na próxima mensagem da mesma classe que passar.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, default_rate_limit: float = 0):
+        super().__init__()
+        self.rules = [_Rule(rule) for rule in rules or ()]
+        self.default_rate_limit = float(default_rate_limit)
+        # classe -> (início da janela de 1s, mensagens na janela, suprimidas)
+        self._windows: Dict[Tuple[str, str], List[float]] = {}
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def _rule_for(self, record: logging.LogRecord) -> Optional[_Rule]:
+        for rule in self.rules:
+            if rule.applies(record):
+                return rule
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule_for(record)
+        rate_limit = self.default_rate_limit
+        if rule is not None:
+            if rule.sample_rate < 1.0 and random.random() >= rule.sample_rate:
+                self.sampled_out += 1
+                return False
+            rate_limit = rule.rate_limit or rate_limit
+        if rate_limit <= 0:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            if window is None and len(self._windows) >= MAX_RATE_LIMITED_CLASSES:
+                self._windows.clear()
+            suppressed = int(window[2]) if window is not None else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} [+{suppressed} mensagens semelhantes suprimidas]"
+            return True
+        if window[1] >= rate_limit:
+            window[2] += 1
+            self.rate_limited += 1
+            return False
+        window[1] += 1
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloqueia: com a fila cheia o registro é descartado e contado
+
+    O aviso com o total descartado entra na fila antes do próximo registro que couber.
+    (enqueue roda sob o lock do handler, então os contadores não precisam de outro lock.)
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Cópia do registro com a mensagem já montada e o traceback em exc_text
+
+        O QueueHandler padrão junta o traceback ao msg; aqui ele fica separado para o
+        formatter de destino (texto: anexado à linha; JSON: campo exc). O traceback é
+        formatado antes de enfileirar para não manter os frames vivos até a gravação.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped != self._reported:
+                self._report_dropped()
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _report_dropped(self):
+        count = self.dropped - self._reported
+        notice = logging.LogRecord(logger.name, logging.WARNING, __file__, 0,
+                                   "%d mensagens de log descartadas (fila de log cheia)", (count,), None)
+        self.queue.put_nowait(notice)
+        self._reported = self.dropped
+
+
+def background_handler(*handlers: logging.Handler,
+                       queue_size: int = DEFAULT_LOG_QUEUE_SIZE) -> DroppingQueueHandler:
+    """Handler que só enfileira; uma thread grava nos handlers de destino
+
+    Os handlers de destino (arquivo, console) podem bloquear em disco ou terminal sem
+    travar o event loop. A fila é drenada ao encerrar o processo.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(stop_background_logging)
+    _listeners.append(listener)
+    return DroppingQueueHandler(log_queue)
+
+
+def stop_background_logging():
+    """Para as threads de gravação após gravar o que está na fila"""
+    while _listeners:
+        listener = _listeners.pop()
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def build_formatter(log_format: str = "text") -> logging.Formatter:
+    """Formatter de texto (padrão) ou JSON (log_format: "json")"""
+    if str(log_format).lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(DEFAULT_LOG_FORMAT, datefmt=DEFAULT_LOG_DATEFMT)
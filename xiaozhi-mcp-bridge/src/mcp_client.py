@@ -5,23 +5,41 @@ import asyncio
 import logging
 import subprocess
 import os
-from typing import Optional, Callable, Dict, Any
+import threading
+from typing import Optional, Callable, Dict, Any, Union, Set
 from message_handler import MessageHandler
+from raw_response import RawResponse
+from ssh_pool import SSHTransportPool, ssh_multiplex_options
 import paramiko
 from io import StringIO
 
 logger = logging.getLogger(__name__)
 
+# Maior linha (mensagem JSON-RPC) aceita do servidor MCP
+DEFAULT_MAX_LINE_SIZE = 64 * 1024 * 1024  # 64MB
+# Bytes lidos por chamada recv() no canal SSH (paramiko)
+SSH_CHANNEL_READ_SIZE = 65536
+# Máximo de bytes juntados em uma escrita (mensagens enfileiradas enquanto a anterior era enviada)
+WRITE_BATCH_MAX_BYTES = 1024 * 1024  # 1MB
+
 
 class MCPClient:
     """Cliente MCP que se conecta via SSH/STDIO"""
     
-    def __init__(self, ssh_host: str, ssh_user: str, ssh_command: str, ssh_port: int = 22, ssh_password: Optional[str] = None):
+    def __init__(self, ssh_host: str, ssh_user: str, ssh_command: str, ssh_port: int = 22, ssh_password: Optional[str] = None,
+                 max_line_size: int = DEFAULT_MAX_LINE_SIZE, ssh_pool: Optional[SSHTransportPool] = None,
+                 ssh_multiplex: bool = True):
         self.ssh_host = ssh_host
         self.ssh_user = ssh_user
         self.ssh_command = ssh_command
         self.ssh_port = ssh_port
         self.ssh_password = ssh_password
+        # Maior mensagem (linha JSON) aceita do servidor
+        self.max_line_size = max_line_size
+        # Conexões SSH compartilhadas (paramiko); sem pool, cada cliente tem a sua
+        self.ssh_pool = ssh_pool if ssh_pool is not None else SSHTransportPool(idle_ttl=0)
+        # ControlMaster do OpenSSH no caminho via subprocess
+        self.ssh_multiplex = ssh_multiplex
         self.process: Optional[subprocess.Popen] = None
         self.ssh_client: Optional[paramiko.SSHClient] = None
         self.ssh_channel: Optional[paramiko.Channel] = None
@@ -34,6 +52,11 @@ class MCPClient:
         self._read_task: Optional[asyncio.Task] = None
         self._request_id_counter = 0
         self._pending_requests: Dict[Any, asyncio.Future] = {}
+        # IDs de requisições cuja resposta é entregue em bytes (RawResponse), sem parse
+        self._raw_request_ids: Set[Any] = set()
+        # Escritas pendentes (bytes, future de conclusão), consumidas pela task de escrita
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
     
     async def connect(self) -> bool:
         """Conecta ao servidor MCP via SSH/STDIO"""
@@ -64,26 +87,13 @@ class MCPClient:
         """Conecta usando paramiko (suporta senha)"""
         try:
             logger.info("Usando paramiko para conectar com senha SSH")
-            # Criar cliente SSH
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            # Canal de uma conexão anterior (reconexão) é fechado; a conexão SSH volta ao pool
+            self._release_ssh()
             
-            # Conectar em thread separada (paramiko não é async nativo)
-            logger.debug("Conectando SSH via paramiko: %s@%s:%d", self.ssh_user, self.ssh_host, self.ssh_port)
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.ssh_client.connect(
-                    hostname=self.ssh_host,
-                    port=self.ssh_port,
-                    username=self.ssh_user,
-                    password=self.ssh_password,
-                    timeout=30,  # Aumentar timeout de conexão SSH
-                    look_for_keys=False,
-                    allow_agent=False
-                )
-            )
-            logger.info("Conexão SSH estabelecida com sucesso")
+            # Conexão SSH compartilhada com outros servidores do mesmo host (handshake só na primeira)
+            self.ssh_client = await self.ssh_pool.acquire(self.ssh_host, self.ssh_port, self.ssh_user,
+                                                          self.ssh_password)
+            loop = asyncio.get_running_loop()
             
             # Executar comando e obter canal
             transport = self.ssh_client.get_transport()
@@ -92,11 +102,9 @@ class MCPClient:
                 return False
             
             logger.debug("Executando comando remoto: %s", self.ssh_command)
-            self.ssh_channel = transport.open_session()
-            self.ssh_channel.exec_command(self.ssh_command)
-            
-            # Aguardar um pouco para o comando iniciar
-            await asyncio.sleep(0.5)
+            # open_session/exec_command aguardam resposta do servidor SSH: fora do event loop
+            self.ssh_channel = await loop.run_in_executor(None, transport.open_session)
+            await loop.run_in_executor(None, self.ssh_channel.exec_command, self.ssh_command)
             
             # Verificar se o canal está ativo
             if self.ssh_channel.closed:
@@ -106,50 +114,14 @@ class MCPClient:
             logger.debug("Canal SSH aberto e pronto")
             
             # Criar StreamReader para ler do canal
-            self.reader = asyncio.StreamReader()
-            
-            # Task para ler do canal SSH e alimentar reader
-            async def feed_reader():
-                try:
-                    logger.debug("Iniciando feed_reader para canal SSH")
-                    while self.connected and self.ssh_channel and not self.ssh_channel.closed:
-                        if self.ssh_channel.recv_ready():
-                            data = self.ssh_channel.recv(4096)
-                            if not data:
-                                logger.debug("Nenhum dado recebido do canal SSH")
-                                break
-                            logger.debug("Dados recebidos do canal SSH: %d bytes", len(data))
-                            self.reader.feed_data(data)
-                        else:
-                            await asyncio.sleep(0.1)
-                except Exception as e:
-                    logger.error("Erro ao alimentar reader do canal SSH: %s", e, exc_info=True)
-                finally:
-                    logger.debug("feed_reader terminando")
-                    if not self.reader.at_eof():
-                        self.reader.feed_eof()
-            
-            # Iniciar task para alimentar reader
-            asyncio.create_task(feed_reader())
-            
-            # Task para monitorar stderr do canal SSH
-            async def monitor_stderr():
-                try:
-                    logger.debug("Iniciando monitoramento de stderr do canal SSH")
-                    while self.connected and self.ssh_channel and not self.ssh_channel.closed:
-                        if self.ssh_channel.recv_stderr_ready():
-                            data = self.ssh_channel.recv_stderr(4096)
-                            if data:
-                                error_msg = data.decode('utf-8', errors='ignore').strip()
-                                if error_msg:
-                                    logger.warning("SSH stderr (paramiko): %s", error_msg)
-                        await asyncio.sleep(0.1)
-                except Exception as e:
-                    logger.debug("Erro ao monitorar stderr: %s", e)
+            self.reader = asyncio.StreamReader(limit=self.max_line_size)
             
-            asyncio.create_task(monitor_stderr())
+            # Threads com recv bloqueante alimentam o reader assim que os dados chegam
+            # (sem polling: latência mínima e nenhum despertar com o canal ocioso)
+            self._start_channel_threads(loop)
             
             self.connected = True
+            self._start_writer()
             
             # Iniciar task de leitura
             self._read_task = asyncio.create_task(self._read_loop())
@@ -161,6 +133,62 @@ class MCPClient:
             logger.error("Erro ao conectar com paramiko: %s", e, exc_info=True)
             return False
     
+    def _release_ssh(self):
+        """Fecha o canal SSH e libera a referência à conexão do pool"""
+        if self.ssh_channel:
+            try:
+                self.ssh_channel.close()
+            except Exception as e:
+                logger.debug("Erro ao fechar canal SSH: %s", e)
+        if self.ssh_client:
+            self.ssh_pool.release(self.ssh_host, self.ssh_port, self.ssh_user, self.ssh_client)
+            self.ssh_client = None
+    
+    def _start_channel_threads(self, loop: asyncio.AbstractEventLoop):
+        """Inicia as threads de leitura de stdout e stderr do canal SSH (paramiko)
+        
+        recv() bloqueia até haver dados ou o canal fechar; os bytes são entregues ao
+        StreamReader no event loop via call_soon_threadsafe.
+        """
+        channel = self.ssh_channel
+        reader = self.reader
+        channel.settimeout(None)
+        
+        def read_stdout():
+            logger.debug("Thread de leitura do canal SSH iniciada")
+            try:
+                while True:
+                    data = channel.recv(SSH_CHANNEL_READ_SIZE)
+                    if not data:
+                        logger.debug("Canal SSH encerrado (EOF)")
+                        break
+                    loop.call_soon_threadsafe(reader.feed_data, data)
+            except Exception as e:
+                if not channel.closed:
+                    logger.error("Erro ao ler do canal SSH: %s", e, exc_info=True)
+            finally:
+                try:
+                    loop.call_soon_threadsafe(reader.feed_eof)
+                except RuntimeError:
+                    # Event loop já encerrado
+                    pass
+        
+        def read_stderr():
+            try:
+                while True:
+                    data = channel.recv_stderr(SSH_CHANNEL_READ_SIZE)
+                    if not data:
+                        break
+                    error_msg = data.decode('utf-8', errors='replace').strip()
+                    if error_msg:
+                        logger.warning("SSH stderr (paramiko): %s", error_msg)
+            except Exception as e:
+                logger.debug("Erro ao monitorar stderr: %s", e)
+        
+        name = f"mcp-ssh-{self.ssh_host}"
+        threading.Thread(target=read_stdout, name=f"{name}-stdout", daemon=True).start()
+        threading.Thread(target=read_stderr, name=f"{name}-stderr", daemon=True).start()
+    
     async def _connect_with_subprocess(self) -> bool:
         """Conecta usando subprocess (quando não tem senha)"""
         try:
@@ -239,10 +267,14 @@ class MCPClient:
                 logger.debug("Comando processado: %s", cmd)
             else:
                 # Construir comando SSH para servidor remoto
+                # (com multiplexação, processos ssh para o mesmo host compartilham uma conexão)
+                multiplex = (ssh_multiplex_options(self.ssh_pool.keepalive, self.ssh_pool.idle_ttl)
+                             if self.ssh_multiplex else [])
                 ssh_cmd = [
                     "ssh",
                     "-o", "StrictHostKeyChecking=no",
                     "-o", "UserKnownHostsFile=/dev/null",
+                    *multiplex,
                     "-p", str(self.ssh_port),
                     f"{self.ssh_user}@{self.ssh_host}",
                     self.ssh_command
@@ -263,7 +295,8 @@ class MCPClient:
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                cwd=cwd
+                cwd=cwd,
+                limit=self.max_line_size
             )
             
             # Verificar se processo foi criado corretamente
@@ -271,33 +304,14 @@ class MCPClient:
                 logger.error("Processo SSH não retornou stdout/stdin válidos")
                 return False
             
-            # Criar StreamReader manualmente
-            self.reader = asyncio.StreamReader()
-            
-            # Criar uma task para ler do stdout e alimentar o reader
-            async def feed_reader():
-                try:
-                    while self.connected and self.process and self.process.returncode is None:
-                        if self.process.stdout:
-                            data = await self.process.stdout.read(4096)
-                            if not data:
-                                break
-                            self.reader.feed_data(data)
-                        else:
-                            await asyncio.sleep(0.1)
-                except Exception as e:
-                    logger.debug("Erro ao alimentar reader: %s", e)
-                finally:
-                    if not self.reader.at_eof():
-                        self.reader.feed_eof()
-            
-            # Iniciar task para alimentar reader
-            asyncio.create_task(feed_reader())
+            # Ler direto do stdout do processo (limit = maior linha aceita)
+            self.reader = self.process.stdout
             
             # Iniciar task de monitoramento de stderr
             asyncio.create_task(self._monitor_stderr())
             
             self.connected = True
+            self._start_writer()
             
             # Iniciar task de leitura
             self._read_task = asyncio.create_task(self._read_loop())
@@ -323,53 +337,106 @@ class MCPClient:
         except Exception as e:
             logger.debug("Erro ao monitorar stderr: %s", e)
     
+    def _start_writer(self):
+        """Inicia a task de escrita (uma por conexão; a de uma conexão anterior é cancelada)"""
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop(self._write_queue))
+    
+    async def _write(self, data: bytes):
+        """Enfileira uma mensagem já serializada e aguarda ela ser escrita
+        
+        Raises:
+            ConnectionError/OSError: Se a escrita falhou ou o canal não está disponível
+        """
+        if self._write_queue is None or self._writer_task is None or self._writer_task.done():
+            raise ConnectionError("task de escrita não está ativa")
+        done = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((data, done))
+        await done
+    
+    async def _writer_loop(self, write_queue: asyncio.Queue):
+        """Única task que escreve no stdin do servidor
+        
+        Mensagens enfileiradas enquanto a escrita anterior acontecia vão juntas em uma
+        escrita e um drain. No paramiko, sendall (bloqueante) roda fora do event loop.
+        """
+        loop = asyncio.get_running_loop()
+        waiters = []
+        try:
+            while True:
+                data, done = await write_queue.get()
+                chunks = [data]
+                waiters = [done]
+                size = len(data)
+                while size < WRITE_BATCH_MAX_BYTES and not write_queue.empty():
+                    data, done = write_queue.get_nowait()
+                    chunks.append(data)
+                    waiters.append(done)
+                    size += len(data)
+                payload = b"".join(chunks) if len(chunks) > 1 else chunks[0]
+                
+                error: Optional[BaseException] = None
+                try:
+                    if self.ssh_channel is not None:
+                        if self.ssh_channel.closed:
+                            raise ConnectionError("canal SSH fechado")
+                        await loop.run_in_executor(None, self.ssh_channel.sendall, payload)
+                    elif self.process and self.process.stdin:
+                        self.process.stdin.write(payload)
+                        await self.process.stdin.drain()
+                    else:
+                        raise ConnectionError("stdin do processo não disponível")
+                except (OSError, EOFError) as e:
+                    error = e if isinstance(e, OSError) else ConnectionError(str(e))
+                
+                if len(chunks) > 1:
+                    logger.debug("Escrita agrupada: %d mensagens, %d bytes", len(chunks), size)
+                for waiter in waiters:
+                    if not waiter.done():
+                        if error is None:
+                            waiter.set_result(None)
+                        else:
+                            waiter.set_exception(error)
+                waiters = []
+        except Exception as e:
+            logger.error("Erro na task de escrita do servidor MCP: %s", e, exc_info=True)
+        finally:
+            # Conexão encerrada: quem aguarda escrita recebe erro
+            while not write_queue.empty():
+                waiters.append(write_queue.get_nowait()[1])
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(ConnectionError("conexão com servidor MCP encerrada"))
+    
     async def _read_loop(self):
-        """Loop de leitura de mensagens do servidor MCP"""
-        buffer = ""
+        """Loop de leitura de mensagens do servidor MCP
+        
+        Mensagens JSON-RPC são separadas por \n: readuntil entrega cada linha completa em
+        bytes (sem decodificar blocos soltos nem recopiar o buffer a cada leitura). Linhas
+        maiores que max_line_size são descartadas e reportadas.
+        """
         try:
-            # Verificar se está usando paramiko ou subprocess
-            using_paramiko = self.ssh_channel is not None
-            using_subprocess = self.process is not None
-            
-            while self.connected and (using_paramiko or (using_subprocess and self.process.returncode is None)):
+            while self.connected:
                 try:
-                    # Ler dados do stdout
-                    if self.reader:
-                        try:
-                            data = await asyncio.wait_for(
-                                self.reader.read(4096),
-                                timeout=1.0
-                            )
-                            if not data:
-                                # Verificar se processo ainda está rodando
-                                if self.process.returncode is not None:
-                                    logger.warning("Processo SSH terminou com código: %d", self.process.returncode)
-                                    break
-                                continue
-                            
-                            buffer += data.decode('utf-8', errors='ignore')
-                            
-                            # Processar linhas completas (mensagens JSON-RPC são separadas por \n)
-                            while '\n' in buffer:
-                                line, buffer = buffer.split('\n', 1)
-                                line = line.strip()
-                                if line:
-                                    await self._process_message(line)
-                        except asyncio.TimeoutError:
-                            # Timeout é normal, continuar
-                            continue
-                        except BrokenPipeError:
-                            logger.warning("Pipe quebrado, desconectando")
-                            break
-                        except Exception as e:
-                            logger.error("Erro ao ler dados: %s", e, exc_info=True)
-                            break
+                    line = await self.reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    # EOF: processo terminou ou canal SSH fechou
+                    if e.partial.strip():
+                        logger.warning("Mensagem incompleta (%d bytes) descartada no fim do stream", len(e.partial))
+                    if self.process is not None and self.process.returncode is not None:
+                        logger.warning("Processo SSH terminou com código: %d", self.process.returncode)
                     else:
-                        await asyncio.sleep(0.1)
-                                
-                except Exception as e:
-                    logger.error("Erro no loop de leitura: %s", e, exc_info=True)
+                        logger.warning("Stream do servidor MCP encerrado")
                     break
+                except asyncio.LimitOverrunError as e:
+                    await self._discard_oversized_line(e.consumed)
+                    continue
+                
+                line = line.strip()
+                if line:
+                    await self._process_message(line)
                     
         except Exception as e:
             logger.error("Erro fatal no loop de leitura: %s", e, exc_info=True)
@@ -378,8 +445,41 @@ class MCPClient:
             if self.on_error:
                 self.on_error("Conexão com servidor MCP perdida")
     
-    async def _process_message(self, line: str):
+    async def _discard_oversized_line(self, consumed: int):
+        """Descarta uma linha maior que max_line_size e falha a requisição dela (se o ID estiver no início)"""
+        head = await self.reader.readexactly(consumed)
+        size = len(head)
+        while True:
+            try:
+                size += len(await self.reader.readuntil(b'\n'))
+                break
+            except asyncio.LimitOverrunError as e:
+                size += len(await self.reader.readexactly(e.consumed))
+        
+        raw = RawResponse.scan(head, complete=False)
+        request_id = raw.id if raw is not None else None
+        logger.error("Mensagem do servidor MCP %s com %d bytes excede max_line_size (%d bytes), descartada (id=%s)",
+                     getattr(self, 'server_name', self.ssh_host), size, self.max_line_size, request_id)
+        future = self._pending_requests.pop(request_id, None) if request_id is not None else None
+        if future is not None and not future.done():
+            future.set_result(self.message_handler.create_error_response(
+                request_id, -32000,
+                f"Resposta do servidor MCP muito grande ({size} bytes, limite max_line_size={self.max_line_size})"
+            ))
+    
+    async def _process_message(self, line: Union[str, bytes]):
         """Processa uma mensagem recebida"""
+        # Respostas pedidas em bytes vão direto para quem aguarda, sem parse
+        if self._raw_request_ids and isinstance(line, bytes):
+            raw = RawResponse.scan(line)
+            if raw is not None:
+                request_id = raw.id
+                if request_id in self._raw_request_ids and request_id in self._pending_requests:
+                    future = self._pending_requests.pop(request_id)
+                    if not future.done():
+                        future.set_result(raw)
+                    return
+        
         message = self.message_handler.parse_message(line)
         if not message:
             return
@@ -401,8 +501,15 @@ class MCPClient:
         if self.on_message:
             self.on_message(message)
     
-    async def send_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Envia uma mensagem e aguarda resposta"""
+    async def send_message(self, message: Dict[str, Any],
+                           raw: bool = False) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Envia uma mensagem e aguarda resposta
+        
+        Args:
+            message: Mensagem JSON-RPC
+            raw: Entregar a resposta como RawResponse (bytes recebidos, sem parse) quando
+                o ID dela puder ser localizado nos bytes; caso contrário, vem o dict de sempre
+        """
         # Verificar conexão (paramiko ou subprocess)
         if not self.connected:
             logger.error("Não conectado ao servidor MCP")
@@ -412,6 +519,7 @@ class MCPClient:
             logger.error("Canal de comunicação não disponível")
             return None
         
+        future = None
         try:
             # Validar mensagem
             if not self.message_handler.validate_jsonrpc(message):
@@ -419,43 +527,37 @@ class MCPClient:
                 return None
             
             # Se é uma requisição, criar future para aguardar resposta
-            future = None
             if self.message_handler.is_request(message):
                 request_id = message.get("id")
                 future = asyncio.Future()
                 self._pending_requests[request_id] = future
+                if raw:
+                    self._raw_request_ids.add(request_id)
             
-            # Formatar e enviar mensagem
-            message_str = self.message_handler.format_message(message)
-            if not message_str:
+            # Formatar e enviar mensagem (bytes UTF-8 com newline, padrão STDIO)
+            data = self.message_handler.encode_message(message)
+            if not data:
                 logger.error("Falha ao formatar mensagem")
                 return None
+            data += b"\n"
             
-            # Enviar com newline (padrão STDIO)
             try:
-                if self.ssh_channel and not self.ssh_channel.closed:
-                    # Usar paramiko
-                    data = (message_str + "\n").encode('utf-8')
-                    self.ssh_channel.send(data)
-                elif self.process and self.process.stdin:
-                    # Usar subprocess
-                    data = (message_str + "\n").encode('utf-8')
-                    self.process.stdin.write(data)
-                    await self.process.stdin.drain()
-                else:
-                    logger.error("Canal stdin não disponível")
-                    self.connected = False
-                    return None
+                # Escrita pela task de escrita do cliente (sem intercalar com outras chamadas)
+                await self._write(data)
             except BrokenPipeError:
                 logger.error("Pipe quebrado ao enviar mensagem")
                 self.connected = False
                 return None
+            except ConnectionError as e:
+                logger.error("Canal stdin não disponível: %s", e)
+                self.connected = False
+                return None
             except Exception as e:
                 logger.error("Erro ao enviar mensagem: %s", e, exc_info=True)
                 self.connected = False
                 return None
             
-            logger.debug("Mensagem enviada ao servidor MCP: %s", message_str)
+            logger.debug("Mensagem enviada ao servidor MCP: %s", data)
             
             # Se é requisição, aguardar resposta
             if future:
@@ -475,6 +577,12 @@ class MCPClient:
         except Exception as e:
             logger.error("Erro ao enviar mensagem ao servidor MCP: %s", e)
             return None
+        finally:
+            if raw:
+                self._raw_request_ids.discard(message.get("id"))
+            # Cancelada (ex: prazo da bridge) ou sem resposta: não deixar a requisição pendente
+            if future is not None and self._pending_requests.get(message.get("id")) is future:
+                del self._pending_requests[message.get("id")]
     
     async def initialize(self) -> bool:
         """Inicializa a sessão MCP"""
@@ -511,19 +619,16 @@ class MCPClient:
             except asyncio.CancelledError:
                 pass
         
-        # Fechar canal SSH (paramiko)
-        if self.ssh_channel:
+        if self._writer_task:
+            self._writer_task.cancel()
             try:
-                self.ssh_channel.close()
-            except Exception as e:
-                logger.debug("Erro ao fechar canal SSH: %s", e)
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
         
-        # Fechar cliente SSH (paramiko)
-        if self.ssh_client:
-            try:
-                self.ssh_client.close()
-            except Exception as e:
-                logger.debug("Erro ao fechar cliente SSH: %s", e)
+        # Fechar canal SSH e devolver a conexão ao pool (paramiko)
+        self._release_ssh()
         
         # Fechar subprocess
         if self.process and self.process.stdin:
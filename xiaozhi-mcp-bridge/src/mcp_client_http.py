@@ -3,10 +3,12 @@ Cliente MCP para conectar ao servidor MCP via HTTP/HTTPS
 """
 import asyncio
 import logging
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, Union
 from message_handler import MessageHandler
 import aiohttp
-import json
+import json_codec
+from raw_response import RawResponse
+from sse_parser import SSEParser, SSEEvent
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,8 @@ class MCPClientHTTP:
         self.on_error: Optional[Callable[[str], None]] = None
         self._request_id_counter = 0
         self._pending_requests: Dict[Any, asyncio.Future] = {}
+        # Último "id:" de evento SSE recebido (retomada de stream)
+        self.last_event_id: Optional[str] = None
         self._session: Optional[aiohttp.ClientSession] = None
     
     async def connect(self) -> bool:
@@ -105,8 +109,15 @@ class MCPClientHTTP:
                 self.on_error(f"Erro ao conectar: {str(e)}")
             return False
     
-    async def send_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Envia uma mensagem e aguarda resposta"""
+    async def send_message(self, message: Dict[str, Any],
+                           raw: bool = False) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Envia uma mensagem e aguarda resposta
+        
+        Args:
+            message: Mensagem JSON-RPC
+            raw: Entregar a resposta como RawResponse (bytes recebidos, sem parse) quando
+                o ID dela puder ser localizado nos bytes; caso contrário, vem o dict de sempre
+        """
         if not self.connected or not self._session:
             logger.error("Não conectado ao servidor MCP HTTP")
             return None
@@ -154,20 +165,14 @@ class MCPClientHTTP:
                 # Garantir que Authorization está nos headers da requisição
                 request_headers['Authorization'] = auth_header
                 
-                # Log detalhado do Authorization header e mensagem
-                auth_header_log = request_headers.get('Authorization', 'NÃO ENCONTRADO')
-                method_name = message.get('method', 'unknown')
-                params = message.get('params', {})
-                tool_name = params.get('name', 'unknown') if isinstance(params, dict) else 'unknown'
-                
-                # Log completo do Authorization header (sem truncar para debug)
-                logger.info("Enviando requisição HTTP POST para %s - Method: %s, Tool: %s", 
-                          self.url, method_name, tool_name)
-                logger.info("Authorization header completo: %s (tamanho: %d)", auth_header, len(auth_header))
-                logger.info("API key usada: %s (tamanho: %d)", self.api_key, len(self.api_key) if self.api_key else 0)
-                
-                # Log completo dos headers antes de enviar
-                logger.debug("Headers completos da requisição: %s", {k: (v[:30] + '...' if len(v) > 30 else v) if k.lower() == 'authorization' else v for k, v in request_headers.items()})
+                # Logs por requisição: só em DEBUG (montados apenas se o nível estiver ativo), sem a chave
+                if logger.isEnabledFor(logging.DEBUG):
+                    method_name = message.get('method', 'unknown')
+                    params = message.get('params', {})
+                    tool_name = params.get('name', 'unknown') if isinstance(params, dict) else 'unknown'
+                    logger.debug("Enviando requisição HTTP POST para %s - Method: %s, Tool: %s", 
+                                 self.url, method_name, tool_name)
+                    logger.debug("Headers da requisição: %s", {k: f"*** (tamanho: {len(v)})" if k.lower() == 'authorization' else v for k, v in request_headers.items()})
                 
                 # Garantir que Authorization está presente e correto antes de enviar
                 if 'Authorization' not in request_headers or not request_headers['Authorization']:
@@ -180,11 +185,12 @@ class MCPClientHTTP:
                 
                 # Log final antes de enviar (para debug)
                 logger.debug("URL da requisição: %s", self.url)
-                logger.debug("Authorization header final: %s", request_headers.get('Authorization', 'NÃO ENCONTRADO'))
                 
+                # Corpo serializado uma vez pelo codec da bridge (bytes UTF-8)
+                body = self.message_handler.encode_message(message)
                 async with self._session.post(
                     self.url,
-                    json=message,
+                    data=body,
                     headers=request_headers
                 ) as response:
                     # Aceitar códigos 2xx como sucesso (200 OK, 202 Accepted, etc)
@@ -205,24 +211,27 @@ class MCPClientHTTP:
                     content_type = response.headers.get('Content-Type', '').lower()
                     
                     # Ler resposta (pode ser JSON ou SSE)
+                    response_body = b""
                     try:
                         if 'text/event-stream' in content_type:
-                            # Processar Server-Sent Events (SSE)
-                            response_text = await response.text()
-                            response_data = self._parse_sse_response(response_text)
-                            if not response_data:
-                                logger.error("Falha ao parsear resposta SSE: %s", response_text[:200])
+                            # SSE lido conforme chega: notificações intermediárias vão para on_message
+                            response_data = await self._read_sse_stream(response, message.get("id"), raw)
+                            if response_data is None:
                                 if future:
+                                    logger.error("Stream SSE terminou sem a resposta da requisição (id=%s)",
+                                                 message.get("id"))
                                     request_id = message.get("id")
                                     if request_id in self._pending_requests:
                                         del self._pending_requests[request_id]
                                 return None
                         else:
                             # Resposta JSON normal
-                            response_data = await response.json()
+                            response_body = await response.read()
+                            raw_response = RawResponse.scan(response_body) if raw else None
+                            response_data = raw_response if raw_response is not None else json_codec.loads(response_body)
                     except Exception as e:
-                        error_text = await response.text()
-                        logger.error("Erro ao fazer parse da resposta: %s. Resposta: %s", e, error_text[:500])
+                        logger.error("Erro ao fazer parse da resposta: %s. Resposta: %s", e,
+                                     response_body[:500].decode('utf-8', errors='replace'))
                         if future:
                             request_id = message.get("id")
                             if request_id in self._pending_requests:
@@ -305,34 +314,54 @@ class MCPClientHTTP:
         
         logger.info("Desconectado do servidor MCP HTTP")
     
-    def _parse_sse_response(self, sse_text: str) -> Optional[Dict[str, Any]]:
-        """Parse Server-Sent Events (SSE) e extrai JSON-RPC"""
+    async def _read_sse_stream(self, response: aiohttp.ClientResponse, request_id: Any,
+                               raw: bool = False) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Lê o corpo text/event-stream conforme chega, até a resposta da requisição
+        
+        Cada evento completo é tratado na hora: a resposta com o ID da requisição é
+        retornada (como RawResponse se raw e o ID estiver em posição conhecida); as demais
+        mensagens (progresso, logs, requisições do servidor) vão para on_message.
+        
+        Returns:
+            Resposta da requisição, ou None se o stream terminou sem ela
+        """
+        parser = SSEParser()
+        async for chunk in response.content.iter_any():
+            for event in parser.feed(chunk):
+                found = self._handle_sse_event(event, request_id, raw)
+                if found is not None:
+                    return found
+        for event in parser.close():
+            found = self._handle_sse_event(event, request_id, raw)
+            if found is not None:
+                return found
+        return None
+    
+    def _handle_sse_event(self, event: SSEEvent, request_id: Any,
+                          raw: bool) -> Optional[Union[Dict[str, Any], RawResponse]]:
+        """Trata um evento SSE; retorna a resposta se for a da requisição aguardada"""
+        if event.id:
+            self.last_event_id = event.id
+        if raw and request_id is not None:
+            raw_response = RawResponse.scan(event.data)
+            if raw_response is not None and raw_response.id == request_id:
+                return raw_response
         try:
-            lines = sse_text.strip().split('\n')
-            data_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('data: '):
-                    # Extrair JSON após "data: "
-                    json_str = line[6:]  # Remove "data: "
-                    data_lines.append(json_str)
-            
-            # Se encontrou dados SSE, parsear o primeiro JSON válido
-            for json_str in data_lines:
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    continue
-            
-            # Se não encontrou formato SSE, tentar parsear como JSON direto
-            try:
-                return json.loads(sse_text)
-            except json.JSONDecodeError:
-                pass
-            
-            return None
-        except Exception as e:
-            logger.error("Erro ao parsear SSE: %s", e)
+            payload = json_codec.loads(event.data)
+        except json_codec.JSONDecodeError:
+            logger.warning("Evento SSE '%s' com JSON inválido ignorado (%d bytes)", event.event, len(event.data))
             return None
+        
+        found = None
+        for message in payload if isinstance(payload, list) else [payload]:
+            if not isinstance(message, dict):
+                continue
+            if (found is None and request_id is not None and self.message_handler.is_response(message)
+                    and message.get("id") == request_id):
+                found = message
+            elif self.on_message:
+                # Notificação intermediária (ex: notifications/progress) ou resposta de outra requisição
+                logger.debug("Mensagem intermediária no stream SSE: %s", message.get("method", message.get("id")))
+                self.on_message(message)
+        return found
 
@@ -0,0 +1,141 @@
+"""
+Supervisor de conexão de um cliente MCP com reconexão por backoff exponencial
+"""
+import asyncio
+import logging
+import random
+from typing import Optional, Callable, Union
+from mcp_client import MCPClient
+from mcp_client_http import MCPClientHTTP
+
+logger = logging.getLogger(__name__)
+
+# Estados de saúde de um servidor MCP
+HEALTHY = "healthy"    # Conectado e inicializado
+DEGRADED = "degraded"  # Desconectado, tentando reconectar
+DOWN = "down"          # Várias tentativas seguidas falharam
+
+# Intervalo (segundos) de verificação de segurança quando nenhum evento chega
+# (ex: falha de escrita que marca o cliente como desconectado sem chamar on_error)
+HEALTH_CHECK_INTERVAL = 30.0
+
+
+class MCPSupervisor:
+    """Supervisiona um cliente MCP e reconecta quando ele cai
+
+    A task fica dormindo até ser acordada por notify_disconnected() (ligado ao on_error
+    do cliente). Cada reconexão usa backoff exponencial com jitter, sem bloquear os
+    demais servidores.
+    """
+
+    def __init__(self, client: Union[MCPClient, MCPClientHTTP], server_name: str,
+                 initial_delay: float = 1.0, max_delay: float = 60.0, down_after: int = 3,
+                 on_reconnected: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            client: Cliente MCP supervisionado
+            server_name: Nome do servidor (para logs)
+            initial_delay: Espera (segundos) antes da primeira tentativa de reconexão
+            max_delay: Espera máxima (segundos) entre tentativas
+            down_after: Falhas seguidas para considerar o servidor fora do ar (down)
+            on_reconnected: Callback chamado após reconectar e inicializar com sucesso
+        """
+        self.client = client
+        self.server_name = server_name
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.down_after = down_after
+        self.on_reconnected = on_reconnected
+        self.health = HEALTHY if client.connected else DOWN
+        self.consecutive_failures = 0
+        self.reconnect_count = 0
+        # Serializa tentativas de conexão (partida x supervisor)
+        self.connect_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Inicia a task do supervisor"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para a task do supervisor"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def notify_disconnected(self):
+        """Acorda o supervisor (cliente reportou erro ou desconexão)"""
+        if not self.client.connected and self.health == HEALTHY:
+            self.health = DEGRADED
+        self._wake.set()
+
+    def mark_connected(self):
+        """Registra que o cliente está conectado e inicializado"""
+        self.health = HEALTHY
+        self.consecutive_failures = 0
+
+    def is_available(self) -> bool:
+        """Servidor pode receber requisições agora (falha rápida caso contrário)"""
+        return self.health == HEALTHY and self.client.connected
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=HEALTH_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if self.client.connected:
+                continue
+            if self.health == HEALTHY:
+                self.health = DEGRADED
+            await self._reconnect()
+
+    async def _reconnect(self):
+        """Reconecta com backoff exponencial e jitter até conseguir"""
+        delay = self.initial_delay
+        while True:
+            # Jitter evita que vários servidores tentem em sincronia
+            wait = delay * random.uniform(0.5, 1.5)
+            logger.warning("MCP desconectado [%s] (%s), tentando reconectar em %.1fs...",
+                           self.server_name, self.health, wait)
+            await asyncio.sleep(wait)
+
+            async with self.connect_lock:
+                if self.client.connected:
+                    # Conectado por outro caminho (ex: inicialização da bridge)
+                    self.mark_connected()
+                    return
+                if await self._connect_once():
+                    self.mark_connected()
+                    self.reconnect_count += 1
+                    logger.info("Servidor MCP reconectado: %s", self.server_name)
+                    if self.on_reconnected:
+                        self.on_reconnected()
+                    return
+
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.down_after and self.health != DOWN:
+                logger.error("Servidor MCP %s marcado como fora do ar após %d falhas seguidas",
+                             self.server_name, self.consecutive_failures)
+                self.health = DOWN
+            delay = min(delay * 2, self.max_delay)
+
+    async def _connect_once(self) -> bool:
+        try:
+            if not await self.client.connect():
+                return False
+            if not await self.client.initialize():
+                logger.error("Falha ao inicializar sessão MCP após reconexão: %s", self.server_name)
+                await self.client.disconnect()
+                return False
+            return True
+        except Exception as e:
+            logger.error("Erro ao reconectar MCP [%s]: %s", self.server_name, e)
+            return False
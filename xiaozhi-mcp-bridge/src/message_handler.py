@@ -3,7 +3,9 @@ Message Handler para validação e formatação de mensagens JSON-RPC 2.0
 """
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+
+import json_codec
 
 logger = logging.getLogger(__name__)
 
@@ -35,17 +37,26 @@ class MessageHandler:
         return False
     
     @staticmethod
-    def parse_message(data: str) -> Optional[Dict[str, Any]]:
-        """Parse uma string JSON para dict"""
+    def parse_message(data: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+        """Parse JSON (bytes UTF-8 ou string) para dict"""
         try:
-            return json.loads(data)
-        except json.JSONDecodeError as e:
+            return json_codec.loads(data)
+        except json_codec.JSONDecodeError as e:
             logger.error("Erro ao fazer parse JSON: %s", e)
             return None
     
+    @staticmethod
+    def encode_message(message: Dict[str, Any]) -> bytes:
+        """Formata um dict para JSON em bytes UTF-8 (vazio em caso de erro)"""
+        try:
+            return json_codec.dumps(message)
+        except (TypeError, ValueError) as e:
+            logger.error("Erro ao formatar mensagem: %s", e)
+            return b""
+    
     @staticmethod
     def format_message(message: Dict[str, Any]) -> str:
-        """Formata um dict para string JSON"""
+        """Formata um dict para string JSON (formato legível; nos envios use encode_message)"""
         try:
             return json.dumps(message, ensure_ascii=False)
         except (TypeError, ValueError) as e:
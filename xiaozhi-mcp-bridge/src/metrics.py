@@ -0,0 +1,236 @@
+"""
+Métricas da bridge no formato texto do Prometheus, servidas por um listener HTTP local opcional
+"""
+import asyncio
+import bisect
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List, Tuple, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Buckets padrão (segundos) para latência de chamadas de ferramentas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 180.0)
+# Buckets (segundos) para atraso do event loop
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+# Intervalo (segundos) da medição de atraso do event loop
+LOOP_LAG_INTERVAL = 0.5
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; pode ser calculado na coleta por uma função que gera (labels, valor)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[LabelValues, float]]]] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *label_values: Any):
+        self._values[tuple(str(v) for v in label_values)] = value
+
+    def render(self) -> List[str]:
+        items = list(self._values.items())
+        if self._collect:
+            items.extend((tuple(str(v) for v in key), value) for key, value in self._collect())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(Gauge):
+    """Contador monotônico com labels (ou coletado de contadores existentes via collect)"""
+    kind = "counter"
+
+    def inc(self, *label_values: Any, amount: float = 1):
+        key = tuple(str(v) for v in label_values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos (observe é O(log n) e sem alocação por amostra)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagem por bucket (não cumulativa) + overflow, soma, total]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *label_values: Any):
+        key = tuple(str(v) for v in label_values)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total_sum, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas renderizado no formato texto do Prometheus"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                collect: Optional[Callable[[], Iterable[Tuple[LabelValues, float]]]] = None) -> Counter:
+        return self.register(Counter(name, help_text, labels, collect))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+              collect: Optional[Callable[[], Iterable[Tuple[LabelValues, float]]]] = None) -> Gauge:
+        return self.register(Gauge(name, help_text, labels, collect))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                body = metric.render()
+            except Exception as e:
+                logger.error("Erro ao coletar métrica %s: %s", metric.name, e)
+                continue
+            lines.extend(metric.header())
+            lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Listener HTTP mínimo (GET /metrics) e medição de atraso do event loop"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = DEFAULT_METRICS_HOST,
+                 port: int = DEFAULT_METRICS_PORT,
+                 loop_lag: Optional[Histogram] = None,
+                 json_routes: Optional[Dict[str, Callable[[], Any]]] = None):
+        """
+        Args:
+            registry: Métricas servidas em /metrics
+            host: Endereço do listener (padrão: apenas local)
+            port: Porta do listener
+            loop_lag: Histograma onde registrar o atraso do event loop (None desativa a medição)
+            json_routes: Rotas extras (caminho -> função) servidas como JSON (ex: /traces)
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.loop_lag = loop_lag
+        self.json_routes = json_routes or {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logger.error("Não foi possível abrir o endpoint de métricas em %s:%d: %s", self.host, self.port, e)
+            return False
+        if self.loop_lag is not None:
+            self._lag_task = asyncio.create_task(self._measure_loop_lag())
+        logger.info("Métricas disponíveis em http://%s:%d/metrics", self.host, self.port)
+        return True
+
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _measure_loop_lag(self):
+        """Mede quanto o event loop atrasa para acordar um sleep (bloqueios no loop)"""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = time.monotonic() - started - LOOP_LAG_INTERVAL
+            self.loop_lag.observe(max(lag, 0.0))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Descartar cabeçalhos
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) >= 2 and parts[0] == "GET" else None
+            if path in ("/metrics", "/"):
+                body = self.registry.render().encode("utf-8")
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path in self.json_routes:
+                body = json.dumps(self.json_routes[path](), ensure_ascii=False).encode("utf-8")
+                status = "200 OK"
+                content_type = "application/json; charset=utf-8"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error("Erro ao servir métricas: %s", e)
+        finally:
+            writer.close()
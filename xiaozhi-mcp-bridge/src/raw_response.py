@@ -0,0 +1,135 @@
+"""
+Respostas JSON-RPC mantidas em bytes, para repassar ao cloud sem parse nem re-serialização
+"""
+import logging
+import re
+from typing import Any, Dict, Optional, Union
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# ID aceito no caminho rápido: inteiro ou string sem escapes (os IDs locais da bridge são inteiros)
+_ID = rb'(-?\d+|"[^"\\]*")'
+_JSONRPC = rb'"jsonrpc"\s*:\s*"2\.0"\s*,\s*'
+_ID_MEMBER = rb'"id"\s*:\s*' + _ID + rb'\s*,\s*'
+_RESULT_OR_ERROR = rb'"(?:result|error)"\s*:'
+
+# "id" no início do objeto, antes de result/error (SDK Python: jsonrpc, id, result)
+_HEAD_PATTERNS = (
+    re.compile(rb'\s*\{\s*' + _JSONRPC + _ID_MEMBER + _RESULT_OR_ERROR),
+    re.compile(rb'\s*\{\s*' + _ID_MEMBER + _JSONRPC + _RESULT_OR_ERROR),
+)
+# "id" como último membro do objeto (SDK TypeScript: result, jsonrpc, id)
+_HEAD_RESULT = re.compile(rb'\s*\{\s*' + _RESULT_OR_ERROR)
+_TAIL_ID = re.compile(rb',\s*' + _JSONRPC + rb'"id"\s*:\s*' + _ID + rb'\s*\}\s*$')
+# Bytes do fim da mensagem onde o "id" final é procurado
+_TAIL_WINDOW = 128
+
+_IS_ERROR_TRUE = re.compile(rb'"isError"\s*:\s*true')
+# Fim de um objeto JSON completo (linhas truncadas não passam direto)
+_OBJECT_END = re.compile(rb'\}\s*$')
+
+
+class RawResponse:
+    """Resposta JSON-RPC como recebida do servidor MCP (bytes UTF-8 de um objeto JSON)
+
+    Só o ID é localizado, por expressões ancoradas no início ou no fim do objeto (onde
+    os SDKs MCP o serializam), então trocá-lo não exige parse da resposta inteira. O
+    parse completo só acontece se alguém precisar do dict (parse()).
+    """
+
+    __slots__ = ("data", "_id_start", "_id_end", "_message", "_failed", "_well_formed")
+
+    def __init__(self, data: bytes, id_start: int, id_end: int):
+        self.data = data
+        self._id_start = id_start
+        self._id_end = id_end
+        self._message: Optional[Dict[str, Any]] = None
+        self._failed: Optional[bool] = None
+        self._well_formed: Optional[bool] = None
+
+    @classmethod
+    def scan(cls, data: Union[bytes, bytearray], complete: bool = True) -> Optional["RawResponse"]:
+        """Localiza o ID de uma resposta (None se não é resposta ou o ID não está em posição conhecida)
+
+        Com complete=True (mensagem que pode seguir direto para o cloud) também exige UTF-8
+        válido e o fechamento do objeto; caso contrário retorna None e a mensagem segue pelo
+        parse normal, que rejeita conteúdo inválido. complete=False serve para achar o ID
+        no início de uma mensagem cortada.
+        """
+        data = bytes(data)
+        if complete:
+            try:
+                data.decode('utf-8')
+            except UnicodeDecodeError:
+                return None
+            if _OBJECT_END.search(data, max(0, len(data) - _TAIL_WINDOW)) is None:
+                return None
+        for pattern in _HEAD_PATTERNS:
+            match = pattern.match(data)
+            if match:
+                return cls(data, match.start(1), match.end(1))
+        if _HEAD_RESULT.match(data):
+            match = _TAIL_ID.search(data, max(0, len(data) - _TAIL_WINDOW))
+            if match:
+                return cls(data, match.start(1), match.end(1))
+        return None
+
+    @property
+    def id(self) -> Any:
+        return json_codec.loads(self.data[self._id_start:self._id_end])
+
+    def with_id(self, new_id: Any) -> "RawResponse":
+        """Cópia com outro ID (só os bytes do ID são trocados)"""
+        encoded = json_codec.dumps(new_id)
+        data = self.data[:self._id_start] + encoded + self.data[self._id_end:]
+        response = RawResponse(data, self._id_start, self._id_start + len(encoded))
+        response._failed = self._failed
+        response._well_formed = self._well_formed
+        return response
+
+    @property
+    def well_formed(self) -> bool:
+        """JSON válido (um objeto) antes de seguir em bytes para o cloud
+
+        Feito com um parse (validação completa; mais rápido que checar a estrutura com
+        expressões regulares). O dict fica guardado para parse(); o ganho do repasse em
+        bytes é não serializar de novo.
+        """
+        if self._well_formed is None:
+            try:
+                message = json_codec.loads(self.data)
+            except json_codec.JSONDecodeError:
+                self._well_formed = False
+            else:
+                self._well_formed = isinstance(message, dict)
+                if self._well_formed and self._message is None:
+                    self._message = message
+        return self._well_formed
+
+    @property
+    def is_error(self) -> bool:
+        """Erro JSON-RPC ou result com isError (parse completo só se o texto sugerir erro)"""
+        if self._failed is None:
+            if b'"error"' not in self.data and _IS_ERROR_TRUE.search(self.data) is None:
+                self._failed = False
+            else:
+                message = self.parse()
+                result = message.get("result")
+                self._failed = "error" in message or (isinstance(result, dict) and bool(result.get("isError")))
+        return self._failed
+
+    def parse(self) -> Dict[str, Any]:
+        """Resposta como dict (parse feito uma vez; JSON inválido vira erro -32700)"""
+        if self._message is None:
+            try:
+                self._message = json_codec.loads(self.data)
+            except json_codec.JSONDecodeError as e:
+                logger.warning("Resposta inválida do servidor MCP (%d bytes): %s", len(self.data), e)
+                self._message = {
+                    "jsonrpc": "2.0",
+                    "id": self.id,
+                    "error": {"code": -32700, "message": "Resposta inválida do servidor MCP"}
+                }
+        return self._message
@@ -0,0 +1,94 @@
+"""
+Limite de requisições simultâneas por servidor MCP com fila de espera limitada
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ServerBusyError(Exception):
+    """Fila de espera do servidor MCP cheia: requisição rejeitada sem aguardar"""
+    pass
+
+
+class RequestLimiter:
+    """Semáforo FIFO com fila limitada (contrapressão)
+
+    Até max_in_flight requisições são enviadas ao servidor ao mesmo tempo; as seguintes
+    esperam em ordem de chegada, e acima de max_queue esperando a requisição é rejeitada
+    com ServerBusyError. max_in_flight <= 0 desativa o limite.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, server_name: str = ""):
+        """
+        Args:
+            max_in_flight: Requisições simultâneas enviadas ao servidor (0 = sem limite)
+            max_queue: Requisições que podem aguardar na fila
+            server_name: Nome do servidor (para logs)
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.server_name = server_name
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        """Requisições aguardando na fila"""
+        return len(self._waiters)
+
+    async def acquire(self):
+        """Obtém uma vaga, aguardando na fila se necessário
+
+        Raises:
+            ServerBusyError: Se a fila já está cheia
+        """
+        if self.max_in_flight <= 0 or (self.active < self.max_in_flight and not self._waiters):
+            self.active += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            logger.warning("Servidor MCP %s ocupado: %d em andamento, %d na fila, requisição rejeitada",
+                           self.server_name, self.active, len(self._waiters))
+            raise ServerBusyError(self.server_name)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # A vaga já tinha sido passada para esta requisição: devolver
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self):
+        """Libera a vaga, passando-a direto para o próximo da fila"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores: em andamento, na fila e rejeitadas"""
+        return {
+            "in_flight": self.active,
+            "queued": len(self._waiters),
+            "rejected": self.rejected
+        }
@@ -0,0 +1,284 @@
+"""
+Serialização de respostas JSON-RPC com orçamento de bytes (truncamento em uma passada)
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Sufixo adicionado a textos cortados
+TRUNCATION_SUFFIX = "... [truncado]"
+_SUFFIX_BYTES = len(TRUNCATION_SUFFIX.encode('utf-8'))
+# Bytes mínimos restantes para valer a pena incluir um trecho do próximo item
+MIN_PARTIAL_BYTES = 256
+# Bytes reservados para o aviso de itens omitidos em result.content
+OMITTED_NOTICE_RESERVE = 96
+
+# Campos truncáveis do resultado: nome -> campo de texto de cada item da lista
+_TRUNCATABLE_FIELDS = (("content", "text"), ("items", "content"))
+
+
+@dataclass
+class EncodedResponse:
+    """Resposta serializada pronta para envio"""
+    data: bytes
+    truncated: bool = False
+    # Bytes removidos pelo truncamento (itens não serializados entram pelo tamanho do texto)
+    bytes_saved: int = 0
+
+
+def _dumps(obj: Any) -> bytes:
+    return json_codec.dumps(obj)
+
+
+def _marker(idx: int) -> str:
+    # Caractere NUL não aparece em JSON válido sem escape, então o marcador não colide com o conteúdo
+    return f"\x00bridge-slot-{idx}\x00"
+
+
+def _fit_text(item: Any, field: Optional[str], text: str, budget: int) -> Optional[bytes]:
+    """Serializa o item (ou o texto, se field é None) cortando o texto para caber em budget bytes"""
+    def encode(value: str) -> bytes:
+        if field is None:
+            return _dumps(value)
+        new_item = dict(item)
+        new_item[field] = value
+        return _dumps(new_item)
+
+    allowed = budget - len(encode("")) - _SUFFIX_BYTES
+    # Escapes JSON (aspas, \n...) ocupam mais bytes que o texto: reduzir até caber
+    while allowed > 0:
+        cut = text.encode('utf-8')[:allowed].decode('utf-8', 'ignore')
+        piece = encode(cut + TRUNCATION_SUFFIX)
+        if len(piece) <= budget:
+            return piece
+        allowed -= max(len(piece) - budget, 16)
+    return None
+
+
+class _Slot:
+    """Campo truncável do resultado, serializado separadamente do restante da resposta"""
+
+    def __init__(self, name: str, value: Any, text_field: Optional[str]):
+        self.name = name
+        self.value = value
+        self.text_field = text_field if isinstance(value, list) else None
+        # Itens já serializados por inteiro (em ordem)
+        self.pieces: List[bytes] = []
+
+    def encode_full(self, limit: int) -> int:
+        """Serializa inteiro, parando assim que passar de limit bytes; retorna o tamanho"""
+        if not isinstance(self.value, list):
+            self.pieces = [_dumps(self.value)]
+            return len(self.pieces[0])
+        size = 2
+        for item in self.value:
+            piece = _dumps(item)
+            self.pieces.append(piece)
+            size += len(piece) + (1 if len(self.pieces) > 1 else 0)
+            if size > limit:
+                break
+        return size
+
+    @property
+    def complete(self) -> bool:
+        return not isinstance(self.value, list) or len(self.pieces) == len(self.value)
+
+    def join(self) -> bytes:
+        if not isinstance(self.value, list):
+            return self.pieces[0]
+        return b"[" + b",".join(self.pieces) + b"]"
+
+    def truncate(self, budget: int, max_text_length: int) -> Tuple[bytes, int]:
+        """Serializa dentro de budget bytes; retorna (bytes, bytes removidos)"""
+        if not isinstance(self.value, list):
+            # encode_full pode não ter rodado (parada no primeiro campo acima do limite)
+            full = self.pieces[0] if self.pieces else _dumps(self.value)
+            if len(full) <= budget:
+                return full, 0
+            if isinstance(self.value, str):
+                # Mesmo limite por texto dos itens de lista, depois o orçamento em bytes
+                text = self.value
+                if len(text) > max_text_length:
+                    capped = _dumps(text[:max_text_length] + TRUNCATION_SUFFIX)
+                    if len(capped) <= budget:
+                        return capped, len(full) - len(capped)
+                piece = _fit_text(None, None, text, budget)
+                if piece is not None:
+                    return piece, len(full) - len(piece)
+            return b"null", len(full)
+        return self._truncate_list(budget, max_text_length)
+
+    def _truncate_list(self, budget: int, max_text_length: int) -> Tuple[bytes, int]:
+        items = self.value
+        field = self.text_field
+        notice = self.name == "content"
+        pieces: List[bytes] = []
+        used = 2
+        saved = 0
+        omitted = 0
+        for idx, item in enumerate(items):
+            text = item.get(field) if isinstance(item, dict) else None
+            piece = self.pieces[idx] if idx < len(self.pieces) else _dumps(item)
+            if isinstance(text, str) and len(text) > max_text_length:
+                # Limite por item: só estes são serializados de novo, com o texto já cortado
+                capped = dict(item)
+                capped[field] = text[:max_text_length] + TRUNCATION_SUFFIX
+                capped_piece = _dumps(capped)
+                saved += len(piece) - len(capped_piece)
+                piece = capped_piece
+
+            separator = 1 if pieces else 0
+            remaining = budget - used - separator
+            if notice and idx < len(items) - 1:
+                remaining -= OMITTED_NOTICE_RESERVE
+            if len(piece) <= remaining:
+                pieces.append(piece)
+                used += separator + len(piece)
+                continue
+
+            # Não cabe inteiro: incluir um trecho do texto, se sobrar espaço útil, e parar
+            partial = None
+            if isinstance(text, str) and remaining >= MIN_PARTIAL_BYTES:
+                partial = _fit_text(item, field, text, remaining)
+            if partial is not None:
+                pieces.append(partial)
+                used += separator + len(partial)
+                saved += len(piece) - len(partial)
+            else:
+                saved += len(piece)
+            # Itens seguintes nem são serializados: estimar pelo tamanho do texto
+            for other in items[idx + 1:]:
+                other_text = other.get(field) if isinstance(other, dict) else None
+                saved += len(other_text) if isinstance(other_text, str) else 0
+            omitted = len(items) - idx - (1 if partial is not None else 0)
+            break
+
+        if omitted and notice:
+            notice_piece = _dumps({"type": "text", "text": f"[{omitted} item(ns) omitido(s) por tamanho]"})
+            if used + 1 + len(notice_piece) <= budget:
+                pieces.append(notice_piece)
+        return b"[" + b",".join(pieces) + b"]", saved
+
+
+def _too_large_error(response: Dict[str, Any], size: int, max_size: int) -> EncodedResponse:
+    logger.error("Resposta ainda muito grande após truncamento (%d bytes), retornando erro", size)
+    error = {
+        "jsonrpc": "2.0",
+        "id": response.get("id"),
+        "error": {
+            "code": -32603,
+            "message": "Resposta muito grande. Tente reduzir o número de resultados (topk) ou refinar a busca.",
+            "data": {
+                "original_size": size,
+                "max_size": max_size
+            }
+        }
+    }
+    return EncodedResponse(_dumps(error), truncated=True, bytes_saved=size)
+
+
+def _skeleton(response: Dict[str, Any], result: Dict[str, Any],
+              slots: List[_Slot]) -> Tuple[List[bytes], int]:
+    """Serializa a resposta sem os campos truncáveis; retorna os segmentos entre eles e o tamanho fixo"""
+    skeleton_result = dict(result)
+    for idx, slot in enumerate(slots):
+        skeleton_result[slot.name] = _marker(idx)
+    skeleton = dict(response)
+    skeleton["result"] = skeleton_result
+    data = _dumps(skeleton)
+
+    segments = []
+    for idx in range(len(slots)):
+        head, data = data.split(_dumps(_marker(idx)), 1)
+        segments.append(head)
+    segments.append(data)
+    return segments, sum(len(segment) for segment in segments)
+
+
+def _encode_whole(response: Dict[str, Any], max_size: int):
+    """Serializa a resposta inteira somando o tamanho, sem passar muito de max_size
+
+    Returns:
+        (bytes se coube ou None, result, slots, segmentos do esqueleto, tamanho fixo)
+    """
+    result = response.get("result")
+    slots: List[_Slot] = []
+    if isinstance(result, dict):
+        for name, text_field in _TRUNCATABLE_FIELDS:
+            if isinstance(result.get(name), (list, str)):
+                slots.append(_Slot(name, result[name], text_field))
+
+    if not slots:
+        data = _dumps(response)
+        return (data if len(data) <= max_size else None), result, slots, [data], len(data)
+
+    segments, fixed_size = _skeleton(response, result, slots)
+    size = fixed_size
+    for slot in slots:
+        size += slot.encode_full(max_size - size)
+        if size > max_size:
+            break
+
+    if size > max_size or not all(slot.complete for slot in slots):
+        return None, result, slots, segments, fixed_size
+    parts = [segments[0]]
+    for idx, slot in enumerate(slots):
+        parts.append(slot.join())
+        parts.append(segments[idx + 1])
+    return b"".join(parts), result, slots, segments, fixed_size
+
+
+def encode_if_fits(response: Dict[str, Any], max_size: int) -> Optional[bytes]:
+    """Serializa a resposta se couber em max_size bytes (None caso contrário, sem truncar)"""
+    return _encode_whole(response, max_size)[0]
+
+
+def encode_response(response: Dict[str, Any], max_size: int, max_text_length: int) -> EncodedResponse:
+    """Serializa a resposta garantindo no máximo max_size bytes
+
+    Os campos result.content e result.items são serializados item a item enquanto o
+    tamanho é somado; se tudo cabe, os bytes são apenas concatenados (uma passada). Se
+    não cabe, textos maiores que max_text_length (caracteres) são cortados, os itens que
+    não cabem são omitidos e structuredContent (cópia estruturada do content) é removido,
+    sem serializar a resposta inteira de novo.
+
+    Returns:
+        EncodedResponse com os bytes JSON finais
+    """
+    data, result, slots, segments, fixed_size = _encode_whole(response, max_size)
+    if data is not None:
+        return EncodedResponse(data)
+    if not slots:
+        return _too_large_error(response, fixed_size, max_size)
+
+    logger.warning("Resposta muito grande (mais de %d bytes), truncando...", max_size)
+    saved = 0
+    if "structuredContent" in result:
+        result = dict(result)
+        structured_size = len(_dumps(result.pop("structuredContent")))
+        segments, fixed_size = _skeleton(response, result, slots)
+        saved += structured_size
+        logger.info("Removido structuredContent (%d bytes) da resposta truncada", structured_size)
+
+    budget = max_size - fixed_size
+    parts = [segments[0]]
+    for idx, slot in enumerate(slots):
+        # Garantir espaço mínimo para os campos seguintes ("[]" ou null)
+        slot_budget = budget - 4 * (len(slots) - idx - 1)
+        if slot_budget < 2:
+            return _too_large_error(response, fixed_size + saved, max_size)
+        piece, slot_saved = slot.truncate(slot_budget, max_text_length)
+        budget -= len(piece)
+        saved += slot_saved
+        parts.append(piece)
+        parts.append(segments[idx + 1])
+
+    data = b"".join(parts)
+    if len(data) > max_size:
+        return _too_large_error(response, len(data) + saved, max_size)
+    logger.info("Resposta truncada para %d bytes (~%d bytes removidos)", len(data), saved)
+    return EncodedResponse(data, truncated=True, bytes_saved=saved)
@@ -0,0 +1,137 @@
+"""
+Cache LRU de resultados de ferramentas MCP idempotentes (somente leitura)
+"""
+import fnmatch
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão de cada política de cache
+DEFAULT_CACHE_TTL = 60.0
+DEFAULT_CACHE_MAX_ENTRIES = 100
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 * 1024  # 2MB
+
+
+def canonical_arguments(arguments: Any) -> str:
+    """Serializa argumentos de forma canônica (chaves ordenadas) para uso em chaves de cache"""
+    return json_codec.dumps_str(arguments or {}, sort_keys=True)
+
+
+class _CacheBucket:
+    """Entradas LRU de uma política (servidor + padrão de ferramenta)"""
+
+    def __init__(self, pattern: str, policy: Dict[str, Any]):
+        self.pattern = pattern
+        self.ttl = float(policy.get('ttl', DEFAULT_CACHE_TTL))
+        self.max_entries = int(policy.get('max_entries', DEFAULT_CACHE_MAX_ENTRIES))
+        self.max_bytes = int(policy.get('max_bytes', DEFAULT_CACHE_MAX_BYTES))
+        # chave -> (expires_at, resultado serializado em bytes UTF-8, tamanho em bytes)
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, bytes, int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, size = self.entries.pop(key)
+        self.size_bytes -= size
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        item = self.entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, text, _ = item
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: Tuple[str, str], text: bytes):
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl, text, size)
+        self.size_bytes += size
+        # Evicção LRU por número de entradas e por tamanho
+        while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+
+class ToolResultCache:
+    """Cache de resultados de tools/call com política por servidor e ferramenta
+
+    Políticas vêm de 'result_cache' em cada servidor do config.yaml, no formato
+    {padrão_da_ferramenta: {ttl, max_entries, max_bytes}}. O padrão aceita curingas
+    (ex: 'portal_*_consultar') e é comparado com o nome original da ferramenta no servidor.
+    """
+
+    def __init__(self):
+        # servidor -> lista de buckets (na ordem da configuração)
+        self._buckets: Dict[str, List[_CacheBucket]] = {}
+
+    def configure_server(self, server_name: str, policies: Optional[Dict[str, Dict[str, Any]]]):
+        """Define as políticas de cache de um servidor"""
+        buckets = []
+        for pattern, policy in (policies or {}).items():
+            buckets.append(_CacheBucket(pattern, policy or {}))
+        if buckets:
+            self._buckets[server_name] = buckets
+            logger.info("Cache de resultados para %s: %s", server_name, ", ".join(b.pattern for b in buckets))
+
+    def _bucket_for(self, server_name: str, tool_name: str) -> Optional[_CacheBucket]:
+        for bucket in self._buckets.get(server_name, ()):
+            if fnmatch.fnmatchcase(tool_name, bucket.pattern):
+                return bucket
+        return None
+
+    def is_cacheable(self, server_name: str, tool_name: str) -> bool:
+        """Verifica se a ferramenta tem política de cache"""
+        return self._bucket_for(server_name, tool_name) is not None
+
+    def get(self, server_name: str, tool_name: str, arguments: Any) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia do resultado em cache, ou None"""
+        bucket = self._bucket_for(server_name, tool_name)
+        if bucket is None:
+            return None
+        text = bucket.get((tool_name, canonical_arguments(arguments)))
+        if text is None:
+            return None
+        return json_codec.loads(text)
+
+    def put(self, server_name: str, tool_name: str, arguments: Any, response: Dict[str, Any]):
+        """Armazena o resultado de uma resposta bem-sucedida (erros não são cacheados)"""
+        bucket = self._bucket_for(server_name, tool_name)
+        if bucket is None:
+            return
+        result = response.get("result")
+        if "error" in response or not isinstance(result, dict) or result.get("isError"):
+            return
+        text = json_codec.dumps(result)
+        bucket.put((tool_name, canonical_arguments(arguments)), text)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores por política: hits, misses, evictions, entries, bytes"""
+        stats = {}
+        for server_name, buckets in self._buckets.items():
+            for bucket in buckets:
+                stats[f"{server_name}:{bucket.pattern}"] = {
+                    "hits": bucket.hits,
+                    "misses": bucket.misses,
+                    "evictions": bucket.evictions,
+                    "entries": len(bucket.entries),
+                    "bytes": bucket.size_bytes
+                }
+        return stats
@@ -0,0 +1,215 @@
+"""
+Paginação de resultados grandes de ferramentas MCP (servidos depois via bridge_fetch_more)
+"""
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Nome da ferramenta sintética que serve as páginas seguintes
+FETCH_MORE_TOOL = "bridge_fetch_more"
+
+# Limites padrão do armazenamento de resultados paginados
+DEFAULT_PAGE_STORE_TTL = 300.0
+DEFAULT_PAGE_STORE_MAX_ENTRIES = 50
+DEFAULT_PAGE_STORE_MAX_BYTES = 20 * 1024 * 1024  # 20MB
+
+# Bytes reservados em cada página para o aviso de paginação e o envelope JSON-RPC
+PAGE_OVERHEAD_RESERVE = 512
+# Máximo de páginas de um resultado (acima disso a resposta é truncada, sem guardar páginas)
+DEFAULT_MAX_PAGES = 400
+
+# Listas paginadas do resultado: nome -> campo de texto de cada item (dividido se não couber)
+_PAGINATED_FIELDS = (("content", "text"), ("items", "content"))
+
+FETCH_MORE_TOOL_DEFINITION = {
+    "name": FETCH_MORE_TOOL,
+    "description": (
+        "Busca a próxima página de um resultado grande que foi paginado pela bridge. "
+        "Use o cursor e o número da página informados no aviso de paginação do resultado anterior."
+    ),
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "cursor": {"type": "string", "description": "Cursor informado no resultado paginado"},
+            "page": {"type": "integer", "minimum": 2, "description": "Número da página (a partir de 2)"}
+        },
+        "required": ["cursor", "page"]
+    }
+}
+
+
+def _size(obj: Any) -> int:
+    return len(json_codec.dumps(obj))
+
+
+def _fit_chars(text: str, start: int, limit: int) -> int:
+    """Maior número de caracteres a partir de start cujo texto codificado (com aspas) cabe em limit bytes"""
+    # Cada caractere ocupa de 1 a 6 bytes codificado (\uXXXX), mais as 2 aspas
+    hi = min(len(text) - start, limit - 2)
+    if hi <= 0:
+        return 0
+    if _size(text[start:start + hi]) <= limit:
+        return hi
+    # Busca binária: lo sempre cabe, hi nunca cabe
+    lo = min(hi - 1, (limit - 2) // 6)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if _size(text[start:start + mid]) <= limit:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def _split_item(item: Any, text_field: str, budget: int) -> Optional[List[Tuple[Any, int]]]:
+    """Divide um item cujo texto não cabe em uma página em vários itens (com o tamanho de cada um)
+
+    O tamanho codificado de cada parte é medido, então escapes e caracteres multibyte
+    concentrados em um trecho não estouram a página. Retorna None se nem um caractere
+    do texto cabe junto com o restante do item.
+    """
+    size = _size(item)
+    text = item.get(text_field) if isinstance(item, dict) else None
+    if size <= budget or not isinstance(text, str) or not text:
+        return [(item, size)]
+
+    overhead = size - _size(text)
+    parts = []
+    start = 0
+    while start < len(text):
+        chars = _fit_chars(text, start, budget - overhead)
+        if chars == 0:
+            return None
+        part = dict(item)
+        part[text_field] = text[start:start + chars]
+        parts.append((part, _size(part)))
+        start += chars
+    return parts
+
+
+def split_pages(result: Dict[str, Any], page_budget: int,
+                max_pages: int = DEFAULT_MAX_PAGES) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """Divide result.content / result.items em páginas de até page_budget bytes
+
+    Textos maiores que uma página são divididos entre páginas, então nenhum dado é perdido.
+    structuredContent (cópia estruturada do content) não é repetido nas páginas.
+
+    Returns:
+        (resultados, um por página; tamanho total em bytes), ou None se o resultado não tem
+        listas pagináveis, se os campos fora das listas não deixam espaço para os itens ou
+        se seriam necessárias mais de max_pages páginas
+    """
+    fields = [(name, text_field) for name, text_field in _PAGINATED_FIELDS
+              if isinstance(result.get(name), list)]
+    if not fields:
+        return None
+
+    base = {key: value for key, value in result.items()
+            if key != "structuredContent" and key not in dict(fields)}
+    # Página vazia (campos fora das listas + listas vazias); cada item soma o tamanho e uma vírgula
+    budget = page_budget - _size(dict(base, **{name: [] for name, _ in fields}))
+    if budget <= 0:
+        return None
+
+    pages: List[Dict[str, List[Any]]] = []
+    current: Dict[str, List[Any]] = {name: [] for name, _ in fields}
+    used = 0
+    total = 0
+    for name, text_field in fields:
+        for item in result[name]:
+            parts = _split_item(item, text_field, budget)
+            if parts is None:
+                return None
+            for part, size in parts:
+                if used + size + 1 > budget and any(current.values()):
+                    pages.append(current)
+                    if len(pages) >= max_pages:
+                        return None
+                    current = {field: [] for field, _ in fields}
+                    used = 0
+                current[name].append(part)
+                used += size + 1
+                total += size
+    pages.append(current)
+
+    return [dict(base, **page) for page in pages], total
+
+
+def page_result(pages: List[Dict[str, Any]], cursor: str, page: int) -> Dict[str, Any]:
+    """Monta o resultado de uma página (1-based) com o aviso de paginação"""
+    total = len(pages)
+    result = dict(pages[page - 1])
+    result["pagination"] = {"cursor": cursor, "page": page, "pages": total}
+    if page < total:
+        notice = (f"[Resultado paginado: página {page} de {total}. Para continuar, chame "
+                  f"{FETCH_MORE_TOOL} com cursor=\"{cursor}\" e page={page + 1}]")
+    else:
+        notice = f"[Resultado paginado: página {page} de {total} (última)]"
+    result["content"] = list(result.get("content", [])) + [{"type": "text", "text": notice}]
+    return result
+
+
+class ResultStore:
+    """Resultados paginados em memória (LRU limitado por entradas e bytes, com TTL)"""
+
+    def __init__(self, ttl: float = DEFAULT_PAGE_STORE_TTL,
+                 max_entries: int = DEFAULT_PAGE_STORE_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_PAGE_STORE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # cursor -> (expires_at, páginas, tamanho aproximado em bytes)
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]], int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.stored = 0
+        self.evictions = 0
+
+    def put(self, pages: List[Dict[str, Any]], size_bytes: int) -> str:
+        """Armazena as páginas e retorna o cursor"""
+        self._expire()
+        cursor = secrets.token_urlsafe(9)
+        self._entries[cursor] = (time.monotonic() + self.ttl, pages, size_bytes)
+        self.size_bytes += size_bytes
+        self.stored += 1
+        # Evicção LRU (o resultado recém-guardado nunca é removido)
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return cursor
+
+    def get(self, cursor: str) -> Optional[List[Dict[str, Any]]]:
+        """Retorna as páginas do cursor, ou None se expirou/desconhecido"""
+        item = self._entries.get(cursor)
+        if item is None:
+            return None
+        expires_at, pages, _ = item
+        if time.monotonic() >= expires_at:
+            self._remove(cursor)
+            return None
+        self._entries.move_to_end(cursor)
+        return pages
+
+    def _remove(self, cursor: str):
+        _, _, size = self._entries.pop(cursor)
+        self.size_bytes -= size
+
+    def _expire(self):
+        now = time.monotonic()
+        for cursor in [c for c, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            self._remove(cursor)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores: resultados guardados, evicções, entradas e bytes"""
+        return {
+            "stored": self.stored,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size_bytes
+        }
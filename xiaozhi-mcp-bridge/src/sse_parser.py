@@ -0,0 +1,88 @@
+"""
+Parser incremental de Server-Sent Events (respostas text/event-stream do MCP Streamable HTTP)
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class SSEEvent:
+    """Evento SSE completo"""
+    event: str
+    # Linhas "data:" do evento unidas por \n (bytes UTF-8)
+    data: bytes
+    # Último "id:" recebido no stream (persiste entre eventos, como no EventSource)
+    id: str = ""
+
+
+class SSEParser:
+    """Recebe o corpo em blocos de tamanho qualquer e devolve os eventos já completos
+
+    Segue o formato do EventSource: campos data (várias linhas são unidas por \\n), event
+    e id; linhas iniciadas por ":" são comentários (keepalive); linha vazia encerra o
+    evento. Cada byte é examinado uma vez, mesmo quando uma linha enorme chega em muitos
+    blocos.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[bytes] = []
+        self._event = ""
+        self.last_event_id = ""
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Adiciona um bloco do corpo e retorna os eventos completados por ele"""
+        search_from = len(self._buffer)
+        self._buffer += chunk
+        events: List[SSEEvent] = []
+        start = 0
+        while True:
+            end = self._buffer.find(b'\n', max(start, search_from))
+            if end < 0:
+                break
+            line = bytes(self._buffer[start:end])
+            start = end + 1
+            event = self._process_line(line[:-1] if line.endswith(b'\r') else line)
+            if event is not None:
+                events.append(event)
+        if start:
+            del self._buffer[:start]
+        return events
+
+    def close(self) -> List[SSEEvent]:
+        """Fim do corpo: entrega o evento pendente (servidores que não enviam a linha vazia final)"""
+        events: List[SSEEvent] = []
+        if self._buffer:
+            line = bytes(self._buffer)
+            self._buffer.clear()
+            event = self._process_line(line[:-1] if line.endswith(b'\r') else line)
+            if event is not None:
+                events.append(event)
+        event = self._process_line(b"")
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes) -> Optional[SSEEvent]:
+        if not line:
+            # Linha vazia: despacha o evento (se tiver dados)
+            event = None
+            if self._data:
+                event = SSEEvent(self._event or "message", b"\n".join(self._data), self.last_event_id)
+            self._data = []
+            self._event = ""
+            return event
+        if line.startswith(b':'):
+            return None
+        field, _, value = line.partition(b':')
+        if value.startswith(b' '):
+            value = value[1:]
+        if field == b'data':
+            self._data.append(value)
+        elif field == b'event':
+            self._event = value.decode('utf-8', errors='replace')
+        elif field == b'id':
+            if b'\0' not in value:
+                self.last_event_id = value.decode('utf-8', errors='replace')
+        # retry e campos desconhecidos são ignorados
+        return None
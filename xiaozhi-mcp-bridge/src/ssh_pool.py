@@ -0,0 +1,203 @@
+"""
+Pool de conexões SSH (paramiko) compartilhadas entre servidores MCP do mesmo host
+"""
+import asyncio
+import logging
+import os
+import stat
+import sys
+from typing import Dict, Any, Optional, List, Tuple
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (segundos) dos keepalives SSH; 0 desativa
+DEFAULT_SSH_KEEPALIVE = 30
+# Tempo (segundos) que uma conexão sem canais fica aberta aguardando reuso (ex: reconexão)
+DEFAULT_SSH_IDLE_TTL = 60
+DEFAULT_SSH_CONNECT_TIMEOUT = 30
+
+PoolKey = Tuple[str, int, str]
+
+
+class _PooledConnection:
+    __slots__ = ("client", "refs", "close_handle")
+
+    def __init__(self, client: paramiko.SSHClient):
+        self.client = client
+        self.refs = 0
+        self.close_handle: Optional[asyncio.TimerHandle] = None
+
+    def is_active(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+class SSHTransportPool:
+    """Conexões SSH por (host, porta, usuário), compartilhadas com contagem de referências
+
+    Cada servidor MCP abre o próprio canal (open_session) sobre a conexão do pool, então
+    vários servidores no mesmo host fazem um único handshake TCP+SSH. Conexões com
+    keepalive; a última liberação fecha a conexão só após idle_ttl, para que a reconexão
+    de um servidor que caiu reabra apenas o canal.
+    """
+
+    def __init__(self, keepalive: float = DEFAULT_SSH_KEEPALIVE, idle_ttl: float = DEFAULT_SSH_IDLE_TTL):
+        self.keepalive = keepalive
+        self.idle_ttl = idle_ttl
+        self._connections: Dict[PoolKey, _PooledConnection] = {}
+        self._locks: Dict[PoolKey, asyncio.Lock] = {}
+        self.handshakes = 0
+
+    async def acquire(self, host: str, port: int, user: str, password: Optional[str] = None,
+                      timeout: float = DEFAULT_SSH_CONNECT_TIMEOUT) -> paramiko.SSHClient:
+        """Retorna a conexão SSH do host (criando se preciso) e registra uma referência
+
+        Raises:
+            paramiko.SSHException/OSError: Se a conexão falhar
+        """
+        key = (host, port, user)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        # Conexões simultâneas ao mesmo host aguardam um único handshake
+        async with lock:
+            pooled = self._connections.get(key)
+            if pooled is not None and not pooled.is_active():
+                logger.info("Conexão SSH com %s@%s:%d caiu, reconectando", user, host, port)
+                self._close(key, pooled)
+                pooled = None
+            if pooled is None:
+                client = await self._connect(host, port, user, password, timeout)
+                pooled = _PooledConnection(client)
+                self._connections[key] = pooled
+            else:
+                logger.debug("Reusando conexão SSH com %s@%s:%d (%d canais)", user, host, port, pooled.refs)
+            if pooled.close_handle is not None:
+                pooled.close_handle.cancel()
+                pooled.close_handle = None
+            pooled.refs += 1
+            return pooled.client
+
+    async def _connect(self, host: str, port: int, user: str, password: Optional[str],
+                       timeout: float) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        logger.debug("Conectando SSH via paramiko: %s@%s:%d", user, host, port)
+        # Conectar em thread separada (paramiko não é async nativo)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: client.connect(
+                    hostname=host,
+                    port=port,
+                    username=user,
+                    password=password,
+                    timeout=timeout,
+                    look_for_keys=False,
+                    allow_agent=False
+                )
+            )
+        except BaseException:
+            client.close()
+            raise
+        self.handshakes += 1
+        transport = client.get_transport()
+        if transport is not None and self.keepalive > 0:
+            transport.set_keepalive(int(self.keepalive))
+        logger.info("Conexão SSH estabelecida com %s@%s:%d", user, host, port)
+        return client
+
+    def release(self, host: str, port: int, user: str, client: paramiko.SSHClient):
+        """Libera uma referência; sem referências, a conexão fecha após idle_ttl"""
+        key = (host, port, user)
+        pooled = self._connections.get(key)
+        if pooled is None or pooled.client is not client:
+            # Conexão já substituída (caiu e foi reaberta): a antiga já foi fechada
+            return
+        pooled.refs = max(0, pooled.refs - 1)
+        if pooled.refs > 0:
+            return
+        if self.idle_ttl <= 0 or not pooled.is_active():
+            self._close(key, pooled)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._close(key, pooled)
+            return
+        pooled.close_handle = loop.call_later(self.idle_ttl, self._close_idle, key, pooled)
+
+    def _close_idle(self, key: PoolKey, pooled: _PooledConnection):
+        if pooled.refs == 0 and self._connections.get(key) is pooled:
+            logger.debug("Fechando conexão SSH ociosa com %s@%s:%d", key[2], key[0], key[1])
+            self._close(key, pooled)
+
+    def _close(self, key: PoolKey, pooled: _PooledConnection):
+        if pooled.close_handle is not None:
+            pooled.close_handle.cancel()
+            pooled.close_handle = None
+        if self._connections.get(key) is pooled:
+            del self._connections[key]
+        try:
+            pooled.client.close()
+        except Exception as e:
+            logger.debug("Erro ao fechar conexão SSH: %s", e)
+
+    def close_all(self):
+        """Fecha todas as conexões (encerramento da bridge)"""
+        for key, pooled in list(self._connections.items()):
+            self._close(key, pooled)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Conexões abertas e canais (referências) em cada uma"""
+        return [{"host": host, "port": port, "user": user, "channels": pooled.refs, "active": pooled.is_active()}
+                for (host, port, user), pooled in self._connections.items()]
+
+
+def _control_dir() -> Optional[str]:
+    """Diretório dos sockets ControlMaster (~/.ssh/xiaozhi-mux, 0700 e do próprio usuário)
+
+    Um caminho previsível em diretório compartilhado (/tmp) permitiria a outro usuário
+    criar o socket antes e receber a sessão SSH. Retorna None se o diretório não puder
+    ser criado ou não for seguro.
+    """
+    ssh_dir = os.path.join(os.path.expanduser("~"), ".ssh")
+    path = os.path.join(ssh_dir, "xiaozhi-mux")
+    try:
+        os.makedirs(ssh_dir, mode=0o700, exist_ok=True)
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        logger.warning("Multiplexação SSH desativada: não foi possível criar %s: %s", path, e)
+        return None
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        logger.warning("Multiplexação SSH desativada: %s não é um diretório 0700 do usuário atual", path)
+        return None
+    return path
+
+
+def ssh_multiplex_options(keepalive: float = DEFAULT_SSH_KEEPALIVE,
+                          persist: float = DEFAULT_SSH_IDLE_TTL) -> List[str]:
+    """Opções do OpenSSH para compartilhar uma conexão entre processos ssh (ControlMaster)
+
+    O primeiro ssh para o host vira o mestre; os seguintes (outros servidores MCP e
+    reconexões) abrem só um canal sobre ele. Os sockets ficam em um diretório privado
+    do usuário. Indisponível no Windows (retorna apenas os keepalives).
+    """
+    options: List[str] = []
+    if keepalive > 0:
+        options += ["-o", f"ServerAliveInterval={int(keepalive)}", "-o", "ServerAliveCountMax=3"]
+    if sys.platform == 'win32':
+        return options
+    control_dir = _control_dir()
+    if control_dir is None:
+        return options
+    # %C: hash de host, porta e usuário (caminho curto para o socket Unix)
+    control_path = os.path.join(control_dir, "%C")
+    options += [
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={control_path}",
+        # ControlPersist=0 manteria o mestre para sempre; sem persistência o mestre é o próprio ssh
+        "-o", f"ControlPersist={int(persist)}" if persist > 0 else "ControlPersist=no"
+    ]
+    return options
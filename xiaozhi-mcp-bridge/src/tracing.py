@@ -0,0 +1,148 @@
+"""
+Linha do tempo por requisição (cloud -> bridge -> MCP -> cloud) para atribuir latência a cada etapa
+"""
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, Optional, List, Tuple
+
+from log_pipeline import background_handler
+
+logger = logging.getLogger(__name__)
+
+# Padrões da configuração bridge.tracing
+DEFAULT_TRACE_SAMPLE_RATE = 0.01
+DEFAULT_TRACE_SLOW_THRESHOLD_MS = 2000.0
+DEFAULT_TRACE_RING_SIZE = 500
+DEFAULT_TRACE_MAX_BYTES = 10 * 1024 * 1024  # 10MB
+DEFAULT_TRACE_BACKUP_COUNT = 3
+# Limite de traces abertos (requisições sem resposta são descartadas além disso)
+MAX_ACTIVE_TRACES = 10000
+
+TraceKey = Tuple[str, Any]
+
+
+class Trace:
+    """Marcas de tempo (monotônico) das etapas de uma requisição"""
+
+    __slots__ = ("endpoint_id", "cloud_id", "method", "sampled", "attributes", "marks")
+
+    def __init__(self, endpoint_id: str, cloud_id: Any, method: str, sampled: bool, started_at: float):
+        self.endpoint_id = endpoint_id
+        self.cloud_id = cloud_id
+        self.method = method
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = {}
+        self.marks: List[Tuple[str, float]] = [("ws_received", started_at)]
+
+    def mark(self, stage: str):
+        self.marks.append((stage, time.monotonic()))
+
+    def to_record(self, outcome: str) -> Dict[str, Any]:
+        start = self.marks[0][1]
+        stages = []
+        previous = start
+        for stage, at in self.marks:
+            stages.append({
+                "stage": stage,
+                "at_ms": round((at - start) * 1000, 3),
+                # Tempo desde a etapa anterior (o que esta etapa custou)
+                "ms": round((at - previous) * 1000, 3)
+            })
+            previous = at
+        record = {
+            "trace": f"{self.endpoint_id}:{self.cloud_id}",
+            "method": self.method,
+            "outcome": outcome,
+            "total_ms": round((self.marks[-1][1] - start) * 1000, 3),
+            "stages": stages
+        }
+        record.update(self.attributes)
+        return record
+
+
+class Tracer:
+    """Traces por requisição do cloud, indexados por (endpoint, ID do cloud)
+
+    Toda requisição recebe marcas de tempo (uma tupla por etapa); ao terminar, o trace é
+    guardado se foi amostrado (sample_rate) ou se passou de slow_threshold_ms. Os traces
+    guardados vão para um anel em memória e, opcionalmente, para um arquivo JSONL rotativo.
+    """
+
+    def __init__(self, sample_rate: float = DEFAULT_TRACE_SAMPLE_RATE,
+                 slow_threshold_ms: float = DEFAULT_TRACE_SLOW_THRESHOLD_MS,
+                 ring_size: int = DEFAULT_TRACE_RING_SIZE,
+                 file_path: Optional[str] = None,
+                 max_bytes: int = DEFAULT_TRACE_MAX_BYTES,
+                 backup_count: int = DEFAULT_TRACE_BACKUP_COUNT):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self.ring: deque = deque(maxlen=ring_size)
+        self._active: Dict[TraceKey, Trace] = {}
+        self.kept = 0
+        self.slow = 0
+        self._file_logger: Optional[logging.Logger] = None
+        if file_path:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger(f"{__name__}.file")
+            # Gravação em thread própria: disco lento não segura o event loop
+            self._file_logger.handlers = [background_handler(handler)]
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+            logger.info("Traces de requisições em %s", file_path)
+
+    def start(self, endpoint_id: str, cloud_id: Any, method: str,
+              received_at: Optional[float] = None) -> Trace:
+        """Abre o trace de uma requisição (received_at: quando a mensagem saiu do WebSocket)"""
+        trace = Trace(endpoint_id, cloud_id, method, random.random() < self.sample_rate,
+                      received_at if received_at is not None else time.monotonic())
+        trace.mark("ws_parsed")
+        if len(self._active) >= MAX_ACTIVE_TRACES:
+            self._active.pop(next(iter(self._active)))
+        self._active[(endpoint_id, cloud_id)] = trace
+        return trace
+
+    def get(self, endpoint_id: str, cloud_id: Any) -> Optional[Trace]:
+        return self._active.get((endpoint_id, cloud_id))
+
+    def mark(self, endpoint_id: str, cloud_id: Any, stage: str, **attributes: Any):
+        """Marca uma etapa do trace aberto (sem efeito se não houver trace)"""
+        trace = self._active.get((endpoint_id, cloud_id))
+        if trace is not None:
+            trace.mark(stage)
+            if attributes:
+                trace.attributes.update(attributes)
+
+    def finish(self, endpoint_id: str, cloud_id: Any, outcome: str):
+        """Fecha o trace após a resposta ser enviada ao cloud"""
+        trace = self._active.pop((endpoint_id, cloud_id), None)
+        if trace is None:
+            return
+        duration = trace.marks[-1][1] - trace.marks[0][1]
+        slow = duration >= self.slow_threshold
+        if not (slow or trace.sampled):
+            return
+
+        record = trace.to_record(outcome)
+        record["slow"] = slow
+        self.kept += 1
+        if slow:
+            self.slow += 1
+            logger.warning("Requisição lenta %s (%s): %.0f ms, etapa mais longa: %s", record["trace"],
+                           record.get("tool", trace.method), duration * 1000,
+                           max(record["stages"], key=lambda s: s["ms"])["stage"])
+        self.ring.append(record)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(record, ensure_ascii=False))
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """Traces guardados em memória (mais antigos primeiro)"""
+        return list(self.ring)
@@ -0,0 +1,170 @@
+"""
+Gravação do tráfego da bridge (cloud -> bridge e respostas dos servidores MCP) para replay
+"""
+import gzip
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Iterable, Iterator
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do arquivo de captura
+CAPTURE_FORMAT_VERSION = 1
+
+DEFAULT_CAPTURE_MAX_BYTES = 100 * 1024 * 1024  # 100MB
+# Intervalo (segundos) entre flushes do arquivo
+CAPTURE_FLUSH_INTERVAL = 1.0
+
+# Chaves cujo valor é sempre mascarado (comparação sem maiúsculas, por substring)
+DEFAULT_REDACT_KEYS = (
+    "password", "passwd", "secret", "token", "api_key", "apikey", "authorization",
+    "cookie", "credential", "private_key"
+)
+REDACTED = "***"
+
+# Segredos dentro de textos: "Bearer xxx", "token=xxx" em URLs, chaves no estilo sk-...
+_SECRET_PATTERNS = (
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+"), r"\1" + REDACTED),
+    (re.compile(r"((?:token|api_key|apikey|key|password)=)[^&\s\"']+", re.IGNORECASE), r"\1" + REDACTED),
+    (re.compile(r"\bsk-[A-Za-z0-9_-]{16,}"), REDACTED),
+)
+
+
+def _redact_text(text: str) -> str:
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redact(value: Any, keys: Iterable[str] = DEFAULT_REDACT_KEYS) -> Any:
+    """Cópia do valor com segredos mascarados (por nome de chave e por padrão no texto)"""
+    keys = tuple(keys)
+    if isinstance(value, dict):
+        redacted = {}
+        for key, item in value.items():
+            lowered = str(key).lower()
+            if any(secret in lowered for secret in keys) and not isinstance(item, (dict, list)):
+                redacted[key] = REDACTED
+            else:
+                redacted[key] = redact(item, keys)
+        return redacted
+    if isinstance(value, list):
+        return [redact(item, keys) for item in value]
+    if isinstance(value, str):
+        return _redact_text(value)
+    return value
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TrafficRecorder:
+    """Grava mensagens em JSONL compacto com tempo relativo ao início da captura
+
+    Tipos de linha ("k"):
+        meta: cabeçalho (versão, início, endpoints e servidores)
+        cloud: mensagem JSON-RPC recebida do cloud ("ep": endpoint)
+        mcp: requisição enviada a um servidor MCP e a resposta ("srv", "ms": latência)
+
+    O arquivo é comprimido com gzip se terminar em .gz. A gravação para (com aviso) ao
+    atingir max_bytes, para não encher o disco durante uma captura esquecida ligada.
+    """
+
+    def __init__(self, file_path: str, max_bytes: int = DEFAULT_CAPTURE_MAX_BYTES,
+                 redact_keys: Optional[Iterable[str]] = None,
+                 endpoints: Optional[List[str]] = None, servers: Optional[List[str]] = None):
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.redact_keys = tuple(k.lower() for k in (redact_keys or ())) + DEFAULT_REDACT_KEYS
+        self.records = 0
+        self.bytes_written = 0
+        self._started = time.monotonic()
+        self._last_flush = self._started
+        self._full = False
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = _open(file_path, "w")
+        self._write({
+            "k": "meta",
+            "version": CAPTURE_FORMAT_VERSION,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "endpoints": endpoints or [],
+            "servers": servers or []
+        })
+        logger.info("Captura de tráfego em %s", file_path)
+
+    def _elapsed(self) -> float:
+        return round(time.monotonic() - self._started, 6)
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is None or self._full:
+            return
+        line = json_codec.dumps_str(record) + "\n"
+        if self.bytes_written + len(line) > self.max_bytes:
+            self._full = True
+            logger.warning("Captura de tráfego atingiu %d bytes, gravação interrompida", self.max_bytes)
+            return
+        try:
+            self._file.write(line)
+        except OSError as e:
+            logger.error("Erro ao gravar captura de tráfego: %s", e)
+            self._full = True
+            return
+        self.bytes_written += len(line)
+        self.records += 1
+        now = time.monotonic()
+        if now - self._last_flush >= CAPTURE_FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = now
+
+    def record_cloud(self, endpoint_id: str, message: Dict[str, Any]):
+        """Mensagem JSON-RPC recebida do cloud"""
+        self._write({"t": self._elapsed(), "k": "cloud", "ep": endpoint_id,
+                     "msg": redact(message, self.redact_keys)})
+
+    def record_mcp(self, server_name: str, request: Dict[str, Any],
+                   response: Optional[Dict[str, Any]], elapsed: float):
+        """Requisição enviada a um servidor MCP e a resposta (None: sem resposta)"""
+        record = {
+            "t": self._elapsed(),
+            "k": "mcp",
+            "srv": server_name,
+            "ms": round(elapsed * 1000, 3),
+            "req": redact({key: request[key] for key in ("method", "params") if key in request},
+                          self.redact_keys)
+        }
+        if response is not None:
+            record["res"] = redact({key: response[key] for key in ("result", "error") if key in response},
+                                   self.redact_keys)
+        self._write(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info("Captura de tráfego encerrada: %d registros, %d bytes em %s",
+                        self.records, self.bytes_written, self.file_path)
+
+
+def read_capture(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Lê um arquivo de captura (JSONL, opcionalmente .gz), ignorando linhas corrompidas"""
+    with _open(file_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json_codec.loads(line)
+            except json_codec.JSONDecodeError:
+                # Última linha pode estar incompleta se a bridge foi encerrada à força
+                logger.warning("Linha %d inválida na captura %s, ignorada", line_number, file_path)
@@ -3,8 +3,8 @@ Cliente WebSocket para conectar ao xiaozhi.me
 """
 import asyncio
 import logging
-import json
-from typing import Optional, Callable, Dict, Any
+import time
+from typing import Optional, Callable, Dict, Any, Union
 import websockets
 from websockets.client import WebSocketClientProtocol
 from message_handler import MessageHandler
@@ -30,6 +30,8 @@ class WebSocketClient:
         self._max_reconnect_delay = 60
         self._reconnect_task: Optional[asyncio.Task] = None
         self._read_task: Optional[asyncio.Task] = None
+        # Instante (monotônico) em que a última mensagem foi recebida (para traces de latência)
+        self.last_received_at = 0.0
     
     def _get_websocket_url(self) -> str:
         """Monta a URL completa do WebSocket com token"""
@@ -77,13 +79,11 @@ class WebSocketClient:
             while self.connected and self.websocket:
                 try:
                     message = await self.websocket.recv()
+                    self.last_received_at = time.monotonic()
                     
-                    # WebSocket pode receber texto ou binário
-                    if isinstance(message, bytes):
-                        message = message.decode('utf-8')
-                    
-                    # Log todas as mensagens recebidas para debug
-                    logger.debug("Mensagem recebida do servidor: %s", message[:500])
+                    # Texto ou binário: o parse aceita os dois (sem decodificar bytes antes)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Mensagem recebida do servidor: %s", message[:500])
                     
                     await self._process_message(message)
                     
@@ -129,7 +129,7 @@ class WebSocketClient:
         except Exception as e:
             logger.error("Erro ao enviar mensagem hello: %s", e)
     
-    async def _process_message(self, message_str: str):
+    async def _process_message(self, message_str: Union[str, bytes]):
         """Processa uma mensagem recebida do WebSocket"""
         try:
             message = self.message_handler.parse_message(message_str)
@@ -215,10 +215,10 @@ class WebSocketClient:
     async def _send_jsonrpc_response(self, response: Dict[str, Any]):
         """Envia uma resposta JSON-RPC diretamente ao WebSocket"""
         try:
-            message_str = self.message_handler.format_message(response)
-            if message_str and self.websocket:
-                await self.websocket.send(message_str)
-                logger.debug("Resposta JSON-RPC enviada: %s", message_str[:200])
+            data = self.message_handler.encode_message(response)
+            if data and self.websocket:
+                await self.send_text(data)
+                logger.debug("Resposta JSON-RPC enviada: %s", data[:200])
         except Exception as e:
             logger.error("Erro ao enviar resposta JSON-RPC: %s", e)
     
@@ -233,17 +233,40 @@ class WebSocketClient:
             # Caso contrário, envolver em formato MCP
             if "jsonrpc" in payload and payload.get("jsonrpc") == "2.0":
                 # Enviar JSON-RPC direto (protocolo do endpoint /mcp/)
-                message_str = self.message_handler.format_message(payload)
+                data = self.message_handler.encode_message(payload)
             else:
                 # Envolver em formato MCP do xiaozhi.me (se tiver session_id)
                 mcp_message = self.message_handler.wrap_mcp_payload(payload, self.session_id or "")
-                message_str = self.message_handler.format_message(mcp_message)
+                data = self.message_handler.encode_message(mcp_message)
             
-            if not message_str:
+            if not data:
                 return False
             
-            await self.websocket.send(message_str)
-            logger.debug("Mensagem enviada ao WebSocket: %s", message_str[:200])
+            return await self.send_text(data)
+            
+        except Exception as e:
+            logger.error("Erro ao enviar mensagem ao WebSocket: %s", e)
+            self.connected = False
+            if self.on_error:
+                self.on_error(f"Erro ao enviar mensagem: {str(e)}")
+            return False
+    
+    async def send_text(self, data: Union[str, bytes]) -> bool:
+        """Envia JSON já serializado como frame de texto (sem novo json.dumps)"""
+        if not self.connected or not self.websocket:
+            logger.error("Não conectado ao WebSocket")
+            return False
+        
+        try:
+            if isinstance(data, bytes):
+                try:
+                    # websockets >= 13: bytes UTF-8 enviados como texto sem decodificar
+                    await self.websocket.send(data, text=True)
+                except TypeError:
+                    await self.websocket.send(data.decode('utf-8'))
+            else:
+                await self.websocket.send(data)
+            logger.debug("Mensagem enviada ao WebSocket: %d bytes", len(data))
             return True
             
         except Exception as e:
@@ -6,11 +6,16 @@ import sys
 import os
 import asyncio
 import json
+import time
 
 # Adicionar src ao path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from message_handler import MessageHandler
+import json_codec
+from result_pager import split_pages, page_result, PAGE_OVERHEAD_RESERVE
+from response_encoder import encode_response, encode_if_fits
+from raw_response import RawResponse
 
 
 def test_message_handler():
@@ -124,6 +129,291 @@ def test_message_types():
     print("\n✅ Todos os testes de tipos de mensagem passaram!\n")
 
 
+def test_response_encoder():
+    """Testa a serialização de respostas com orçamento de bytes"""
+    print("Testando serialização com orçamento de bytes...")
+    limit = 51200
+    
+    # Teste 1: Resposta pequena sai inteira, igual à serialização direta
+    small = {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": "olá"}], "isError": False}}
+    encoded = encode_response(small, limit, 2000)
+    assert not encoded.truncated and json.loads(encoded.data) == small, "Resposta pequena alterada"
+    assert encode_if_fits(small, limit) == encoded.data, "encode_if_fits difere de encode_response"
+    print("✓ Resposta pequena serializada sem truncamento")
+    
+    # Teste 2: Itens grandes são cortados e o excesso omitido com aviso
+    items = [{"type": "text", "text": "x" * 30000} for _ in range(5)]
+    big = {"jsonrpc": "2.0", "id": 2, "result": {"content": items, "structuredContent": {"items": items}}}
+    assert encode_if_fits(big, limit) is None, "encode_if_fits não detectou resposta grande"
+    encoded = encode_response(big, limit, 2000)
+    decoded = json.loads(encoded.data)
+    assert encoded.truncated and len(encoded.data) <= limit, "Resposta grande não foi truncada"
+    assert "structuredContent" not in decoded["result"], "structuredContent não removido"
+    assert all(len(item["text"]) <= 2000 + len("... [truncado]") for item in decoded["result"]["content"])
+    print("✓ Resposta grande truncada dentro do limite")
+    
+    # Teste 3: Campo após um campo acima do limite (content lista ou texto, items texto)
+    for content in ([{"type": "text", "text": "x" * 100000}], "x" * 100000):
+        response = {"jsonrpc": "2.0", "id": 3, "result": {"content": content, "items": "y" * 10}}
+        encoded = encode_response(response, limit, 2000)
+        decoded = json.loads(encoded.data)
+        assert len(encoded.data) <= limit and decoded["result"]["items"] == "y" * 10, "Campo seguinte perdido"
+    print("✓ Campo seguinte a um campo grande preservado")
+    
+    print("\n✅ Todos os testes de serialização passaram!\n")
+
+
+def test_raw_response():
+    """Testa as respostas repassadas em bytes (troca de ID e validação antes do repasse)"""
+    print("Testando respostas em bytes...")
+    
+    # Teste 1: ID localizado nas duas ordens de campos dos SDKs e trocado sem parse
+    python_sdk = RawResponse.scan(b'{"jsonrpc":"2.0","id":5,"result":{"content":[]}}\n')
+    typescript_sdk = RawResponse.scan(b'{"result":{"content":[]},"jsonrpc":"2.0","id":"abc"}')
+    assert python_sdk.id == 5 and typescript_sdk.id == "abc", "ID não localizado"
+    replaced = python_sdk.with_id("cloud-1")
+    assert json.loads(replaced.data) == {"jsonrpc": "2.0", "id": "cloud-1", "result": {"content": []}}
+    assert replaced.well_formed, "Resposta válida rejeitada"
+    print("✓ ID localizado e trocado nos bytes")
+    
+    # Teste 2: UTF-8 inválido e objeto cortado não passam direto
+    assert RawResponse.scan(b'{"jsonrpc":"2.0","id":5,"result":{"t":"\xff"}}') is None, "UTF-8 inválido aceito"
+    assert RawResponse.scan(b'{"jsonrpc":"2.0","id":5,"result":{"a":') is None, "Linha cortada aceita"
+    for data in (b'{"jsonrpc":"2.0","id":5,"result":{"a":1}',
+                 b'{"jsonrpc":"2.0","id":5,"result":{"a":"x}}',
+                 b'{"jsonrpc":"2.0","id":5,"result":{"a":[1,2}}}',
+                 b'{"jsonrpc":"2.0","id":5,"result":{}}{"x":1}'):
+        raw = RawResponse.scan(data)
+        assert raw is None or not raw.well_formed, f"JSON inválido aceito para repasse: {data!r}"
+    # JSON inválido vira erro -32700 no parse (caminho normal)
+    broken = RawResponse.scan(b'{"jsonrpc":"2.0","id":5,"result":{"a":1}')
+    assert broken.parse()["error"]["code"] == -32700, "JSON inválido sem erro de parse"
+    print("✓ JSON inválido não é repassado em bytes")
+    
+    print("\n✅ Todos os testes de respostas em bytes passaram!\n")
+
+
+def test_collection_resolver():
+    """Testa a conversão de nome de collection para ID (structuredContent e content)"""
+    print("Testando resolução de collections...")
+    from collection_resolver import CollectionResolver
+    
+    text = json.dumps({"items": [{"id": "col-1", "title": "Manuais"}, {"id": "col-2", "title": "Contratos"}]})
+    results = {
+        "structured": {"structuredContent": {"items": [{"id": "col-1", "title": "Manuais"}]}},
+        "content": {"content": [{"type": "text", "text": text}]},
+        # structuredContent sem títulos: as collections vêm do texto
+        "both": {"structuredContent": {"items": [{"id": "col-1"}]}, "content": [{"type": "text", "text": text}]},
+    }
+    
+    async def scenario():
+        for label, result in results.items():
+            async def fetch(result=result):
+                return result
+            resolver = CollectionResolver(fetch, ttl=60, server_name="aperag")
+            assert await resolver.resolve("manuais") == "col-1", f"Collection não resolvida ({label})"
+            if label == "both":
+                assert await resolver.resolve("CONTRATOS") == "col-2", "Fallback para content não usado"
+    
+    asyncio.run(scenario())
+    print("✓ Collections de structuredContent, content e dos dois formatos juntos")
+    
+    print("\n✅ Todos os testes de resolução de collections passaram!\n")
+
+
+def _bridge_with_fake_server(handler, bridge_config=None, server_config=None):
+    """Bridge com um servidor MCP falso (sem processo): handler(mensagem) -> resposta"""
+    from bridge_multi_ws import MultiWebSocketBridge
+    server = {"name": "fake", "ssh_host": "localhost", "ssh_command": "true"}
+    server.update(server_config or {})
+    bridge = MultiWebSocketBridge([{"url": "ws://127.0.0.1:1/", "token": "teste"}], [server], bridge_config)
+    client = bridge.mcp_clients[0]
+    client.connected = True
+    
+    async def send_message(message, *args, **kwargs):
+        return await handler(message)
+    client.send_message = send_message
+    return bridge
+
+
+def test_tools_cache_invalidation():
+    """Testa o cache de tools/list quando o servidor avisa que as ferramentas mudaram"""
+    print("Testando invalidação do cache de ferramentas...")
+    
+    async def scenario():
+        tools = [{"name": "consultar", "inputSchema": {"type": "object"}}]
+        delay = [0.0]
+        
+        async def handler(message):
+            current = list(tools)
+            await asyncio.sleep(delay[0])
+            return {"jsonrpc": "2.0", "id": message["id"], "result": {"tools": current}}
+        
+        bridge = _bridge_with_fake_server(handler, {"tools_cache_ttl": 300})
+        announced = []
+        bridge._announce_tools_changed = lambda: announced.append(1)
+        names = lambda result: sorted(tool["name"] for tool in result)
+        
+        assert names(await bridge._fetch_all_tools()) == ["fake_consultar"]
+        
+        # Teste 1: Após list_changed, o próximo tools/list recebe a lista nova (não a do cache)
+        tools.append({"name": "criar", "inputSchema": {"type": "object"}})
+        bridge._on_mcp_message({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}, 0)
+        assert names(await bridge._fetch_all_tools()) == ["fake_consultar", "fake_criar"], "Lista antiga servida"
+        await asyncio.sleep(0.01)
+        assert announced == [1], "Mudança não anunciada ao agente"
+        print("✓ tools/list após list_changed recebe a lista nova e o agente é avisado")
+        
+        # Teste 2: list_changed sem mudança real não gera aviso
+        bridge._on_mcp_message({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}, 0)
+        await bridge._fetch_all_tools()
+        await asyncio.sleep(0.01)
+        assert announced == [1], "Aviso sem mudança na lista"
+        print("✓ list_changed sem mudança não gera aviso")
+        
+        # Teste 3: Mudança durante uma busca em andamento (que tem a lista antiga)
+        delay[0] = 0.05
+        bridge._invalidate_server_tools(0)
+        await asyncio.sleep(0.01)
+        tools.append({"name": "enviar", "inputSchema": {"type": "object"}})
+        bridge._on_mcp_message({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}, 0)
+        assert "fake_enviar" in names(await bridge._fetch_all_tools()), "Busca antiga sobrescreveu a mudança"
+        await asyncio.sleep(0.01)
+        assert announced == [1, 1], "Mudança durante busca não anunciada"
+        print("✓ Mudança durante busca em andamento não se perde")
+    
+    asyncio.run(scenario())
+    print("\n✅ Todos os testes do cache de ferramentas passaram!\n")
+
+
+def test_request_limiter():
+    """Testa o limite de requisições simultâneas por servidor e o prazo das requisições"""
+    print("Testando limite de requisições por servidor...")
+    from request_limiter import ServerBusyError
+    
+    async def scenario():
+        async def handler(message):
+            if message["params"]["name"] == "lenta":
+                await asyncio.sleep(3600)
+            return {"jsonrpc": "2.0", "id": message["id"], "result": {"content": []}}
+        
+        bridge = _bridge_with_fake_server(handler, {"max_in_flight": 1, "max_queue": 1})
+        call = lambda local_id, tool: {"jsonrpc": "2.0", "id": local_id, "method": "tools/call",
+                                       "params": {"name": tool, "arguments": {}}}
+        limiter = bridge.request_limiters[0]
+        
+        # Teste 1: Requisição sem resposta libera a vaga no prazo
+        slow = asyncio.create_task(bridge._limited_send(0, call(1, "lenta"), deadline=time.monotonic() + 0.1))
+        await asyncio.sleep(0.01)
+        assert limiter.active == 1, "Vaga não ocupada"
+        queued = asyncio.create_task(bridge._limited_send(0, call(2, "rapida"), deadline=time.monotonic() + 5))
+        await asyncio.sleep(0.01)
+        
+        # Teste 2: Fila cheia rejeita na hora
+        try:
+            await bridge._limited_send(0, call(3, "rapida"), deadline=time.monotonic() + 5)
+            assert False, "Fila cheia não rejeitou"
+        except ServerBusyError:
+            pass
+        print("✓ Fila cheia rejeitada com ServerBusyError")
+        
+        assert await asyncio.wait_for(slow, 1) is None, "Requisição expirada retornou resposta"
+        response = await asyncio.wait_for(queued, 1)
+        assert response and response["id"] == 2, "Requisição da fila não foi atendida após o prazo da anterior"
+        assert limiter.active == 0 and limiter.queue_depth == 0, "Vagas não liberadas"
+        print("✓ Requisição expirada libera a vaga para a fila")
+    
+    asyncio.run(scenario())
+    print("\n✅ Todos os testes do limite de requisições passaram!\n")
+
+
+def test_batch_call():
+    """Testa bridge_batch_call (execução em paralelo, prazos e validação do timeout)"""
+    print("Testando bridge_batch_call...")
+    from batch_call import InvalidBatchArguments, MIN_BATCH_CALL_TIMEOUT
+    
+    async def scenario():
+        async def handler(message):
+            if message["method"] == "tools/list":
+                tools = [{"name": name, "inputSchema": {"type": "object"}} for name in ("rapida", "lenta")]
+                return {"jsonrpc": "2.0", "id": message["id"], "result": {"tools": tools}}
+            name = message["params"]["name"]
+            await asyncio.sleep(3600 if name == "lenta" else 0.01)
+            return {"jsonrpc": "2.0", "id": message["id"],
+                    "result": {"content": [{"type": "text", "text": f"resultado de {name}"}]}}
+        
+        bridge = _bridge_with_fake_server(handler, {"batch_call_timeout": 30},
+                                          {"request_timeout": MIN_BATCH_CALL_TIMEOUT + 0.5})
+        bridge._supervisors[0].mark_connected()
+        calls = [{"name": "fake_rapida", "arguments": {}}, {"name": "fake_lenta", "arguments": {}}]
+        
+        # Teste 1: Chamadas em paralelo; a lenta é limitada pelo request_timeout do servidor
+        started = time.monotonic()
+        result = await bridge._tool_batch_call({"calls": calls, "timeout": 60}, "teste")
+        elapsed = time.monotonic() - started
+        assert elapsed < 5, f"Prazo do servidor não respeitado ({elapsed:.1f}s)"
+        assert result["batch"]["calls"] == 2 and result["batch"]["succeeded"] == 1, result["batch"]
+        assert "resultado de rapida" in result["content"][0]["text"], "Resultado da chamada rápida ausente"
+        print("✓ Lote limitado pelo request_timeout do servidor de destino")
+        
+        # Teste 2: timeout 0 ou negativo sobe para o mínimo (não expira na hora)
+        result = await bridge._tool_batch_call({"calls": calls[:1], "timeout": 0}, "teste")
+        assert result["batch"]["succeeded"] == 1, "timeout 0 fez a chamada expirar na hora"
+        result = await bridge._tool_batch_call({"calls": calls[:1], "timeout": -5}, "teste")
+        assert result["batch"]["succeeded"] == 1, "timeout negativo fez a chamada expirar na hora"
+        print("✓ timeout 0/negativo ajustado para o mínimo")
+        
+        # Teste 3: timeout não numérico vira erro JSON-RPC -32602
+        for value in ("abc", [1], True):
+            try:
+                await bridge._tool_batch_call({"calls": calls[:1], "timeout": value}, "teste")
+                assert False, f"timeout {value!r} aceito"
+            except InvalidBatchArguments:
+                pass
+        sent = []
+        
+        async def capture(response, endpoint_id):
+            sent.append(response)
+        bridge._forward_response_to_cloud = capture
+        await bridge._run_local_tool(bridge._tool_batch_call, {"calls": calls[:1], "timeout": "abc"}, 7, "teste")
+        assert sent[0]["id"] == 7 and sent[0]["error"]["code"] == -32602, sent
+        print("✓ timeout não numérico rejeitado com erro -32602")
+    
+    asyncio.run(scenario())
+    print("\n✅ Todos os testes do bridge_batch_call passaram!\n")
+
+
+def test_result_pager():
+    """Testa a paginação de resultados grandes (páginas dentro do limite, sem perda de dados)"""
+    print("Testando paginação de resultados...")
+    limit = 51200
+    budget = limit - PAGE_OVERHEAD_RESERVE
+    
+    # Teste 1: Texto com escapes e caracteres multibyte concentrados em trechos
+    text = "a" * 200000 + '"\\\n\t\x01' * 40000 + "中文字符" * 30000 + "😀" * 20000
+    result = {"content": [{"type": "text", "text": text}], "isError": False}
+    pages, _ = split_pages(result, budget)
+    assert len(pages) > 1, "Resultado não foi paginado"
+    for page in pages:
+        assert len(json_codec.dumps(page)) <= budget, "Página acima do limite"
+    assert "".join(item["text"] for page in pages for item in page["content"]) == text, "Dados perdidos na paginação"
+    for number in range(1, len(pages) + 1):
+        response = {"jsonrpc": "2.0", "id": 1, "result": page_result(pages, "cursor", number)}
+        assert len(json_codec.dumps(response)) <= limit, "Resposta paginada acima do limite"
+    print(f"✓ {len(pages)} páginas dentro do limite, texto preservado")
+    
+    # Teste 2: Sem espaço para os itens (campos fora das listas ou item sem texto grandes demais)
+    assert split_pages({"content": [{"type": "text", "text": "x" * 100000}], "meta": "y" * 60000}, budget) is None
+    assert split_pages({"content": [{"type": "text", "text": "x" * 100000, "extra": "z" * 52000}]}, budget) is None
+    print("✓ Resultado sem espaço para os itens não é paginado")
+    
+    # Teste 3: Limite de páginas
+    assert split_pages({"content": [{"type": "text", "text": "x" * 1000000}]}, budget, max_pages=5) is None
+    print("✓ Limite de páginas respeitado")
+    
+    print("\n✅ Todos os testes de paginação passaram!\n")
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Testes Básicos - Xiaozhi MCP Bridge")
@@ -133,6 +423,13 @@ if __name__ == '__main__':
     try:
         test_message_handler()
         test_message_types()
+        test_response_encoder()
+        test_result_pager()
+        test_raw_response()
+        test_tools_cache_invalidation()
+        test_request_limiter()
+        test_batch_call()
+        test_collection_resolver()
         
         print("=" * 60)
         print("✅ TODOS OS TESTES PASSARAM!")